@@ -0,0 +1,3 @@
+"""
+    Benchmarks for the store. Run each one from the repository root, e.g. `python -m benchmarks.pricing`.
+"""
@@ -0,0 +1,64 @@
+"""
+    Load generator for the asyncio order service: throughput against the number of concurrent
+    clients, compared with calling Store.order one request at a time.
+    Usage: python -m benchmarks.async_checkout [--orders 20000] [--clients 1 10 100 1000]
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Tuple
+
+from order_service import OrderService
+from products import Product
+from store import Store
+
+
+def make_orders(count: int, catalog_size: int = 1000, seed: int = 0) -> Tuple[Store, List[list]]:
+    rng = random.Random(seed)
+    products = [Product(f"SKU-{index}", price=10, quantity=10 ** 9) for index in range(catalog_size)]
+    orders = [[(rng.choice(products), rng.randint(1, 3)) for _ in range(rng.randint(1, 5))] for _ in range(count)]
+    return Store(products), orders
+
+
+def sequential_throughput(orders_count: int) -> float:
+    store, orders = make_orders(orders_count)
+    start = time.perf_counter()
+    for shopping_list in orders:
+        store.order(shopping_list)
+    return orders_count / (time.perf_counter() - start)
+
+
+async def service_throughput(orders_count: int, clients: int) -> Tuple[float, float]:
+    """
+        Split the orders between `clients` concurrent client tasks.
+        Returns:
+            Tuple[float, float]: Orders per second, and the average number of orders per batch.
+    """
+    store, orders = make_orders(orders_count)
+
+    async def client(shopping_lists):
+        for shopping_list in shopping_lists:
+            await service.order(shopping_list)
+
+    async with OrderService(store) as service:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(orders[index::clients]) for index in range(clients)))
+        seconds = time.perf_counter() - start
+    return orders_count / seconds, orders_count / service.batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"sequential Store.order: {sequential_throughput(args.orders):12,.0f} orders/sec")
+    for clients in args.clients:
+        throughput, batch_size = asyncio.run(service_throughput(args.orders, clients))
+        print(f"{clients:5} clients:           {throughput:12,.0f} orders/sec ({batch_size:.1f} orders/batch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+    Overhead of the change feed on the purchase path, and how fast a consumer drains it.
+    Usage: python -m benchmarks.change_feed [--buys 1000000]
+"""
+import argparse
+import time
+
+from products import Product
+from store import Store
+
+
+def buy_seconds(products, buys: int) -> float:
+    start = time.perf_counter()
+    for index in range(buys):
+        products[index % len(products)].buy(1)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buys", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--capacity", type=int, default=65536)
+    parser.add_argument("--batch", type=int, default=1024)
+    args = parser.parse_args()
+
+    products = [Product(f"Product {index}", price=1, quantity=10 * args.buys) for index in range(args.products)]
+    store = Store(products)
+    without_feed = min(buy_seconds(products, args.buys) for _ in range(3))
+    feed = store.change_feed(args.capacity)
+    with_feed = min(buy_seconds(products, args.buys) for _ in range(3))
+    overhead = (with_feed - without_feed) / args.buys * 1e9
+    print(f"buy without feed: {without_feed / args.buys * 1e9:6.0f} ns")
+    print(f"buy with feed:    {with_feed / args.buys * 1e9:6.0f} ns  (+{overhead:.0f} ns per event)")
+
+    cursor = feed.cursor(start="earliest")
+    start = time.perf_counter()
+    read = 0
+    while True:
+        changes = cursor.read(args.batch)
+        if not changes:
+            break
+        read += len(changes)
+    seconds = time.perf_counter() - start
+    print(f"consumer: {read / seconds:,.0f} events/s in batches of {args.batch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+    Fleet-wide queries and order routing of a federated store, by default over 100 locations
+    carrying the same 100k SKUs each (10M products; building them takes about 3GB and a while,
+    use --locations and --skus to scale down).
+    Usage: python -m benchmarks.federation [--locations 100] [--skus 100000] [--orders 20000] [--workers 1 8 32]
+"""
+import argparse
+import random
+import time
+
+from federation import FederatedStore, NearestFirst, BalanceStock
+from products import Product
+from store import Store
+
+
+def make_locations(locations: int, skus: int, seed: int = 0):
+    """
+        Stores with every SKU, each at a random stock level (some sold out), and random (x, y) positions.
+    """
+    rng = random.Random(seed)
+    names = [f"SKU-{index}" for index in range(skus)]
+    stores, positions = {}, {}
+    for location in range(locations):
+        store = Store()
+        store.add_products_batch([Product(name, price=10, quantity=rng.choice((0, 5, 20, 100))) for name in names])
+        stores[f"Location {location}"] = store
+        positions[f"Location {location}"] = (rng.uniform(0, 1000), rng.uniform(0, 1000))
+    return stores, positions
+
+
+def make_orders(count: int, skus: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [([(f"SKU-{rng.randrange(skus)}", rng.choice((1, 1, 2, 3, 50)))
+              for _ in range(rng.randint(1, 3))], (rng.uniform(0, 1000), rng.uniform(0, 1000)))
+            for _ in range(count)]
+
+
+def splits(federation: FederatedStore, lines, destination) -> bool:
+    # Whether the order would be split over more locations than it has lines (if it can be placed).
+    try:
+        return len(federation.plan(lines, destination)) > len(lines)
+    except Exception:
+        return False
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--skus", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32],
+                        help="query threads to compare (1 evaluates the locations one after another)")
+    args = parser.parse_args()
+
+    seconds, (stores, positions) = timed(lambda: make_locations(args.locations, args.skus))
+    print(f"built {args.locations} locations x {args.skus:,} SKUs in {seconds:.1f}s")
+
+    for workers in args.workers:
+        with FederatedStore(stores, workers=workers) as federation:
+            total_seconds, total = timed(federation.get_total_quantity)
+            listing_seconds, products = timed(federation.get_all_products)
+        print(f"{workers:>3} workers: get_total_quantity {total_seconds * 1e3:8.2f}ms ({total:,} units), "
+              f"get_all_products {listing_seconds:6.2f}s ({len(products):,} products)")
+
+    orders = make_orders(args.orders, args.skus)
+    # Every policy starts from the same stock: the ordered products are restocked after each run.
+    ordered = {name for lines, _ in orders for name, _ in lines}
+    stock = [(product, product.get_quantity()) for store in stores.values() for product in map(store.get_product, ordered)]
+    for label, policy in (("location order", None), ("nearest first", NearestFirst(positions)),
+                          ("balance stock", BalanceStock())):
+        with FederatedStore(stores, policy=policy, workers=1) as federation:
+            split = sum(splits(federation, lines, destination) for lines, destination in orders)
+            failed = 0
+            start = time.perf_counter()
+            for lines, destination in orders:
+                try:
+                    federation.order(lines, destination)
+                except Exception:
+                    failed += 1
+            seconds = time.perf_counter() - start
+        for product, quantity in stock:
+            product.set_quantity(quantity)
+        print(f"{label:>15}: {args.orders / seconds:10,.0f} orders/sec, {split / args.orders:6.1%} split "
+              f"across locations, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+    Measure memory per product and construction throughput for each product type.
+    Usage: python -m benchmarks.memory [--products 1000000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import PercentDiscount
+
+SHARED_PROMOTION = PercentDiscount("30% off!", percent=30)
+
+# One factory per product type. Each builds the i-th product from a prebuilt name.
+FACTORIES = {
+    "Product": lambda name: Product(name, price=1450, quantity=100),
+    "NonStockedProduct": lambda name: NonStockedProduct(name, price=125),
+    "LimitedProduct": lambda name: LimitedProduct(name, price=10, quantity=250, maximum=1),
+    "Product+promotion": lambda name: _with_promotion(Product(name, price=250, quantity=500)),
+}
+
+
+def _with_promotion(product):
+    product.set_promotion(SHARED_PROMOTION)
+    return product
+
+
+def measure(factory, count: int) -> dict:
+    """
+        Build `count` products with `factory` and report their memory footprint and construction speed.
+        The product names are built beforehand, so only the product objects themselves are measured.
+        Returns:
+            dict: bytes_per_product and products_per_sec.
+    """
+    names = [f"Item {index}" for index in range(count)]
+
+    gc.collect()
+    start = time.perf_counter()
+    products = [factory(name) for name in names]
+    seconds = time.perf_counter() - start
+    del products
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        products = [factory(name) for name in names]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # The list holding the products is not part of their cost.
+    list_bytes = products.__sizeof__()
+    return {"bytes_per_product": (after - before - list_bytes) / count,
+            "products_per_sec": count / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{args.products} products of each type")
+    for type_name, factory in FACTORIES.items():
+        result = measure(factory, args.products)
+        print(f"{type_name:20} {result['bytes_per_product']:8.1f} bytes/product "
+              f"{result['products_per_sec']:12,.0f} products/sec")
+
+
+if __name__ == "__main__":
+    main()
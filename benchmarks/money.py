@@ -0,0 +1,85 @@
+"""
+    Pricing order lines and summing them three ways: floats (today's path), integer cents, and Decimal
+    (what reconciliation jobs use to re-check totals). Also the vectorized float and cents paths
+    when numpy is installed.
+    Usage: python -m benchmarks.money [--lines 1000000]
+"""
+import argparse
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from products import Product
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree, apply_promotions_batch, \
+    apply_promotions_cents_batch
+
+CENT = Decimal("0.01")
+
+
+def decimal_line_price(product, quantity: int) -> Decimal:
+    """
+        Reference price of a line with Decimal arithmetic, rounded like the cents path.
+    """
+    price = Decimal(repr(product.price))
+    promotion = product.promotion
+    if isinstance(promotion, PercentDiscount):
+        total = price * quantity * (1 - Decimal(str(promotion.percent)) / 100)
+    elif isinstance(promotion, SecondHalfPrice):
+        half_price_items = quantity // 2
+        total = price * (quantity - half_price_items) + \
+            (price * half_price_items / 2).quantize(CENT, rounding=ROUND_HALF_UP)
+    elif isinstance(promotion, ThirdOneFree):
+        total = price * (quantity - quantity // 3)
+    else:
+        total = price * quantity
+    return total.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def make_lines(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    promotions = [None, PercentDiscount("30% off!", percent=30), SecondHalfPrice("Second Half price!"),
+                  ThirdOneFree("Third One Free!")]
+    products = []
+    for index in range(1000):
+        product = Product(f"Product {index}", price=rng.randrange(1, 200_000) / 100, quantity=1)
+        product.promotion = promotions[index % len(promotions)]
+        products.append(product)
+    return [(rng.choice(products), rng.randint(1, 5)) for _ in range(count)]
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    paths = {
+        "float": lambda: sum(product._line_price(quantity) for product, quantity in lines),
+        "cents": lambda: sum(product._line_price_cents(quantity) for product, quantity in lines),
+        "Decimal": lambda: sum(decimal_line_price(product, quantity) for product, quantity in lines),
+    }
+    try:
+        import numpy  # noqa: F401
+        paths["float, vectorized"] = lambda: float(apply_promotions_batch(lines).sum())
+        paths["cents, vectorized"] = lambda: int(apply_promotions_cents_batch(lines).sum())
+    except ImportError:
+        print("numpy is not installed, skipping the vectorized paths")
+
+    totals = {}
+    for label, path in paths.items():
+        seconds, totals[label] = timed(path)
+        print(f"{label:>18}: {args.lines / seconds:>12,.0f} lines/s  total {totals[label]}")
+    exact = totals["Decimal"]
+    print(f"cents total equals the Decimal total: {Decimal(totals['cents']) / 100 == exact}; "
+          f"the float total differs by {Decimal(totals['float']) - exact:.10f} "
+          f"(float lines keep fractions of a cent and accumulate rounding errors)")
+
+
+if __name__ == "__main__":
+    main()
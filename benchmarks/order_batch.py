@@ -0,0 +1,46 @@
+"""
+    Compare Store.order_batch with calling Store.order once per order.
+    Usage: python -m benchmarks.order_batch [--orders 10000] [--catalog 1000]
+"""
+import argparse
+import random
+import time
+
+from products import Product, LimitedProduct
+from store import Store
+
+
+def make_orders(orders: int, catalog: int, seed: int = 0):
+    rng = random.Random(seed)
+    products = [Product(f"SKU-{index}", price=rng.randint(1, 500), quantity=10 ** 9) for index in range(catalog)]
+    stocked = list(products)
+    products.append(LimitedProduct("Shipping", price=10, quantity=10 ** 9, maximum=1))
+    shopping_lists = [[(rng.choice(stocked), rng.randint(1, 3)) for _ in range(rng.randint(1, 8))]
+                      + [(products[-1], 1)] for _ in range(orders)]
+    return Store(products), shopping_lists
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--catalog", type=int, default=1000)
+    args = parser.parse_args()
+
+    store, shopping_lists = make_orders(args.orders, args.catalog)
+    start = time.perf_counter()
+    for shopping_list in shopping_lists:
+        store.order(shopping_list)
+    loop_seconds = time.perf_counter() - start
+
+    for policy in ("fifo", "max_filled"):
+        store, shopping_lists = make_orders(args.orders, args.catalog)
+        start = time.perf_counter()
+        store.order_batch(shopping_lists, policy=policy)
+        seconds = time.perf_counter() - start
+        print(f"{f'order_batch ({policy})':>24}: {args.orders / seconds:10,.0f} orders/sec "
+              f"({loop_seconds / seconds:.1f}x the order() loop)")
+    print(f"{'order() loop':>24}: {args.orders / loop_seconds:10,.0f} orders/sec")
+
+
+if __name__ == "__main__":
+    main()
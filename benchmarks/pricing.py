@@ -0,0 +1,61 @@
+"""
+    Compare scalar apply_promotion calls with the vectorized batch pricing API.
+    Usage: python -m benchmarks.pricing [--lines 1000000]
+"""
+import argparse
+import random
+import time
+
+from products import Product
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree, apply_promotions_batch
+
+
+def make_lines(count: int, seed: int = 0):
+    """
+        Build `count` order lines over a small catalog with a mix of promotions.
+    """
+    rng = random.Random(seed)
+    promotions = [None, PercentDiscount("30% off!", percent=30), SecondHalfPrice("Second Half price!"),
+                  ThirdOneFree("Third One Free!")]
+    catalog = []
+    for index in range(1000):
+        product = Product(f"Item {index}", price=rng.randint(1, 2000), quantity=10)
+        if promotions[index % 4]:
+            product.set_promotion(promotions[index % 4])
+        catalog.append(product)
+    return [(rng.choice(catalog), rng.randint(1, 10)) for _ in range(count)]
+
+
+def scalar_totals(lines):
+    totals = []
+    for product, quantity in lines:
+        if product.promotion:
+            totals.append(product.promotion.apply_promotion(product, quantity))
+        else:
+            totals.append(product.price * quantity)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+
+    start = time.perf_counter()
+    expected = scalar_totals(lines)
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    totals = apply_promotions_batch(lines)
+    batch_seconds = time.perf_counter() - start
+
+    assert totals.tolist() == expected, "batch totals differ from scalar totals"
+    print(f"{args.lines} lines")
+    print(f"scalar: {scalar_seconds:.3f}s")
+    print(f"batch:  {batch_seconds:.3f}s ({scalar_seconds / batch_seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+    Per-line pricing latency of the promotion engine as the number of rules grows.
+    Usage: python -m benchmarks.promotion_engine [--rules 10 1000 100000] [--products 100000]
+"""
+import argparse
+import random
+import timeit
+
+from products import Product
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree
+from promotion_engine import PromotionEngine, PromotionRule
+
+
+DAY = 86400
+# Pricing happens in the middle of a year of campaigns.
+MOMENT = 180 * DAY
+
+
+def build_engine(rules: int, products: int, categories: int = 1000, seed: int = 0) -> PromotionEngine:
+    """
+        Build an engine with `rules` campaigns of 1-7 days scheduled over a year:
+        80% for one product, the rest for a category, and 1 in 1000 catalog-wide.
+    """
+    rng = random.Random(seed)
+    engine = PromotionEngine({f"SKU-{index}": f"category-{index % categories}" for index in range(products)})
+    kinds = [lambda n: PercentDiscount(f"{n}% off", percent=rng.randint(1, 50)),
+             lambda n: SecondHalfPrice(f"half {n}"), lambda n: ThirdOneFree(f"third {n}")]
+    for number in range(rules):
+        promotion = rng.choice(kinds)(number)
+        start = rng.uniform(0, 365 * DAY)
+        end = start + rng.uniform(1, 7) * DAY
+        target = rng.random()
+        if target < 0.8:
+            rule = PromotionRule(promotion, products=[f"SKU-{rng.randrange(products)}"],
+                                 starts_at=start, ends_at=end)
+        elif target < 0.999:
+            rule = PromotionRule(promotion, categories=[f"category-{rng.randrange(categories)}"],
+                                 starts_at=start, ends_at=end)
+        else:
+            rule = PromotionRule(promotion, starts_at=start, ends_at=end)
+        engine.add_rule(rule)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 1000, 100_000])
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    lines = [(Product(f"SKU-{rng.randrange(args.products)}", price=rng.randint(1, 500), quantity=10),
+              rng.randint(1, 5)) for _ in range(1000)]
+    for rules in args.rules:
+        engine = build_engine(rules, args.products)
+        timer = timeit.Timer(lambda: [engine.price(product, quantity, moment=MOMENT) for product, quantity in lines])
+        loops, _ = timer.autorange()
+        best = min(timer.repeat(repeat=5, number=loops)) / loops
+        # The rules that really apply have to be priced; the cost of finding them should stay flat.
+        applicable = sum(len(engine.applicable_rules(product, MOMENT)) for product, _ in lines) / len(lines)
+        print(f"{rules:>8,} rules: {best / len(lines) * 1e6:6.2f} µs per line, "
+              f"{applicable:.2f} applicable rules per line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+    Measure cold start of a persisted store: load the snapshot and replay the log.
+    Usage: python -m benchmarks.restart [--skus 5000000] [--log-records 100000] [--directory DIR]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from persistence import InventoryLog, load_snapshot, open_store, save_snapshot
+from products import Product
+from promotion import ThirdOneFree
+from store import Store
+
+PROMOTIONS = {"Third One Free!": ThirdOneFree("Third One Free!")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--skus", type=int, default=5_000_000)
+    parser.add_argument("--log-records", type=int, default=100_000)
+    parser.add_argument("--directory", default=None, help="where to write the files (default: a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        snapshot_path = os.path.join(directory, "inventory.snap")
+        log_path = os.path.join(directory, "inventory.log")
+
+        products = [Product(f"SKU-{index:08d}", price=19.99, quantity=1000) for index in range(args.skus)]
+        for product in products[::10]:
+            product.set_promotion(PROMOTIONS["Third One Free!"])
+        store = Store()
+        store.add_products_batch(products)
+
+        start = time.perf_counter()
+        save_snapshot(store, snapshot_path)
+        print(f"snapshot of {args.skus:,} SKUs written in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(snapshot_path) / 2 ** 20:.0f} MiB)")
+
+        log = InventoryLog(log_path)
+        store.add_listener(log)
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(args.log_records):
+            rng.choice(products).buy(1)
+        log.close()
+        print(f"{args.log_records:,} buys logged in {time.perf_counter() - start:.2f}s")
+        del store, products
+
+        start = time.perf_counter()
+        load_snapshot(snapshot_path, PROMOTIONS)
+        snapshot_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        restored, log = open_store(snapshot_path, log_path, PROMOTIONS)
+        log.close()
+        print(f"snapshot load: {snapshot_seconds:.2f}s")
+        print(f"cold start (snapshot + log replay): {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+    Latency of prefix and fuzzy name search on a large catalog, and of prefix search right after
+    adding a product (which merges the new name into the index).
+    Usage: python -m benchmarks.search [--products 1000000]
+"""
+import argparse
+import random
+import time
+
+from products import Product
+from search_index import NameIndex
+
+BRANDS = ["Acme", "Bose", "Google", "Apple", "Sony", "Samsung", "Lenovo", "Dell", "Logitech", "Anker"]
+KINDS = ["Laptop", "Earbuds", "Phone", "Charger", "Cable", "Monitor", "Keyboard", "Mouse", "Speaker", "Tablet"]
+
+
+def make_names(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(BRANDS)} {rng.choice(KINDS)} {rng.choice('XYZQRT')}{index}" for index in range(count)]
+
+
+def with_typo(name: str, rng: random.Random) -> str:
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    names = make_names(args.products)
+    index = NameIndex()
+    start = time.perf_counter()
+    for name in names:
+        index.add(Product(name, price=1, quantity=1))
+    index.prefix("")    # merge the buffered names
+    print(f"indexed {args.products:,} products in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    for label, make_query, search in (
+            ("prefix", lambda name: name.split()[-1][:5], index.prefix),
+            ("fuzzy", lambda name: with_typo(name.split()[-1], rng), index.fuzzy)):
+        queries = [make_query(rng.choice(names)) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for query in queries:
+            search(query, 10)
+        print(f"{label}: {(time.perf_counter() - start) / len(queries) * 1000:.3f} ms per query")
+
+    start = time.perf_counter()
+    for number in range(args.queries):
+        index.add(Product(f"Added Product {number}", price=1, quantity=1))
+        index.prefix("added", 10)
+    print(f"add, then prefix: {(time.perf_counter() - start) / args.queries * 1000:.3f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
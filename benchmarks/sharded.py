@@ -0,0 +1,63 @@
+"""
+    Order throughput of the multi-process sharded store against the number of worker processes,
+    for orders placed on one shard and for orders spanning two shards (two-phase reserve/commit).
+    Usage: python -m benchmarks.sharded [--orders 200000] [--workers 1 2 4 8] [--batch 5000]
+"""
+import argparse
+import random
+import time
+
+from products import Product
+from sharded_store import ShardedStore, shard_of
+
+
+def make_orders(count: int, catalog_size: int, workers: int, spanning: bool, seed: int = 0):
+    """
+        Build orders of 1-3 lines over the catalog, all on one shard, or (if `spanning`) of 2-3 lines
+        on two different shards.
+    """
+    rng = random.Random(seed)
+    by_shard = {}
+    for index in range(catalog_size):
+        name = f"SKU-{index}"
+        by_shard.setdefault(shard_of(name, workers), []).append(name)
+    shards = list(by_shard.values())
+    orders = []
+    for _ in range(count):
+        if spanning:
+            first, second = rng.sample(shards, 2)
+            lines = [(rng.choice(first), rng.randint(1, 3)), (rng.choice(second), rng.randint(1, 3))]
+            lines += [(rng.choice(first + second), rng.randint(1, 3)) for _ in range(rng.randint(0, 1))]
+            orders.append(lines)
+        else:
+            names = rng.choice(shards)
+            orders.append([(rng.choice(names), rng.randint(1, 3)) for _ in range(rng.randint(1, 3))])
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch", type=int, default=5000, help="orders sent per order_batch call")
+    parser.add_argument("--catalog", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        products = [Product(f"SKU-{index}", price=10, quantity=10 ** 9) for index in range(args.catalog)]
+        with ShardedStore(products, workers=workers) as store:
+            for label, spanning in (("single-shard", False), ("cross-shard", True)):
+                if spanning and workers < 2:
+                    continue    # every order is on the one shard
+                # Cross-shard orders cost two round trips each, so fewer of them are timed.
+                count = args.orders // 20 if spanning else args.orders
+                orders = make_orders(count, args.catalog, workers, spanning)
+                start = time.perf_counter()
+                for offset in range(0, len(orders), args.batch):
+                    store.order_batch(orders[offset:offset + args.batch])
+                seconds = time.perf_counter() - start
+                print(f"{workers} workers, {label:>12}: {count / seconds:12,.0f} orders/sec")
+
+
+if __name__ == "__main__":
+    main()
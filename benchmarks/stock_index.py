@@ -0,0 +1,61 @@
+"""
+    Low-stock, price-range and top-N queries: full catalog scan against the sorted stock index,
+    and the cost the index adds to every purchase.
+    Usage: python -m benchmarks.stock_index [--products 200000]
+"""
+import argparse
+import heapq
+import random
+import time
+
+from products import Product
+from store import Store
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def buy_rate(store: Store, products, count: int) -> float:
+    start = time.perf_counter()
+    for index in range(count):
+        products[index % len(products)].buy(1)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    products = [Product(f"Product {index}", price=rng.randrange(1, 2000), quantity=rng.randrange(10, 10_000))
+                for index in range(args.products)]
+    store = Store(products)
+    print(f"buys without index: {buy_rate(store, products, 100_000):,.0f}/s")
+
+    queries = {
+        "quantity < 20": (lambda: [p for p in store.products if p.get_quantity() < 20],
+                          lambda: store.low_stock(20)),
+        "100 <= price <= 110": (lambda: [p for p in store.products if 100 <= p.price <= 110],
+                                lambda: store.find_by_price(100, 110)),
+        "top 50 by quantity": (lambda: heapq.nlargest(50, store.products, key=Product.get_quantity),
+                               lambda: store.top_products(50)),
+    }
+    start = time.perf_counter()
+    store.low_stock(0)
+    print(f"index built in {time.perf_counter() - start:.2f}s")
+    print(f"buys with index:    {buy_rate(store, products, 100_000):,.0f}/s")
+
+    for label, (scan, indexed) in queries.items():
+        assert len(scan()) == len(indexed())
+        print(f"{label:>20}: scan {timed(scan, args.repeat):8.3f} ms, "
+              f"index {timed(indexed, args.repeat):.3f} ms ({len(indexed())} results)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+    Benchmark suite for the checkout hot paths across catalog sizes.
+
+    Usage:
+        python -m benchmarks.suite [--sizes 10 100 ... 1000000] [--output results.json]
+        python -m benchmarks.suite --compare baseline.json [--threshold 0.1] [--output results.json]
+
+    Results are written as JSON. In compare mode the new results are checked against a stored
+    baseline, every benchmark slower by more than the threshold is reported, and the exit code is 1.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree
+from store import Store
+
+DEFAULT_SIZES = [10, 100, 1000, 10_000, 100_000, 1_000_000]
+ORDER_LINES = [1, 10, 1000]
+# Stock high enough that no benchmark ever runs out.
+STOCK = 10 ** 12
+
+
+def time_call(function: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    """
+        Time a function the way timeit does: find a loop count that runs for at least 0.2s,
+        then keep the best of `repeat` runs.
+        Returns:
+            dict: ns_per_op and the number of loops per run.
+    """
+    timer = timeit.Timer(function)
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=loops))
+    return {"ns_per_op": best / loops * 1e9, "loops": loops}
+
+
+def build_store(size: int, seed: int = 0) -> Store:
+    """
+        Build a store of `size` products: mostly Product, with every 10th product
+        a LimitedProduct and every 10th a NonStockedProduct, and a mix of promotions.
+    """
+    rng = random.Random(seed)
+    promotions = [None, PercentDiscount("30% off!", percent=30), SecondHalfPrice("Second Half price!"),
+                  ThirdOneFree("Third One Free!")]
+    products = []
+    for index in range(size):
+        name, price = f"SKU-{index}", rng.randint(1, 2000)
+        if index % 10 == 1:
+            product = LimitedProduct(name, price, STOCK, maximum=10 ** 6)
+        elif index % 10 == 2:
+            product = NonStockedProduct(name, price)
+        else:
+            product = Product(name, price, STOCK)
+        promotion = promotions[index % len(promotions)]
+        if promotion:
+            product.set_promotion(promotion)
+        products.append(product)
+    store = Store()
+    store.add_products_batch(products)
+    return store
+
+
+def run_size(size: int, seed: int = 0) -> List[dict]:
+    """
+        Run every catalog-size dependent benchmark for one catalog size.
+    """
+    rng = random.Random(seed)
+    store = build_store(size, seed)
+    products = store.products
+    results = []
+
+    def record(name: str, function: Callable[[], object]):
+        results.append({"name": name, "size": size, **time_call(function)})
+
+    for product_type in (Product, LimitedProduct, NonStockedProduct):
+        product = next(p for p in products if type(p) is product_type) if size >= 3 else None
+        if product is not None:
+            record(f"{product_type.__name__}.buy", lambda product=product: product.buy(1))
+
+    for lines in ORDER_LINES:
+        shopping_list = [(rng.choice(products), 1) for _ in range(lines)]
+        record(f"Store.order[{lines} lines]", lambda shopping_list=shopping_list: store.order(shopping_list))
+
+    record("Store.get_all_products", store.get_all_products)
+    record("Store.get_total_quantity", store.get_total_quantity)
+    return results
+
+
+def run_promotions() -> List[dict]:
+    """
+        Benchmark each promotion's apply_promotion. These don't depend on the catalog size.
+    """
+    product = Product("MacBook Air M2", price=1450, quantity=100)
+    results = []
+    for promotion in (PercentDiscount("30% off!", percent=30), SecondHalfPrice("Second Half price!"),
+                      ThirdOneFree("Third One Free!")):
+        timing = time_call(lambda promotion=promotion: promotion.apply_promotion(product, 7))
+        results.append({"name": f"{type(promotion).__name__}.apply_promotion", "size": None, **timing})
+    return results
+
+
+def run_suite(sizes: List[int], seed: int = 0) -> dict:
+    results = run_promotions()
+    for size in sizes:
+        print(f"catalog size {size:,}...", file=sys.stderr)
+        results.extend(run_size(size, seed))
+    return {"meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                     "machine": platform.machine(), "seed": seed, "timestamp": time.time()},
+            "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """
+        Find benchmarks that got slower than the baseline by more than `threshold` (0.1 = 10%).
+        Returns:
+            List[dict]: name, size, baseline and current ns_per_op and the slowdown ratio of each regression.
+    """
+    previous = {(result["name"], result["size"]): result["ns_per_op"] for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["name"], result["size"]))
+        if before and result["ns_per_op"] > before * (1 + threshold):
+            regressions.append({"name": result["name"], "size": result["size"], "baseline_ns": before,
+                                "current_ns": result["ns_per_op"], "ratio": result["ns_per_op"] / before})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.sizes, args.seed)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(current, file, indent=2)
+    for result in current["results"]:
+        size = "-" if result["size"] is None else f"{result['size']:,}"
+        print(f"{result['name']:40} {size:>10} {result['ns_per_op']:14,.0f} ns/op")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} (size {regression['size']}): "
+                  f"{regression['baseline_ns']:,.0f} -> {regression['current_ns']:,.0f} ns/op "
+                  f"({regression['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+    Streaming catalog loader: reads products from a CSV or JSONL file and adds them to a Store in batches.
+
+    Each row describes one product with the columns:
+        type        Product (default), NonStockedProduct or LimitedProduct
+        name        product name
+        price       unit price
+        quantity    units in stock (not used by NonStockedProduct)
+        maximum     maximum units per order (LimitedProduct only)
+        promotion   optional name of a promotion to attach
+"""
+import csv
+import json
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import Promotion
+from store import Store
+
+PRODUCT_TYPES = {
+    "product": Product,
+    "nonstockedproduct": NonStockedProduct,
+    "non_stocked": NonStockedProduct,
+    "limitedproduct": LimitedProduct,
+    "limited": LimitedProduct,
+}
+
+
+class LoadReport:
+    """
+        Summary of a catalog load.
+        Only the first `max_errors` row errors are kept, so a bad file can't use unbounded memory.
+    """
+
+    def __init__(self, max_errors: int = 100):
+        self.rows = 0
+        self.loaded = 0
+        self.error_count = 0
+        self.errors: List[Tuple[int, str]] = []   # (line number, message)
+        self.seconds = 0.0
+        self._max_errors = max_errors
+
+    def add_error(self, line_number: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < self._max_errors:
+            self.errors.append((line_number, message))
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.rows} rows, {self.loaded} products loaded, {self.error_count} errors "
+                f"in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/sec)")
+
+
+def read_rows(path: str) -> Iterator[Tuple[int, object]]:
+    """
+        Read a .csv or .jsonl file one row at a time.
+        Yields:
+            Tuple[int, object]: (line number, row dict). A line that isn't valid JSON yields
+            the exception instead of a dict, so the caller can report it and carry on.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+    elif path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as error:
+                    yield line_number, error
+    else:
+        raise ValueError("Catalog file must be a .csv or .jsonl file.")
+
+
+def _number(value, convert):
+    # CSV gives strings, JSON gives numbers. Empty CSV cells count as missing.
+    if value is None or value == "":
+        raise ValueError("missing value")
+    if isinstance(value, str):
+        return convert(value)
+    return value
+
+
+def build_product(row: dict, promotions: Dict[str, Promotion]) -> Product:
+    """
+        Build the product described by one catalog row.
+        Raises:
+            ValueError, TypeError, KeyError: If the row is invalid.
+    """
+    if not isinstance(row, dict):
+        raise TypeError("row must be an object")
+    type_name = str(row.get("type") or "Product").strip().lower()
+    product_type = PRODUCT_TYPES.get(type_name)
+    if product_type is None:
+        raise ValueError(f"unknown product type {row.get('type')!r}")
+    name = row.get("name")
+    price = _number(row.get("price"), float)
+
+    if product_type is NonStockedProduct:
+        product = NonStockedProduct(name, price)
+    elif product_type is LimitedProduct:
+        product = LimitedProduct(name, price, _number(row.get("quantity"), int), _number(row.get("maximum"), int))
+    else:
+        product = Product(name, price, _number(row.get("quantity"), int))
+
+    promotion_name = row.get("promotion")
+    if promotion_name:
+        if promotion_name not in promotions:
+            raise KeyError(f"unknown promotion {promotion_name!r}")
+        product.set_promotion(promotions[promotion_name])
+    return product
+
+
+def load_catalog(store: Store, path: str, promotions: Optional[Dict[str, Promotion]] = None,
+                 batch_size: int = 10000, max_errors: int = 100) -> LoadReport:
+    """
+        Stream a catalog file into a store.
+        Rows are parsed and turned into products lazily and handed to the store `batch_size` at a time,
+        so memory stays bounded by the batch size whatever the file size. Invalid rows are
+        recorded in the report and skipped without aborting the load.
+        Args:
+            store (Store): The store to add the products to.
+            path (str): A .csv or .jsonl catalog file.
+            promotions (Dict[str, Promotion], optional): Promotions that rows can refer to by name.
+            batch_size (int): Number of products added to the store per batch.
+            max_errors (int): Number of row errors kept in the report (all of them are counted).
+        Returns:
+            LoadReport: Row, product and error counts and the load speed.
+    """
+    promotions = promotions or {}
+    report = LoadReport(max_errors)
+    start = time.perf_counter()
+
+    def products() -> Iterable[Tuple[int, Product]]:
+        for line_number, row in read_rows(path):
+            report.rows += 1
+            if isinstance(row, Exception):
+                report.add_error(line_number, f"invalid JSON: {row}")
+                continue
+            try:
+                yield line_number, build_product(row, promotions)
+            except (ValueError, TypeError, KeyError) as error:
+                report.add_error(line_number, str(error))
+
+    rows = products()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        accepted, names = [], set()
+        for line_number, product in batch:
+            if product.name in names or store.get_product(product.name) is not None:
+                report.add_error(line_number, f"duplicate product name {product.name!r}")
+                continue
+            names.add(product.name)
+            accepted.append(product)
+        store.add_products_batch(accepted)
+        report.loaded += len(accepted)
+
+    report.seconds = time.perf_counter() - start
+    return report
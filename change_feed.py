@@ -0,0 +1,158 @@
+"""
+    Change-data-capture for a store: every inventory event goes into a fixed-size ring buffer with a
+    sequence number, and any number of consumers read it at their own pace through cursors.
+
+    The buffer is preallocated as parallel columns (event, product, quantity, active flag) holding
+    references to objects that already exist (event names are interned strings), so recording an
+    event writes four slots and allocates nothing. When it is full the oldest events are
+    overwritten; writers never wait for readers. A cursor that falls more than `capacity` events behind
+    has lost events, and its overflow policy decides what happens (see FeedCursor).
+"""
+import threading
+from typing import List, Optional, Tuple
+
+from products import Product
+
+# A change: (sequence number, event, product, quantity after the event, active after the event).
+Change = Tuple[int, str, Product, int, bool]
+
+
+class FeedOverflow(Exception):
+    """
+        Raised by a cursor that fell so far behind that events it had not read were overwritten.
+        The cursor has already moved on to the oldest event still in the buffer.
+    """
+
+    def __init__(self, lost: int):
+        super().__init__(f"{lost} change events were overwritten before they were read.")
+        self.lost = lost
+
+
+class ChangeFeed:
+    """
+        Ring buffer of inventory changes, attached to a store as a listener.
+        Args:
+            capacity (int): Number of events kept. Consumers must read at least this often to see every event.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        if not isinstance(capacity, int) or capacity < 1:
+            raise ValueError("Capacity must be a positive integer.")
+        self.capacity = capacity
+        self._events: List[Optional[str]] = [None] * capacity
+        self._products: List[Optional[Product]] = [None] * capacity
+        self._quantities: List[Optional[int]] = [None] * capacity
+        self._active: List[Optional[bool]] = [None] * capacity
+        self._next = 0      # sequence number of the next event
+        self._lock = threading.Lock()
+
+    @property
+    def next_sequence(self) -> int:
+        return self._next
+
+    @property
+    def oldest_sequence(self) -> int:
+        """
+            Sequence number of the oldest event still in the buffer.
+        """
+        return max(0, self._next - self.capacity)
+
+    def __call__(self, event: str, product: Product):
+        """
+            Store listener: record the event and the product's stock after it.
+        """
+        quantity, active = product._quantity, product._active
+        # acquire()/release() instead of a with block: this runs on every purchase and is about
+        # half the cost.
+        self._lock.acquire()
+        sequence = self._next
+        slot = sequence % self.capacity
+        self._events[slot] = event
+        self._products[slot] = product
+        self._quantities[slot] = quantity
+        self._active[slot] = active
+        self._next = sequence + 1
+        self._lock.release()
+
+    def cursor(self, start: str = "latest", on_overflow: str = "raise") -> "FeedCursor":
+        """
+            Open a cursor for a consumer.
+            Args:
+                start (str): "latest" to read only events recorded from now on, or "earliest" to start
+                with the oldest event still in the buffer.
+                on_overflow (str): What a read does after events were lost, see FeedCursor.
+        """
+        if start not in ("latest", "earliest"):
+            raise ValueError("start must be 'latest' or 'earliest'.")
+        return FeedCursor(self, self._next if start == "latest" else self.oldest_sequence, on_overflow)
+
+    def _read(self, position: int, max_events: int) -> Tuple[int, List[Change]]:
+        """
+            Read up to `max_events` events from `position` on.
+            Returns:
+                Tuple[int, List[Change]]: The number of events lost before the first one returned, and the events.
+        """
+        with self._lock:
+            oldest = max(0, self._next - self.capacity)
+            lost = max(0, oldest - position)
+            start = position + lost
+            end = min(self._next, start + max_events)
+            if start >= end:
+                return lost, []
+            first, last = start % self.capacity, (end - 1) % self.capacity + 1
+            if first < last:
+                columns = (self._events[first:last], self._products[first:last],
+                           self._quantities[first:last], self._active[first:last])
+            else:   # the range wraps around the end of the buffer
+                columns = (self._events[first:] + self._events[:last], self._products[first:] + self._products[:last],
+                           self._quantities[first:] + self._quantities[:last],
+                           self._active[first:] + self._active[:last])
+        # The records are built outside the lock, so writers only wait for the slice copies.
+        events, products, quantities, active = columns
+        return lost, list(zip(range(start, end), events, products, quantities, active))
+
+
+class FeedCursor:
+    """
+        A consumer's position in a change feed. Cursors are independent of each other; each one is
+        meant to be used by a single consumer.
+        Overflow policies, for when the cursor fell behind by more than the feed's capacity:
+            "raise": the next read raises FeedOverflow (e.g. so the consumer can resync from the store),
+            then reading carries on from the oldest event still in the buffer.
+            "skip": the lost events are skipped silently and counted in `lost`.
+    """
+
+    def __init__(self, feed: ChangeFeed, position: int, on_overflow: str = "raise"):
+        if on_overflow not in ("raise", "skip"):
+            raise ValueError("on_overflow must be 'raise' or 'skip'.")
+        self.feed = feed
+        self.position = position    # sequence number of the next event to read
+        self.on_overflow = on_overflow
+        self.lost = 0
+
+    @property
+    def lag(self) -> int:
+        """
+            Number of events recorded that this cursor has not read yet.
+        """
+        return self.feed.next_sequence - self.position
+
+    def read(self, max_events: int = 1024) -> List[Change]:
+        """
+            Read the next batch of events.
+            Args:
+                max_events (int): Maximum number of events to return.
+            Returns:
+                List[Change]: (sequence, event, product, quantity, active) tuples in sequence order,
+                empty if there is nothing new.
+            Raises:
+                FeedOverflow: With the "raise" policy, if events were lost since the last read.
+        """
+        lost, changes = self.feed._read(self.position, max_events)
+        if lost:
+            self.lost += lost
+            self.position += lost
+            if self.on_overflow == "raise":
+                raise FeedOverflow(lost)
+        self.position += len(changes)
+        return changes
@@ -0,0 +1,306 @@
+from array import array
+from itertools import compress
+from typing import Dict, List, Optional
+
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import Promotion
+from store import Store
+
+# Values of the kind column.
+PRODUCT, NON_STOCKED, LIMITED = 0, 1, 2
+
+
+class _ColumnView:
+    """
+        Mixin that makes a Product read and write its state from a row of a ColumnarStore
+        instead of its own attributes. The Product methods (buy, set_quantity, show, ...) are reused unchanged.
+        Once the product is removed from the store its row is a tombstone: the view can still be read,
+        but changing it raises ValueError.
+    """
+    __slots__ = ()
+
+    def _row_for_write(self) -> int:
+        if not self._store._present[self._row]:
+            raise ValueError("Product was removed from the store.")
+        return self._row
+
+    @property
+    def name(self) -> str:
+        return self._store._names[self._row]
+
+    @property
+    def price(self) -> float:
+        return self._store._prices[self._row]
+
+    @price.setter
+    def price(self, value: float):
+        if not isinstance(value, (int, float)):
+            raise TypeError("Price must be a number.")
+        if value < 0:
+            raise ValueError("Price cannot be negative.")
+        with self._lock():
+            row = self._row_for_write()
+            self._before_change()
+            self._store._prices[row] = value
+            self._changed("price", self._quantity, self._active)
+
+    @property
+    def _quantity(self) -> int:
+        return self._store._quantities[self._row]
+
+    @_quantity.setter
+    def _quantity(self, value: int):
+        self._store._quantities[self._row_for_write()] = value
+
+    @property
+    def _active(self) -> bool:
+        return bool(self._store._active_flags[self._row])
+
+    @_active.setter
+    def _active(self, value: bool):
+        self._store._active_flags[self._row_for_write()] = value
+
+    @property
+    def promotion(self) -> Optional[Promotion]:
+        return self._store._promotions[self._store._promotion_ids[self._row]]
+
+    @promotion.setter
+    def promotion(self, value: Optional[Promotion]):
+        self._store._promotion_ids[self._row_for_write()] = self._store._promotion_id(value)
+
+    @property
+    def max_quantity(self) -> int:
+        return self._store._max_quantities[self._row]
+
+    # Two views of the same row are the same product.
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _ColumnView) and self._store is other._store and self._row == other._row
+
+    def __hash__(self) -> int:
+        return hash(self._row)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name!r} row={self._row}>"
+
+
+class ColumnarProduct(_ColumnView, Product):
+    __slots__ = ("_row",)
+
+
+class ColumnarNonStockedProduct(_ColumnView, NonStockedProduct):
+    __slots__ = ("_row",)
+
+
+class ColumnarLimitedProduct(_ColumnView, LimitedProduct):
+    __slots__ = ("_row",)
+
+
+_VIEW_CLASSES = {PRODUCT: ColumnarProduct, NON_STOCKED: ColumnarNonStockedProduct, LIMITED: ColumnarLimitedProduct}
+
+
+class ColumnarStore(Store):
+    """
+        A Store that keeps its inventory in contiguous typed arrays (one column per attribute)
+        instead of one Python object per product, for catalogs of millions of products.
+        Products handed out by the store are lightweight views on a row, created on demand,
+        that support the full Product / NonStockedProduct / LimitedProduct API.
+        Args:
+            products (List[Product], optional): Products to copy into the store.
+            The other arguments are those of Store.
+    """
+
+    def __init__(self, products: List[Product] = None, check_consistency: bool = False,
+                 quote_cache_size: int = 100_000, promotion_engine=None):
+        super().__init__(check_consistency=check_consistency, quote_cache_size=quote_cache_size,
+                         promotion_engine=promotion_engine)
+        self._names: List[str] = []
+        self._prices = array("d")
+        self._quantities = array("q")
+        self._active_flags = array("b")
+        self._present = array("b")          # 0 once a row has been removed
+        self._kinds = array("b")
+        self._max_quantities = array("q")   # 0 for products without a purchase limit
+        self._promotion_ids = array("I")    # index into self._promotions, 0 means no promotion
+        self._promotions: List[Optional[Promotion]] = [None]
+        self._promotion_index: Dict[int, int] = {}     # id(promotion) -> its index in self._promotions
+        self._rows: Dict[str, int] = {}     # name -> row
+        if products and not isinstance(products, list):
+            raise TypeError("Products must be a list.")
+        for product in products or []:
+            self.add_products(product)
+
+    def _promotion_id(self, promotion: Optional[Promotion]) -> int:
+        """
+            Get the small integer id of a promotion, registering it the first time it is seen.
+        """
+        if promotion is None:
+            return 0
+        if not isinstance(promotion, Promotion):
+            raise TypeError("Promotion must be an instance of the Promotion class.")
+        with self._state_lock:
+            # Promotions are matched by identity; the list keeps them alive, so their ids stay unique.
+            promotion_id = self._promotion_index.get(id(promotion))
+            if promotion_id is None:
+                promotion_id = self._promotion_index[id(promotion)] = len(self._promotions)
+                self._promotions.append(promotion)
+            return promotion_id
+
+    def _view(self, row: int) -> Product:
+        view = object.__new__(_VIEW_CLASSES[self._kinds[row]])
+        view._store = self
+        view._row = row
+        return view
+
+    @property
+    def products(self) -> List[Product]:
+        return [self._view(row) for row in compress(range(len(self._present)), self._present)]
+
+    def __contains__(self, product) -> bool:
+        return (isinstance(product, _ColumnView) and product._store is self
+                and bool(self._present[product._row]))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add_products(self, product: Product) -> Product:
+        """
+            Copy a product into the store.
+            Returns:
+                Product: The view on the new row, to be used with this store from now on.
+        """
+        if not isinstance(product, Product):
+            raise TypeError("Product must be an instance of the Product class")
+        if isinstance(product, LimitedProduct):
+            kind, maximum = LIMITED, product.max_quantity
+        elif isinstance(product, NonStockedProduct):
+            kind, maximum = NON_STOCKED, 0
+        else:
+            kind, maximum = PRODUCT, 0
+        promotion_id = self._promotion_id(product.promotion)
+
+        with self._state_lock:
+            if product.name in self._rows:
+                raise ValueError(f"A product named {product.name!r} is already in store inventory.")
+            row = len(self._present)
+            self._names.append(product.name)
+            self._prices.append(product.price)
+            self._quantities.append(product.get_quantity())
+            self._active_flags.append(product.is_active())
+            self._present.append(1)
+            self._kinds.append(kind)
+            self._max_quantities.append(maximum)
+            self._promotion_ids.append(promotion_id)
+            self._rows[product.name] = row
+        view = self._view(row)
+        self._notify("add", view)
+        return view
+
+    def add_products_batch(self, products: List[Product]) -> List[Product]:
+        """
+            Copy many products into the store.
+            Returns:
+                List[Product]: The views on the new rows.
+        """
+        names = set()
+        for product in products:
+            if not isinstance(product, Product):
+                raise TypeError("All items in products list must be of type Product.")
+            if product.name in self._rows or product.name in names:
+                raise ValueError(f"A product named {product.name!r} is already in store inventory.")
+            names.add(product.name)
+        return [self.add_products(product) for product in products]
+
+    def remove_product(self, product: Product):
+        """
+            Remove a product from the store. Its row is kept as an empty tombstone so other rows don't move.
+        """
+        if not isinstance(product, Product):
+            raise TypeError("Product must be an instance of the Product class.")
+        with self._locked([product]), self._state_lock:
+            if product not in self:
+                raise ValueError("Product not found in store inventory.")
+            if self._snapshots:
+                self._save_versions(product, removed=True)
+            row = product._row
+            del self._rows[self._names[row]]
+            self._present[row] = 0
+            self._active_flags[row] = 0
+            self._quantities[row] = 0
+        self._notify("remove", product)
+
+    def get_product(self, name: str) -> Optional[Product]:
+        row = self._rows.get(name)
+        return None if row is None else self._view(row)
+
+    def _snapshot_bounds(self):
+        # Rows are the catalog positions.
+        return len(self._present), len(self._rows), sum(self._quantities)
+
+    def _position(self, product: Product) -> Optional[int]:
+        if isinstance(product, _ColumnView) and product._store is self and self._present[product._row]:
+            return product._row
+        return None
+
+    def _positions(self):
+        with self._state_lock:
+            return [(self._view(row), row) for row in compress(range(len(self._present)), self._present)]
+
+    def _product_changed(self, product: Product, event: str, previous_quantity: int, was_active: bool):
+        # The view has already written the change into the columns, there is nothing else to track.
+        self._notify(event, product)
+
+    def get_total_quantity(self) -> int:
+        """
+            Get the total quantity of all products in the store, summed over the quantity column.
+        """
+        if self.check_consistency:
+            self.verify()
+        return sum(self._quantities)
+
+    def get_all_products(self) -> List[Product]:
+        """
+            Get views on all active products in the store, in the order they were added.
+        """
+        if self.check_consistency:
+            self.verify()
+        return [self._view(row) for row in compress(range(len(self._active_flags)), self._active_flags)]
+
+    def restock(self, quantities: Dict[str, int]):
+        """
+            Add stock to many products at once, without creating any product objects.
+            Restocked products become active again.
+            Args:
+                quantities (Dict[str, int]): Product name -> number of units to add.
+        """
+        rows = []
+        for name, quantity in quantities.items():
+            row = self._rows.get(name)
+            if row is None:
+                raise ValueError(f"Product {name!r} not found in store inventory.")
+            if self._kinds[row] == NON_STOCKED:
+                raise Exception("Cannot set quantity for NonStockedProduct.")
+            if not isinstance(quantity, int) or quantity < 0:
+                raise ValueError("Restock quantity must be a non-negative integer.")
+            rows.append((row, quantity))
+        with self._locked_all():
+            if self._snapshots:
+                for row, _ in rows:
+                    self._save_versions(self._view(row))
+            for row, quantity in rows:
+                self._quantities[row] += quantity
+                if self._quantities[row] > 0:
+                    self._active_flags[row] = 1
+        if self._listeners:
+            for row, _ in rows:
+                self._notify("set_quantity", self._view(row))
+
+    def verify(self):
+        """
+            Check that removed rows hold no stock and that the name index matches the present rows.
+        """
+        with self._state_lock:
+            for row, present in enumerate(self._present):
+                if not present and (self._quantities[row] or self._active_flags[row]):
+                    raise RuntimeError(f"Removed row {row} still holds stock.")
+            if sorted(self._rows.values()) != list(compress(range(len(self._present)), self._present)):
+                raise RuntimeError("Name index out of sync with the columns.")
@@ -0,0 +1,326 @@
+"""
+    Federated store: one catalog over several stock locations, each a regular Store.
+
+    Products are matched across locations by name, so the same product stocked at several locations
+    shows up once, with its stock merged. Fleet-wide queries are evaluated at every location in
+    parallel and merged by the coordinator. Order lines are routed to locations by a pluggable
+    RoutingPolicy; a line that no single location can fill is split across several of them.
+    Orders stay all-or-nothing: every location first prepares its shares of the order (checks them and
+    locks the products, see Store.prepare), and the stock is only taken once all of them have.
+"""
+import math
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from products import Product, NonStockedProduct, LimitedProduct
+from store import Store
+
+ProductKey = Union[Product, "FederatedProduct", str]
+# A location that can supply a line: (location name, its Product, units it can supply).
+Candidate = Tuple[str, Product, int]
+# A share of an order line placed at one location: (location name, product name, quantity).
+Allocation = Tuple[str, str, int]
+
+
+class FederatedProduct:
+    """
+        A product across the fleet: the Product of every location that carries it.
+        Quantities are read live from the locations.
+    """
+    __slots__ = ("name", "locations", "products")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.locations: List[str] = []
+        self.products: List[Product] = []
+
+    def __repr__(self) -> str:
+        return f"FederatedProduct({self.name!r}, locations={self.locations!r})"
+
+    @property
+    def price(self) -> float:
+        """
+            The lowest price of the product at any location.
+        """
+        return min(product.price for product in self.products)
+
+    def get_quantity(self) -> int:
+        """
+            Get the stock on hand at all locations together.
+        """
+        return sum(product.get_quantity() for product in self.products)
+
+    def get_available_quantity(self) -> int:
+        """
+            Get the quantity that can still be bought at all locations together.
+        """
+        return sum(product.get_available_quantity() for product in self.products)
+
+    def stock(self) -> Dict[str, int]:
+        """
+            Get the stock on hand at each location that carries the product.
+        """
+        return {location: product.get_quantity() for location, product in zip(self.locations, self.products)}
+
+    def show(self) -> str:
+        return f"{self.name}, Price: ${self.price}, Quantity: {self.get_quantity()} " \
+               f"at {len(self.locations)} locations"
+
+
+class RoutingPolicy(ABC):
+    """
+        Base class of all routing policies: decides which locations an order line is taken from first.
+    """
+
+    @abstractmethod
+    def rank(self, name: str, candidates: List[Candidate], destination=None) -> List[Candidate]:
+        """
+            Order the locations that can supply a line by preference.
+            Args:
+                name (str): The product name of the line.
+                candidates (List[Candidate]): (location, product, available units) of every location
+                that has the product active and in stock, in the federation's location order.
+                destination: Where the order is delivered, as passed to FederatedStore.order (may be None).
+            Returns:
+                List[Candidate]: The candidates to take stock from, most preferred first. The line is
+                filled from the first one, and split over the next ones if it doesn't have enough.
+                Candidates left out are not used.
+        """
+        pass
+
+
+class NearestFirst(RoutingPolicy):
+    """
+        Take stock from the location closest to the destination first.
+        Args:
+            positions (Dict[str, Sequence[float]]): Coordinates of each location, e.g. (x, y).
+            Locations without a position come after all others. Orders without a destination
+            keep the federation's location order.
+    """
+
+    def __init__(self, positions: Dict[str, Sequence[float]]):
+        self.positions = dict(positions)
+
+    def rank(self, name: str, candidates: List[Candidate], destination=None) -> List[Candidate]:
+        if destination is None:
+            return candidates
+
+        def distance(candidate: Candidate) -> float:
+            position = self.positions.get(candidate[0])
+            return math.inf if position is None else math.dist(position, destination)
+
+        return sorted(candidates, key=distance)     # sorted() is stable: ties keep the location order
+
+
+class BalanceStock(RoutingPolicy):
+    """
+        Take stock from the location that has the most of the product first, which evens out
+        stock levels across the fleet over time.
+    """
+
+    def rank(self, name: str, candidates: List[Candidate], destination=None) -> List[Candidate]:
+        return sorted(candidates, key=lambda candidate: candidate[2], reverse=True)
+
+
+class FederatedStore:
+    """
+        One catalog over several stores (stock locations).
+        Args:
+            locations (Dict[str, Store]): The store of each location, by location name. The order
+            of the locations is the order used when a policy doesn't prefer one over another.
+            policy (RoutingPolicy, optional): Routes order lines to locations. Defaults to taking stock
+            in location order.
+            workers (int, optional): Threads that evaluate fleet-wide queries at the locations in
+            parallel. Defaults to one per location, up to 32. 1 evaluates them one after another.
+
+        Use it as a context manager, or call close() to stop the worker threads.
+    """
+
+    def __init__(self, locations: Dict[str, Store], policy: Optional[RoutingPolicy] = None,
+                 workers: Optional[int] = None):
+        if not locations:
+            raise ValueError("A federation needs at least one location.")
+        if any(not isinstance(store, Store) for store in locations.values()):
+            raise TypeError("Every location must be a Store.")
+        if len({id(store) for store in locations.values()}) < len(locations):
+            # An order would lock the same store twice while placing its shares.
+            raise ValueError("Every location must have its own Store.")
+        if policy is not None and not isinstance(policy, RoutingPolicy):
+            raise TypeError("Policy must be a RoutingPolicy.")
+        if workers is None:
+            workers = min(32, len(locations))
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        self.locations: Dict[str, Store] = dict(locations)
+        self.policy = policy
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="federation") if workers > 1 else None
+
+    def __enter__(self) -> "FederatedStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+            Stop the worker threads. The location stores are left as they are.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def _evaluate(self, function: Callable[[Store], object]) -> List[object]:
+        """
+            Call `function` with every location's store, in parallel when there are worker threads.
+            Returns the results in location order.
+        """
+        if self._executor is None:
+            return [function(store) for store in self.locations.values()]
+        return list(self._executor.map(function, self.locations.values()))
+
+    def get_total_quantity(self) -> int:
+        """
+            Get the total quantity of all products at all locations.
+        """
+        return sum(self._evaluate(Store.get_total_quantity))
+
+    def get_all_products(self) -> List[FederatedProduct]:
+        """
+            Get every product that is active at one location or more, with its stock merged across
+            those locations. Products are listed in the order they first appear in the locations' catalogs.
+        """
+        merged: Dict[str, FederatedProduct] = {}
+        for location, products in zip(self.locations, self._evaluate(Store.get_all_products)):
+            for product in products:
+                entry = merged.get(product.name)
+                if entry is None:
+                    entry = merged[product.name] = FederatedProduct(product.name)
+                entry.locations.append(location)
+                entry.products.append(product)
+        return list(merged.values())
+
+    def get_product(self, name: str) -> Optional[FederatedProduct]:
+        """
+            Get a product by name, with every location that carries it (active or not).
+            Returns:
+                FederatedProduct: The product, or None if no location has it.
+        """
+        entry = FederatedProduct(name)
+        for location, store in self.locations.items():
+            product = store.get_product(name)
+            if product is not None:
+                entry.locations.append(location)
+                entry.products.append(product)
+        return entry if entry.products else None
+
+    def plan(self, shopping_list: List[Tuple[ProductKey, int]], destination=None) -> List[Allocation]:
+        """
+            Route an order without placing it.
+            Args:
+                shopping_list (List[Tuple[ProductKey, int]]): (product or product name, quantity) lines.
+                destination: Where the order is delivered, for the routing policy (e.g. NearestFirst).
+            Returns:
+                List[Allocation]: (location, product name, quantity) shares, line by line. A line that
+                no single location can fill has several shares.
+            Raises:
+                Exception: The exception buying a line would raise if the whole fleet were one store,
+                e.g. when the product is unknown or the fleet doesn't have enough of it.
+        """
+        return [share for shares in self._route(shopping_list, destination) for share in shares]
+
+    def _route(self, shopping_list: List[Tuple[ProductKey, int]], destination) -> List[List[Allocation]]:
+        # The shares of each line, in line order.
+        Store._check_shopping_list(shopping_list)
+        routed: List[List[Allocation]] = []
+        taken: Dict[Tuple[str, str], int] = {}      # units given to earlier lines, by (location, name)
+        ordered: Dict[str, int] = {}                # units in earlier lines, by name
+        for key, quantity in shopping_list:
+            name = key if isinstance(key, str) else getattr(key, "name", None)
+            if not isinstance(name, str):
+                raise Exception(f"This {key} is not found in store")
+            shares: List[Allocation] = []
+            remaining = quantity
+            candidates = self._rank(name, quantity, ordered.get(name, 0), taken, destination)
+            ordered[name] = ordered.get(name, 0) + quantity
+            for location, product, available in candidates:
+                share = min(remaining, available)
+                shares.append((location, name, share))
+                taken[location, name] = taken.get((location, name), 0) + share
+                remaining -= share
+                if not remaining:
+                    break
+            else:
+                raise Exception("not enough quantity in stock.")
+            routed.append(shares)
+        return routed
+
+    def _rank(self, name: str, quantity: int, ordered: int, taken: Dict[Tuple[str, str], int],
+              destination) -> List[Candidate]:
+        # `ordered` is the number of units of the product in earlier lines of the order.
+        if not isinstance(quantity, int):
+            raise TypeError("quantity must me an integer.")
+        if quantity < 1:
+            raise ValueError("quantity must be at least 1.")
+        candidates: List[Candidate] = []
+        found = active = False
+        for location, store in self.locations.items():
+            product = store.get_product(name)
+            if product is None:
+                continue
+            found = True
+            if isinstance(product, LimitedProduct) and ordered + quantity > product.max_quantity:
+                # The limit is per order, so neither repeating nor splitting a line may get around it.
+                raise ValueError(f" cannot buy more than {product.max_quantity} units of this product.")
+            if not product.is_active():
+                continue
+            active = True
+            if isinstance(product, NonStockedProduct):
+                available = quantity
+            else:
+                available = product.get_available_quantity() - taken.get((location, name), 0)
+            if available > 0:
+                candidates.append((location, product, available))
+        if not found:
+            raise Exception(f"This {name} is not found in store")
+        if not active:
+            raise Exception("product is not active")
+        if self.policy is None:
+            return candidates
+        return self.policy.rank(name, candidates, destination)
+
+    def order(self, shopping_list: List[Tuple[ProductKey, int]], destination=None) -> float:
+        """
+            Place an order across the fleet. Lines are routed by the policy and split over several
+            locations when needed (see plan()). The order is all-or-nothing: every location prepares
+            its shares first, and no stock is taken unless all of them could be prepared.
+            A line is priced as a whole at the location that supplies its first share, with that
+            location's promotion (or promotion engine), so splitting a line doesn't change its price.
+            Args:
+                shopping_list (List[Tuple[ProductKey, int]]): (product or product name, quantity) lines.
+                destination: Where the order is delivered, for the routing policy.
+            Returns:
+                float: Total cost of the order.
+            Raises:
+                Exception: Whatever plan() raises, or the exception of a share that a location could
+                not prepare (e.g. because another order took the stock in the meantime).
+        """
+        routed = self._route(shopping_list, destination)
+        shares: Dict[str, List[Tuple[Product, int]]] = {}
+        for location, name, quantity in (share for line in routed for share in line):
+            store = self.locations[location]
+            shares.setdefault(location, []).append((store.get_product(name), quantity))
+        # Locations are always prepared in the same global order, so concurrent orders can't deadlock.
+        locations = sorted(shares, key=lambda location: id(self.locations[location]))
+        with ExitStack() as stack:
+            prepared = [stack.enter_context(self.locations[location].prepare(shares[location]))
+                        for location in locations]
+            total_price = 0.0
+            for line in routed:
+                location, name, _ = line[0]
+                store = self.locations[location]
+                total_price += store.line_price(store.get_product(name), sum(share[2] for share in line))
+            # Only a failing listener can make a commit raise, after the earlier locations committed.
+            for order in prepared:
+                order.commit()
+        return total_price
@@ -0,0 +1,220 @@
+"""
+    Runtime-switchable instrumentation of the checkout hot paths:
+    - every Store entry point that prices or places orders: order, order_cents, order_batch, quote,
+      quote_cents, reserve and commit (operation = method name);
+    - "check_purchase": every per-line purchase check, whichever entry point it comes from, so
+      failures by reason and product type cover all of them;
+    - "buy": every stock take, by Product.buy or by an order (order_batch takes each product's
+      stock once per batch, so that counts once);
+    - "apply_promotion" and "apply_promotion_cents": promotion pricing, float and cents.
+
+    enable() wraps those methods to count calls, record latency histograms and count failures by
+    reason and product type. disable() puts the original methods back, so instrumentation costs
+    nothing at all while it is off. Subclasses defined after enable() are not instrumented.
+
+    Usage:
+        import instrumentation
+        instrumentation.enable()
+        ...
+        print(instrumentation.metrics.export_text())
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from products import Product
+from promotion import Promotion
+from store import Store
+
+# Upper bounds of the latency histogram buckets, in seconds (1µs to 1s, plus +Inf).
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+# Known failure messages, mapped to a short reason label.
+FAILURE_REASONS = (
+    ("not enough quantity in stock", "out_of_stock"),
+    ("product is not active", "inactive"),
+    ("cannot buy more than", "limit_exceeded"),
+    ("not found in store", "not_found"),
+)
+
+
+def failure_reason(error: Exception) -> str:
+    """
+        Get a short label for why an operation failed, e.g. "out_of_stock".
+    """
+    message = str(error)
+    for text, reason in FAILURE_REASONS:
+        if text in message:
+            return reason
+    return type(error).__name__
+
+
+class Histogram:
+    """
+        Latency histogram with fixed buckets (see LATENCY_BUCKETS).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Metrics:
+    """
+        Call counters, latency histograms and failure counters, keyed by operation and product type.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls: Counter = Counter()                       # (operation, product type) -> calls
+            self.failures: Counter = Counter()                    # (operation, reason, product type) -> failures
+            self.latency: Dict[Tuple[str, str], Histogram] = {}   # (operation, product type) -> histogram
+
+    def record(self, operation: str, product_type: str, seconds: float, error: Exception = None):
+        key = (operation, product_type)
+        with self._lock:
+            self.calls[key] += 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(seconds)
+            if error is not None:
+                self.failures[(operation, failure_reason(error), product_type)] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": [{"operation": op, "product_type": kind, "count": count}
+                          for (op, kind), count in sorted(self.calls.items())],
+                "failures": [{"operation": op, "reason": reason, "product_type": kind, "count": count}
+                             for (op, reason, kind), count in sorted(self.failures.items())],
+                "latency": [{"operation": op, "product_type": kind, "buckets": list(LATENCY_BUCKETS),
+                             "counts": list(histogram.counts), "sum_seconds": histogram.total}
+                            for (op, kind), histogram in sorted(self.latency.items())],
+            }
+
+    def export_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def export_text(self) -> str:
+        """
+            Export in the Prometheus text exposition format.
+        """
+        data = self.to_dict()
+        lines = ["# TYPE store_calls_total counter"]
+        for row in data["calls"]:
+            lines.append(f'store_calls_total{{operation="{row["operation"]}",product_type="{row["product_type"]}"}} '
+                         f'{row["count"]}')
+        lines.append("# TYPE store_failures_total counter")
+        for row in data["failures"]:
+            lines.append(f'store_failures_total{{operation="{row["operation"]}",reason="{row["reason"]}",'
+                         f'product_type="{row["product_type"]}"}} {row["count"]}')
+        lines.append("# TYPE store_latency_seconds histogram")
+        for row in data["latency"]:
+            labels = f'operation="{row["operation"]}",product_type="{row["product_type"]}"'
+            cumulative = 0
+            for bound, count in zip(list(row["buckets"]) + ["+Inf"], row["counts"]):
+                cumulative += count
+                lines.append(f'store_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"store_latency_seconds_sum{{{labels}}} {row['sum_seconds']}")
+            lines.append(f"store_latency_seconds_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+# (class, method name, original function) of every method wrapped by enable().
+_patched: List[Tuple[type, str, Callable]] = []
+# Depth of instrumented calls per thread, so nested calls of the same operation are only counted once
+# (e.g. Product.buy -> Product._take, or LimitedProduct._check_purchase -> Product._check_purchase).
+_depth = threading.local()
+
+
+def _wrap(operation: str, function: Callable, label: Callable) -> Callable:
+    def wrapper(self, *args, **kwargs):
+        depth = getattr(_depth, operation, 0)
+        if depth:
+            return function(self, *args, **kwargs)
+        setattr(_depth, operation, 1)
+        start = time.perf_counter()
+        try:
+            result = function(self, *args, **kwargs)
+        except Exception as error:
+            metrics.record(operation, label(self, args), time.perf_counter() - start, error)
+            raise
+        finally:
+            setattr(_depth, operation, 0)
+        metrics.record(operation, label(self, args), time.perf_counter() - start)
+        return result
+
+    wrapper.__wrapped__ = function
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+def _subclasses(cls: type) -> List[type]:
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(_subclasses(subclass))
+    return classes
+
+
+def _patch(cls: type, name: str, operation: str, label: Callable):
+    # Only methods a class defines itself are wrapped; inherited ones are already covered by the parent.
+    if name in cls.__dict__:
+        original = cls.__dict__[name]
+        setattr(cls, name, _wrap(operation, original, label))
+        _patched.append((cls, name, original))
+
+
+def is_enabled() -> bool:
+    return bool(_patched)
+
+
+# Store methods instrumented as operations of their own name.
+STORE_OPERATIONS = ("order", "order_cents", "order_batch", "quote", "quote_cents", "reserve", "commit")
+
+
+def enable():
+    """
+        Start instrumenting the Store entry points, purchase checks, stock takes and promotions.
+    """
+    if is_enabled():
+        return
+    for cls in _subclasses(Store):
+        for name in STORE_OPERATIONS:
+            _patch(cls, name, name, lambda store, args: type(store).__name__)
+    for cls in _subclasses(Product):
+        for name, operation in (("buy", "buy"), ("_take", "buy"), ("_check_purchase", "check_purchase")):
+            _patch(cls, name, operation, lambda product, args: type(product).__name__)
+    for cls in _subclasses(Promotion):
+        _patch(cls, "apply_promotion", "apply_promotion",
+               lambda promotion, args: f"{type(promotion).__name__}:{type(args[0]).__name__}")
+        _patch(cls, "apply_promotion_cents", "apply_promotion_cents",
+               lambda promotion, args: type(promotion).__name__)
+
+
+def disable():
+    """
+        Stop instrumenting and restore the original methods. Collected metrics are kept.
+    """
+    while _patched:
+        cls, name, original = _patched.pop()
+        setattr(cls, name, original)
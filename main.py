@@ -1,7 +1,9 @@
+import argparse
 from typing import List, Tuple
 from promotion import SecondHalfPrice, ThirdOneFree, PercentDiscount
 from store import Store
 from products import Product, NonStockedProduct, LimitedProduct
+import replay
 
 
 def display_menu():
@@ -44,7 +46,7 @@ def show_total_amount(store: Store):
 
 def make_order(store: Store):
     """
-       Prompts the user to make an order by selecting products and specifying quantities.
+       Prompts the user to make an order by searching products by name and specifying quantities.
        Args:
            store (Store): The store instance containing the products.
        Raises:
@@ -53,14 +55,22 @@ def make_order(store: Store):
     """
     print("When you want to finish order, enter empty text.")
     shopping_list: List[Tuple[Product, int]] = []
-    products = store.get_all_products()
     while True:
         try:
-            product_num = input("Which product # do you want? ")
-            if product_num == "":
+            query = input("Search for a product: ")
+            if query == "":
                 break
 
-            product_num = int(product_num)
+            # The search index finds matching active products by name (typos are tolerated),
+            # so we don't have to list the whole catalog.
+            products = store.search(query, limit=10)
+            if not products:
+                print("no matching products.")
+                continue
+            for index, product in enumerate(products):
+                print(f"{index + 1}. {product.show()}")
+
+            product_num = int(input("Which product # do you want? "))
             if product_num < 1 or product_num > len(products):
                 continue
 
@@ -105,8 +115,6 @@ def start(store: Store):
             print("------")
             continue
         if enter_choice == "3":
-            list_all_products(store)
-            print("------")
             make_order(store)
             print("------")
             continue
@@ -114,6 +122,42 @@ def start(store: Store):
             break
 
 
+def run_headless(store: Store, args: argparse.Namespace):
+    """
+        Replays recorded or synthetic orders against the store without the menu, and prints the report.
+        Args:
+            store (Store): The store instance to order from.
+            args (argparse.Namespace): The parsed command line.
+    """
+    invalid: List[str] = []    # malformed lines of the replayed log, which are skipped
+    if args.replay is not None:
+        orders = replay.read_order_log(args.replay, invalid)
+    else:
+        orders = replay.generate_orders(store, args.synthetic, seed=args.seed)
+    if args.output:
+        # Only record the orders, e.g. to replay the same traffic later or on another machine.
+        count = replay.write_order_log(args.output, orders)
+        print(f"Wrote {count} orders to {args.output}")
+        return
+    report = replay.replay(store, orders, rate=args.rate)
+    report.invalid_lines = invalid
+    print(report.summary())
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Best Buy store. Without options, starts the interactive menu.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--replay", metavar="ORDERS.jsonl", help="place the orders of a JSONL order log")
+    source.add_argument("--synthetic", type=int, metavar="COUNT", help="place COUNT generated orders")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic orders")
+    parser.add_argument("--rate", type=float, help="target orders per second (default: as fast as possible)")
+    parser.add_argument("--output", metavar="ORDERS.jsonl", help="write the synthetic orders to a log instead")
+    args = parser.parse_args(argv)
+    if args.synthetic is not None and args.synthetic < 0:
+        parser.error("--synthetic COUNT cannot be negative")
+    return args
+
+
 # setup initial stock of inventory
 product_list = [Product("MacBook Air M2", price=1450, quantity=100),
                 Product("Bose QuietComfort Earbuds", price=250, quantity=500),
@@ -135,5 +179,10 @@ product_list[3].set_promotion(thirty_percent)
 # Initialize the Store object
 best_buy = Store(product_list)
 
+
 if __name__ == "__main__":
-    start(best_buy)  # Ensure you're passing the instance, not the class
+    arguments = parse_args()
+    if arguments.replay is not None or arguments.synthetic is not None:
+        run_headless(best_buy, arguments)
+    else:
+        start(best_buy)  # Ensure you're passing the instance, not the class
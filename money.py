@@ -0,0 +1,48 @@
+"""
+    Integer-cents money: exact amounts held as whole minor units (cents).
+
+    Float prices are turned into cents once per distinct price (the conversion is cached), after
+    which promotions, order lines and totals are computed with integer arithmetic only, so totals
+    are exact and sums need no rounding. Every promotion documents how its cents result is rounded
+    (see the apply_promotion_cents methods in promotion.py).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+CENTS_PER_UNIT = 100
+_CENT = Decimal("0.01")
+
+
+@lru_cache(maxsize=1 << 16)
+def to_cents(amount) -> int:
+    """
+        Convert an amount of money (int, float, Decimal or numeric string) to whole cents.
+        A float is read as the shortest decimal that prints as it (19.99 -> 1999, not 1998),
+        and amounts with fractions of a cent are rounded to the nearest cent, halves away from zero.
+    """
+    if isinstance(amount, int):
+        return amount * CENTS_PER_UNIT
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return int(Decimal(amount).quantize(_CENT, rounding=ROUND_HALF_UP) * CENTS_PER_UNIT)
+
+
+def to_decimal(cents: int) -> Decimal:
+    """
+        The exact amount of `cents` in currency units.
+    """
+    return Decimal(cents) / CENTS_PER_UNIT
+
+
+def format_cents(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    units, rest = divmod(abs(cents), CENTS_PER_UNIT)
+    return f"{sign}${units:,}.{rest:02d}"
+
+
+def divide_half_up(numerator: int, denominator: int) -> int:
+    """
+        numerator / denominator rounded to the nearest integer, halves up. Both must be non-negative
+        (and the denominator positive). Works on numpy integer arrays too.
+    """
+    return (2 * numerator + denominator) // (2 * denominator)
@@ -0,0 +1,105 @@
+"""
+    Asyncio front end for a Store: many concurrent clients await `order()` while a single
+    consumer task drains the queue in micro-batches and places each batch with Store.order_batch,
+    so the stripe locks of the products in a batch are taken once per batch instead of once per order,
+    and the lines of the whole batch are grouped by product (one stock update per product).
+    The batch is placed on a worker thread, so the event loop keeps serving clients meanwhile.
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+from products import Product
+from store import Store
+
+
+class OrderService:
+    """
+        Queue-based order service on top of a Store.
+        Args:
+            store (Store): The store orders are placed in.
+            max_pending (int): Queue size. When it is full, order() waits (backpressure).
+            max_batch (int): Maximum number of orders placed together.
+
+        Usage:
+            async with OrderService(store) as service:
+                total = await service.order([(product, 2)])
+    """
+
+    def __init__(self, store: Store, max_pending: int = 1024, max_batch: int = 256):
+        if max_pending < 1 or max_batch < 1:
+            raise ValueError("max_pending and max_batch must be at least 1.")
+        self.store = store
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self.batches = 0    # number of batches placed, for monitoring the coalescing
+
+    async def start(self):
+        if self._consumer is not None:
+            raise RuntimeError("Order service is already running.")
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """
+            Stop after placing every order already queued.
+        """
+        if self._consumer is None:
+            return
+        await self._queue.join()
+        self._consumer.cancel()
+        try:
+            await self._consumer
+        except asyncio.CancelledError:
+            pass
+        self._consumer = None
+
+    async def __aenter__(self) -> "OrderService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        """
+            Place an order through the queue.
+            Cancelling the call before its batch is placed drops the order; once the batch is being
+            placed, the order goes through.
+            Returns:
+                float: The total cost, as Store.order would return it.
+            Raises:
+                Exception: Whatever Store.order would raise for this order.
+        """
+        if self._consumer is None:
+            raise RuntimeError("Order service is not running.")
+        # A malformed order fails here, before it can join a batch.
+        Store._check_shopping_list(shopping_list)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((shopping_list, future))
+        return await future
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            received = [await self._queue.get()]
+            while len(received) < self.max_batch and not self._queue.empty():
+                received.append(self._queue.get_nowait())
+            # Orders whose client gave up while they were queued are not placed.
+            batch = [(shopping_list, future) for shopping_list, future in received if not future.cancelled()]
+            if batch:
+                try:
+                    results = await loop.run_in_executor(
+                        None, self.store.order_batch, [shopping_list for shopping_list, _ in batch])
+                except Exception as error:  # keep the consumer alive whatever happens
+                    results = [error] * len(batch)
+                self.batches += 1
+                for (_, future), result in zip(batch, results):
+                    if not future.done():   # the client may have been cancelled meanwhile
+                        if isinstance(result, Exception):
+                            future.set_exception(result)
+                        else:
+                            future.set_result(result)
+            for _ in received:
+                self._queue.task_done()
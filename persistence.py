@@ -0,0 +1,306 @@
+"""
+    Persistence for Store inventories: a compact binary snapshot plus an append-only log of changes.
+
+    On startup the snapshot is memory-mapped and decoded in bulk, then the log written since the
+    snapshot is replayed on top of it. Every log record carries the product's full state after the
+    change (not the delta), so replaying a record twice is harmless.
+"""
+import gc
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from typing import Dict, Optional, Tuple, Type
+
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import Promotion
+from store import Store
+
+SNAPSHOT_MAGIC = b"BBSNAP02"
+# count, promotions JSON length, names blob length
+SNAPSHOT_HEADER = struct.Struct("<QQQ")
+# price, quantity, maximum, kind, active, promotion index
+SNAPSHOT_RECORD = struct.Struct("<dqqBBH")
+# length and CRC32 of the payload that follows
+LOG_FRAME = struct.Struct("<II")
+# operation, kind, active, price, quantity, maximum, name length, promotion name length
+# Quantities and limits take 64 bits and lengths 32, like the snapshot, so any product a store
+# accepts can be logged: a record that doesn't pack would fail inside the order that made it.
+LOG_RECORD = struct.Struct("<BBBdqqII")
+
+PRODUCT, NON_STOCKED, LIMITED = 0, 1, 2
+OPERATIONS = {"add": 1, "remove": 2, "buy": 3, "set_quantity": 4, "activate": 5, "deactivate": 6, "rollback": 7,
+              "price": 8, "promotion": 9}
+
+
+def _kind(product: Product) -> Tuple[int, int]:
+    """
+        Get the kind code and purchase limit of a product.
+    """
+    if isinstance(product, LimitedProduct):
+        return LIMITED, product.max_quantity
+    if isinstance(product, NonStockedProduct):
+        return NON_STOCKED, 0
+    return PRODUCT, 0
+
+
+def _build(kind: int, name: str, price: float, quantity: int, maximum: int, active: bool,
+           promotion: Optional[Promotion]) -> Product:
+    if kind == LIMITED:
+        product = LimitedProduct(name, price, quantity, maximum)
+    elif kind == NON_STOCKED:
+        product = NonStockedProduct(name, price)
+    else:
+        product = Product(name, price, quantity)
+    product._active = bool(active)
+    if promotion is not None:
+        product.set_promotion(promotion)
+    return product
+
+
+def _promotion(name: str, promotions: Dict[str, Promotion]) -> Optional[Promotion]:
+    if not name:
+        return None
+    if name not in promotions:
+        raise ValueError(f"Unknown promotion {name!r} in saved inventory.")
+    return promotions[name]
+
+
+def save_snapshot(store: Store, path: str):
+    """
+        Write all products of the store to a binary snapshot file.
+        The file is written next to `path` and renamed over it, so a crash never leaves a half-written snapshot.
+    """
+    products = store.products
+    promotion_names = [""]
+    promotion_ids = {}
+    records = bytearray()
+    name_lengths = array("I")
+    names = []
+    for product in products:
+        kind, maximum = _kind(product)
+        promotion = product.promotion
+        if promotion is None:
+            promotion_id = 0
+        else:
+            promotion_id = promotion_ids.get(promotion.name)
+            if promotion_id is None:
+                promotion_id = promotion_ids[promotion.name] = len(promotion_names)
+                promotion_names.append(promotion.name)
+        records += SNAPSHOT_RECORD.pack(product.price, product.get_quantity(), maximum, kind,
+                                        product.is_active(), promotion_id)
+        name_lengths.append(len(product.name))
+        names.append(product.name)
+    promotions_blob = json.dumps(promotion_names).encode("utf-8")
+    names_blob = "".join(names).encode("utf-8")
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(SNAPSHOT_HEADER.pack(len(products), len(promotions_blob), len(names_blob)))
+        file.write(records)
+        file.write(name_lengths.tobytes())
+        file.write(promotions_blob)
+        file.write(names_blob)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_snapshot(path: str, promotions: Optional[Dict[str, Promotion]] = None,
+                  store_class: Type[Store] = Store) -> Store:
+    """
+        Build a store from a snapshot file written by save_snapshot.
+        Args:
+            path (str): The snapshot file.
+            promotions (Dict[str, Promotion], optional): The promotions products may refer to, by name.
+            store_class (Type[Store]): The store backend to load into (e.g. ColumnarStore).
+    """
+    promotions = promotions or {}
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an inventory snapshot.")
+        offset = len(SNAPSHOT_MAGIC)
+        count, promotions_length, names_length = SNAPSHOT_HEADER.unpack_from(mapped, offset)
+        offset += SNAPSHOT_HEADER.size
+        records_end = offset + count * SNAPSHOT_RECORD.size
+        with memoryview(mapped) as view:
+            records = list(SNAPSHOT_RECORD.iter_unpack(view[offset:records_end]))
+            name_lengths = array("I")
+            name_lengths.frombytes(view[records_end:records_end + 4 * count])
+        offset = records_end + 4 * count
+        promotion_names = json.loads(mapped[offset:offset + promotions_length].decode("utf-8"))
+        offset += promotions_length
+        names = mapped[offset:offset + names_length].decode("utf-8")
+
+    promotion_table = [_promotion(name, promotions) for name in promotion_names]
+    # Millions of new objects would otherwise trigger many full garbage collection passes
+    # that find nothing to free; they account for most of the load time.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        products = []
+        start = 0
+        for (price, quantity, maximum, kind, active, promotion_id), length in zip(records, name_lengths):
+            name = names[start:start + length]
+            start += length
+            products.append(_build(kind, name, price, quantity, maximum, active, promotion_table[promotion_id]))
+        store = store_class()
+        store.add_products_batch(products)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return store
+
+
+class InventoryLog:
+    """
+        Append-only log of inventory changes, attached to a store as a listener.
+        Records are buffered and fsync'ed every `sync_every` records (and on sync()/close()),
+        so at most the last `sync_every - 1` changes can be lost in a crash.
+        Args:
+            path (str): The log file. New records are appended to it.
+            sync_every (int): Number of records per fsync.
+    """
+
+    def __init__(self, path: str, sync_every: int = 256):
+        if sync_every < 1:
+            raise ValueError("sync_every must be at least 1.")
+        self.path = path
+        self.sync_every = sync_every
+        self._file = open(path, "ab")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, event: str, product: Product):
+        """
+            Store listener: record the product's state after `event`.
+        """
+        kind, maximum = _kind(product)
+        name = product.name.encode("utf-8")
+        promotion = product.promotion.name.encode("utf-8") if product.promotion else b""
+        payload = LOG_RECORD.pack(OPERATIONS[event], kind, product.is_active(), product.price,
+                                  product.get_quantity(), maximum, len(name), len(promotion)) + name + promotion
+        frame = LOG_FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            self._file.write(frame)
+            self._pending += 1
+            if self._pending >= self.sync_every:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def sync(self):
+        """
+            Flush buffered records to disk.
+        """
+        with self._lock:
+            self._sync()
+
+    def truncate(self):
+        """
+            Empty the log, after its records have been folded into a new snapshot.
+        """
+        with self._lock:
+            self._truncate()
+
+    def _truncate(self):
+        self._file.truncate(0)
+        self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+
+def replay_log(store: Store, path: str, promotions: Optional[Dict[str, Promotion]] = None) -> int:
+    """
+        Apply the records of a log file to a store.
+        Reading stops at the first incomplete or corrupt record, which is what a crash mid-write leaves behind,
+        and that torn tail is cut off so records appended later are not hidden behind it.
+        Returns:
+            int: The number of records applied.
+    """
+    promotions = promotions or {}
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as file:
+        data = file.read()
+
+    applied = 0
+    offset = 0
+    while offset + LOG_FRAME.size <= len(data):
+        length, checksum = LOG_FRAME.unpack_from(data, offset)
+        payload = data[offset + LOG_FRAME.size:offset + LOG_FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        offset += LOG_FRAME.size + length
+
+        operation, kind, active, price, quantity, maximum, name_length, promotion_length = \
+            LOG_RECORD.unpack_from(payload)
+        name = payload[LOG_RECORD.size:LOG_RECORD.size + name_length].decode("utf-8")
+        promotion_name = payload[LOG_RECORD.size + name_length:].decode("utf-8")
+        product = store.get_product(name)
+        if operation == OPERATIONS["remove"]:
+            if product is not None:
+                store.remove_product(product)
+        elif operation == OPERATIONS["add"]:
+            if product is not None:
+                store.remove_product(product)
+            store.add_products(_build(kind, name, price, quantity, maximum, active,
+                                      _promotion(promotion_name, promotions)))
+        elif product is None:
+            pass
+        elif operation == OPERATIONS["price"]:
+            product.price = price
+        elif operation == OPERATIONS["promotion"]:
+            promotion = _promotion(promotion_name, promotions)
+            if promotion is None:
+                product.remove_promotion()
+            else:
+                product.set_promotion(promotion)
+        elif not isinstance(product, NonStockedProduct):
+            product._restore(quantity, bool(active))
+        applied += 1
+
+    if offset < len(data):
+        with open(path, "r+b") as file:
+            file.truncate(offset)
+    return applied
+
+
+def open_store(snapshot_path: str, log_path: str, promotions: Optional[Dict[str, Promotion]] = None,
+               store_class: Type[Store] = Store, sync_every: int = 256) -> Tuple[Store, InventoryLog]:
+    """
+        Restore a store from its snapshot and log, and start logging its changes.
+        Returns:
+            Tuple[Store, InventoryLog]: The store, and the log now attached to it.
+    """
+    if os.path.exists(snapshot_path):
+        store = load_snapshot(snapshot_path, promotions, store_class)
+    else:
+        store = store_class()
+    replay_log(store, log_path, promotions)
+    log = InventoryLog(log_path, sync_every)
+    store.add_listener(log)
+    return store, log
+
+
+def checkpoint(store: Store, snapshot_path: str, log: InventoryLog):
+    """
+        Write a fresh snapshot and empty the log.
+        Changes made meanwhile wait for it: orders and product changes for the store's stripe locks,
+        so no order is half in the snapshot, and any other change (e.g. an added product) for the log,
+        so its record goes to the emptied log instead of being truncated away.
+    """
+    with store._locked_all(), log._lock:
+        log._sync()
+        save_snapshot(store, snapshot_path)
+        log._truncate()
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Set, Tuple
+
+
+class PriceCache:
+    """
+        Bounded LRU cache of order line prices, keyed by (product, price, promotion, quantity, cents).
+        Entries of a product can be dropped with invalidate(product) when its price or promotion changes.
+        Args:
+            maxsize (int): Maximum number of cached line prices. 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        if maxsize < 0:
+            raise ValueError("maxsize cannot be negative.")
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple, float]" = OrderedDict()
+        self._keys_by_product: Dict[object, Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def line_price(self, product, quantity: int, cents: bool = False):
+        """
+            Get the price of `quantity` units of `product`, computing it only on a cache miss.
+            With cents=True the price is the exact integer number of cents instead of a float.
+        """
+        key = (product, product.price, product.promotion, quantity, cents)
+        with self._lock:
+            price = self._entries.get(key)
+            if price is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return price
+            self.misses += 1
+        price = product._line_price_cents(quantity) if cents else product._line_price(quantity)
+        if self.maxsize:
+            with self._lock:
+                self._entries[key] = price
+                self._keys_by_product.setdefault(product, set()).add(key)
+                if len(self._entries) > self.maxsize:
+                    oldest, _ = self._entries.popitem(last=False)
+                    self._forget(oldest)
+        return price
+
+    def _forget(self, key: Tuple):
+        keys = self._keys_by_product.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_product[key[0]]
+
+    def invalidate(self, product):
+        """
+            Drop every cached line price of a product.
+        """
+        with self._lock:
+            for key in self._keys_by_product.pop(product, ()):
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_product.clear()
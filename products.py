@@ -1,6 +1,10 @@
+from contextlib import nullcontext
 from typing import Optional
+from money import to_cents
 from promotion import Promotion
 
+_UNLOCKED = nullcontext()   # the "lock" of a product that is not in a store
+
 
 class Product:
     """
@@ -10,6 +14,9 @@ class Product:
             price (float): The price of the product.
             quantity (int): The quantity of the product in stock.
     """
+    # __slots__ instead of a per-instance __dict__ keeps every product small,
+    # which adds up with catalogs of millions of products.
+    __slots__ = ("name", "_price", "_quantity", "_active", "promotion", "_store")
 
     def __init__(self, name: str, price: float, quantity: int):
         # The name, price, and quantity parameters annotate with their types,
@@ -27,18 +34,110 @@ class Product:
         if quantity < 0:
             raise ValueError("Quantity cannot be negative.")
 
+        self._store = None  # The Store that owns this product, notified whenever its stock changes.
         self.name = name
-        self.price = price
+        self._price = price
         self._quantity = quantity  # Use a private variable to avoid conflict
-        self.active = True
+        self._active = True
         self.promotion: Optional[Promotion] = None
 
+    def __getstate__(self) -> dict:
+        # A pickled product is detached from its store: the store (and its locks) is not pickled with it.
+        return {name: getattr(self, name) for cls in type(self).__mro__
+                for name in cls.__dict__.get("__slots__", ()) if name != "_store"}
+
+    def __setstate__(self, state: dict):
+        self._store = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def _lock(self):
+        """
+            The lock held while this product changes: its stripe lock in the owning store (see Store._locked),
+            so direct changes don't interleave with orders, reservations or snapshots.
+        """
+        store = self._store
+        return _UNLOCKED if store is None else store._stripe(self)
+
+    def _before_change(self):
+        """
+            Let the open snapshots of the owning store keep the current state before it changes.
+        """
+        store = self._store
+        if store is not None and store._snapshots:
+            store._save_versions(self)
+
+    def _changed(self, event: str, previous_quantity: int, was_active: bool):
+        """
+            Tell the owning store (if any) that the quantity or active state of this product changed.
+            Args:
+                event (str): What caused the change ("buy", "set_quantity", "activate", "deactivate", "rollback",
+                "price" or "promotion").
+                previous_quantity (int): The quantity before the change.
+                was_active (bool): The active state before the change.
+        """
+        if self._store is not None:
+            self._store._product_changed(self, event, previous_quantity, was_active)
+
+    def _restore(self, quantity: int, active: bool):
+        """
+            Put back a previously saved quantity and active state, e.g. to roll back a failed order.
+        """
+        self._before_change()
+        previous_quantity, was_active = self._quantity, self._active
+        self._quantity = quantity
+        self._active = active
+        self._changed("rollback", previous_quantity, was_active)
+
+    @property
+    def price(self) -> float:
+        return self._price
+
+    @price.setter
+    def price(self, price: float):
+        if not isinstance(price, (int, float)):
+            raise TypeError("Price must be a number.")
+        if price < 0:
+            raise ValueError("Price cannot be negative.")
+        with self._lock():
+            self._before_change()
+            self._price = price
+            self._changed("price", self._quantity, self._active)
+
+    @property
+    def price_cents(self) -> int:
+        """
+            The price in whole cents (see money.to_cents), for exact integer arithmetic.
+        """
+        return to_cents(self.price)
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @active.setter
+    def active(self, value: bool):
+        # Assigning to product.active goes through activate()/deactivate() so the store is kept in sync.
+        if value:
+            self.activate()
+        else:
+            self.deactivate()
+
     def get_quantity(self) -> int:  # Getter method for quantity
         """
-            Get the quantity of the product in stock
+            Get the quantity of the product in stock (on hand), including units held by reservations.
         """
         return self._quantity
 
+    def get_available_quantity(self) -> int:
+        """
+            Get the quantity that can still be bought: the stock on hand minus the units held
+            by reservations (see Store.reserve).
+        """
+        if self._store is None:
+            return self._quantity
+        return self._quantity - self._store._holds.held(self)
+
     def set_quantity(self, quantity: int):  # Setter method for quantity
         """
             Set the quantity of the product in stock.
@@ -47,8 +146,12 @@ class Product:
             raise TypeError("Quantity must be an integer.")
         if quantity < 0:
             raise ValueError("Not possible, quantity cannot be negative.")
-        self._quantity = quantity
-        self.active = self._quantity > 0
+        with self._lock():
+            self._before_change()
+            previous_quantity, was_active = self._quantity, self._active
+            self._quantity = quantity
+            self._active = self._quantity > 0
+            self._changed("set_quantity", previous_quantity, was_active)
 
     def is_active(self) -> bool:
         """
@@ -56,19 +159,27 @@ class Product:
             Returns:
                 bool: True if the product is active, False otherwise.
         """
-        return self.active
+        return self._active
 
     def activate(self):
         """
             Activate the product, making it available for sale.
         """
-        self.active = True
+        with self._lock():
+            self._before_change()
+            was_active = self._active
+            self._active = True
+            self._changed("activate", self._quantity, was_active)
 
     def deactivate(self):
         """
             Deactivate the product, making it unavailable for sale.
         """
-        self.active = False
+        with self._lock():
+            self._before_change()
+            was_active = self._active
+            self._active = False
+            self._changed("deactivate", self._quantity, was_active)
 
     def show(self) -> str:
         """
@@ -85,53 +196,96 @@ class Product:
     def set_promotion(self, promotion: Promotion):
         # promotion: Promotion: expects an object of the Promotion class (or any subclass of Promotion).
         # It represents the promotion that we want to apply to the product.
-        self.promotion = promotion
-        # this method "attaches" a specific promotion to the product.
+        with self._lock():
+            self._before_change()
+            self.promotion = promotion
+            # this method "attaches" a specific promotion to the product.
+            self._changed("promotion", self._quantity, self._active)
 
     def remove_promotion(self):
-        self.promotion = None
+        with self._lock():
+            self._before_change()
+            self.promotion = None
+            self._changed("promotion", self._quantity, self._active)
 
-    def buy(self, quantity) -> float:
+    def _check_purchase(self, quantity, already_taken: int = 0, ordered: int = 0):
         """
-            Buy a specified quantity of the product.
+            Check that `quantity` units can be bought, without buying them.
             Args:
                 quantity (int): The number of units to buy.
-
-            Returns:
-                float: The total price of the purchase.
+                already_taken (int): Units taken by earlier lines of the same order (or earlier orders
+                of the same batch), which are not in stock anymore by the time this line is bought.
+                Units held by other customers' reservations cannot be bought either.
+                ordered (int): Units in earlier lines of the same order, for per-order limits
+                (see LimitedProduct).
             Raises:
-                Exception: If the product is not active
-                or if there is not enough quantity in stock.
+                Exception: The same exceptions buy() would raise.
         """
         if not isinstance(quantity, int):
             raise TypeError("quantity must me an integer.")
-        if not self.active:  # Ensures that the product is available for sale
+        available = self.get_available_quantity()
+        if not self._active or (already_taken and already_taken >= available):
+            # Ensures that the product is available for sale
             raise Exception("product is not active")
-        if not self.active:
-            raise Exception("product is not active.")
         if quantity < 1:
             raise ValueError("quantity must be at least 1.")
-        if quantity > self._quantity:
+        if quantity > available - already_taken:
             # Ensures that there is enough stock to fulfill the purchase request.
             raise Exception("not enough quantity in stock.")
 
+    def _line_price(self, quantity: int) -> float:
+        """
+            The price of `quantity` units, with the promotion applied if there is one.
+        """
         if self.promotion:
             # Calculate the price using the promotion
-            total_price = self.promotion.apply_promotion(self, quantity)
-        else:
-            # Regular price calculation
-            total_price = self.price * quantity
+            return self.promotion.apply_promotion(self, quantity)
+        # Regular price calculation
+        return self.price * quantity
+
+    def _line_price_cents(self, quantity: int) -> int:
+        """
+            The price of `quantity` units in cents, with the promotion's integer rounding rule applied.
+        """
+        price_cents = to_cents(self.price)     # not self.price_cents: this is on the order path
+        if self.promotion:
+            return self.promotion.apply_promotion_cents(price_cents, quantity)
+        return price_cents * quantity
+
+    def buy(self, quantity) -> float:
+        """
+            Buy a specified quantity of the product.
+            Args:
+                quantity (int): The number of units to buy.
+
+            Returns:
+                float: The total price of the purchase.
+            Raises:
+                Exception: If the product is not active
+                or if there is not enough quantity in stock.
+        """
+        with self._lock():
+            self._check_purchase(quantity)
+            total_price = self._line_price(quantity)
+            self._take(quantity)
+        return total_price
 
+    def _take(self, quantity: int):
+        """
+            Take `quantity` units out of stock. The caller has already checked the purchase.
+        """
+        self._before_change()
+        previous_quantity, was_active = self._quantity, self._active
         self._quantity -= quantity  # Updates the stock
         if self._quantity == 0:
-            self.deactivate()
-        # or this way:
-        # Use the set_quantity method to update the stock and automatically deactivate the product if necessary
-        #     self.set_quantity(self._quantity - quantity)
-        return total_price
+            self._active = False
+        # A single notification covers both the stock change and the deactivation.
+        self._changed("buy", previous_quantity, was_active)
 
 
 class NonStockedProduct(Product):
+    __slots__ = ()
+
     def __init__(self, name: str, price: float):
         """
             Initialize a NonStockedProduct with name and price.
@@ -145,17 +299,32 @@ class NonStockedProduct(Product):
         """
         raise Exception("Cannot set quantity for NonStockedProduct.")
 
-    def buy(self, quantity: int) -> float:
+    def _check_purchase(self, quantity, already_taken: int = 0, ordered: int = 0):
         """
-            Override buy method to allow purchasing any quantity,
-            since we don't track stock.
+            Any quantity can be bought, since we don't track stock.
         """
         if not isinstance(quantity, int):
             raise TypeError("quantity must me an integer.")
         if quantity < 1:
             raise ValueError("quantity must be at least 1.")
+
+    def _line_price(self, quantity: int) -> float:
         return self.price * quantity
 
+    def _line_price_cents(self, quantity: int) -> int:
+        return to_cents(self.price) * quantity
+
+    def _take(self, quantity: int):
+        pass    # There is no stock to take.
+
+    def buy(self, quantity: int) -> float:
+        """
+            Override buy method to allow purchasing any quantity,
+            since we don't track stock.
+        """
+        self._check_purchase(quantity)
+        return self._line_price(quantity)
+
     def show(self) -> str:
         """
             Show the details of the NonStockedProduct.
@@ -164,6 +333,8 @@ class NonStockedProduct(Product):
 
 
 class LimitedProduct(Product):
+    __slots__ = ("max_quantity",)
+
     def __init__(self, name: str, price: float, quantity: int, maximum: int):
         """
             Initialize a LimitedProduct with name, price, and max_quantity.
@@ -181,24 +352,20 @@ class LimitedProduct(Product):
 
         self.max_quantity = maximum     # Set the maximum purchase limit
 
-    def buy(self, quantity) -> float:
-        # The method is expected to return a float, which will be the total price of the purchase.
+    def _check_purchase(self, quantity, already_taken: int = 0, ordered: int = 0):
         """
-            Override buy method to limit the purchase quantity.
+            Limit the purchase quantity, then run the regular checks.
+            Product.buy calls this, so buy() enforces the limit too. The limit is per order:
+            lines repeating the product in one order count together.
         """
         if not isinstance(quantity, int):
             raise TypeError("quantity must me an integer.")
         if quantity < 1:
             raise ValueError("quantity must be at least 1.")
-        if quantity > self.max_quantity:
+        if ordered + quantity > self.max_quantity:
             # This checks if the quantity requested is greater than the allowed max_quantity for this product.
             raise ValueError(f" cannot buy more than {self.max_quantity} units of this product.")
-
-        return super().buy(quantity)
-        # super().buy(quantity) is called, which runs the buy method in Product.
-        # The Product class's buy method subtracts the quantity from the stock,
-        # calculates the total price, and returns it. This result (the total price) is then
-        # returned by the buy method of LimitedProduct as well.
+        super()._check_purchase(quantity, already_taken)
 
     def show(self) -> str:
         """
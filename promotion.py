@@ -1,9 +1,44 @@
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from fractions import Fraction
+from types import SimpleNamespace
+
+from money import divide_half_up, to_cents
+
+try:
+    import numpy as np
+except ImportError:     # numpy is only needed for the batch pricing API
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Batch pricing requires numpy (pip install numpy).")
 
 
 class Promotion(ABC):
+    """
+        Base class of all promotions.
+        Promotions are immutable once created, so one promotion object can safely be shared by many products.
+    """
+    __slots__ = ("name",)
+
     def __init__(self, name: str):
-        self.name = name
+        object.__setattr__(self, "name", name)
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, attribute):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __getstate__(self) -> dict:
+        return {name: getattr(self, name) for cls in type(self).__mro__ for name in cls.__dict__.get("__slots__", ())}
+
+    def __setstate__(self, state: dict):
+        # Unpickling has to bypass __setattr__, like __init__ does.
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
 
     @abstractmethod
     def apply_promotion(self, product, quantity: int) -> float:
@@ -12,14 +47,57 @@ class Promotion(ABC):
         """
         pass
 
+    def apply_promotion_cents(self, price_cents: int, quantity: int) -> int:
+        """
+            Apply the promotion to a unit price in cents and return the line total in cents.
+            Rounding: promotions without an integer formula price the line with apply_promotion and
+            round the result to the nearest cent, halves up.
+        """
+        return to_cents(self.apply_promotion(SimpleNamespace(price=price_cents / 100), quantity))
+
+    def apply_promotion_cents_batch(self, prices_cents, quantities):
+        """
+            apply_promotion_cents for many lines at once.
+            Args:
+                prices_cents (array-like of int): The unit price of each line, in cents.
+                quantities (array-like of int): The quantity of each line.
+            Returns:
+                numpy.ndarray: The int64 total of each line in cents, equal to what apply_promotion_cents returns.
+        """
+        _require_numpy()
+        prices_cents = np.asarray(prices_cents, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        return np.array([self.apply_promotion_cents(price, quantity)
+                         for price, quantity in zip(prices_cents.tolist(), quantities.tolist())], dtype=np.int64)
+
+    def apply_promotion_batch(self, prices, quantities):
+        """
+            Apply the promotion to many (price, quantity) lines at once.
+            Args:
+                prices (array-like of float): The unit price of each line.
+                quantities (array-like of int): The quantity of each line.
+            Returns:
+                numpy.ndarray: The total price of each line, equal to what apply_promotion returns for it.
+        """
+        # Fallback for promotions without a vectorized formula: price each line with the scalar method.
+        _require_numpy()
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        return np.array([self.apply_promotion(SimpleNamespace(price=price), int(quantity))
+                         for price, quantity in zip(prices.tolist(), quantities.tolist())], dtype=np.float64)
+
 
 class PercentDiscount(Promotion):
     """
         This will apply a percentage discount to the total price.
     """
+    __slots__ = ("percent", "_kept")
+
     def __init__(self, name: str, percent: float):
         super().__init__(name)
-        self.percent = percent
+        object.__setattr__(self, "percent", percent)
+        # The share of the price that is charged, as an exact fraction, for the cents formulas.
+        object.__setattr__(self, "_kept", 1 - Fraction(str(percent)) / 100)
 
     def apply_promotion(self, product, quantity: int) -> float:
         # product: instance of the Product class. represents the product to which promotion is being applied.
@@ -32,11 +110,44 @@ class PercentDiscount(Promotion):
         return (product.price * quantity) - discount
         # The result is the final price after applying the discount.
 
+    def apply_promotion_batch(self, prices, quantities):
+        _require_numpy()
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        # Same operations in the same order as apply_promotion, so the results are bit-for-bit equal.
+        discount = (self.percent / 100) * prices * quantities
+        return (prices * quantities) - discount
+
+    def apply_promotion_cents(self, price_cents: int, quantity: int) -> int:
+        """
+            Rounding: the line is charged exactly (100 - percent)% of its full price, rounded once to the
+            nearest cent, halves up. The discount is taken from the line total, not from each unit.
+        """
+        return self.discount_cents(price_cents * quantity)
+
+    def discount_cents(self, total_cents: int) -> int:
+        """
+            Apply the discount to an amount in cents, with the rounding of apply_promotion_cents.
+        """
+        return divide_half_up(total_cents * self._kept.numerator, self._kept.denominator)
+
+    def apply_promotion_cents_batch(self, prices_cents, quantities):
+        _require_numpy()
+        prices_cents = np.asarray(prices_cents, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        # divide_half_up needs 2 * (total * numerator) + denominator to fit in int64, or numpy wraps around
+        # silently. A float percent like 100/3 has a huge exact fraction: such lines are priced with Python ints.
+        largest_total = int(prices_cents.max(initial=0)) * int(quantities.max(initial=0))
+        if 2 * (largest_total * self._kept.numerator + self._kept.denominator) > np.iinfo(np.int64).max:
+            return super().apply_promotion_cents_batch(prices_cents, quantities)
+        return divide_half_up(prices_cents * quantities * self._kept.numerator, self._kept.denominator)
+
 
 class SecondHalfPrice(Promotion):
     """
         This will give the second item in a pair at half price.
     """
+    __slots__ = ()
 
     def __init__(self, name: str):
         super().__init__(name)
@@ -51,11 +162,37 @@ class SecondHalfPrice(Promotion):
             full_price_items = quantity - half_price_items
             return (product.price * full_price_items) + (half_price_items * product.price / 2)
 
+    def apply_promotion_batch(self, prices, quantities):
+        _require_numpy()
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        # A single unit has no half price items, so the general formula already gives the full price.
+        half_price_items = quantities // 2
+        full_price_items = quantities - half_price_items
+        return (prices * full_price_items) + (half_price_items * prices / 2)
+
+    def apply_promotion_cents(self, price_cents: int, quantity: int) -> int:
+        """
+            Rounding: the half price units are priced together at exactly half their full price,
+            rounded once to the nearest cent, halves up (two units at 9.99 cost 14.99: 9.99 + 5.00).
+        """
+        half_price_items = quantity // 2
+        return price_cents * (quantity - half_price_items) + divide_half_up(price_cents * half_price_items, 2)
+
+    def apply_promotion_cents_batch(self, prices_cents, quantities):
+        _require_numpy()
+        prices_cents = np.asarray(prices_cents, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        half_price_items = quantities // 2
+        return prices_cents * (quantities - half_price_items) + divide_half_up(prices_cents * half_price_items, 2)
+
 
 class ThirdOneFree(Promotion):
     """
         This will give one item free for every two items purchased.
     """
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
 
@@ -63,3 +200,81 @@ class ThirdOneFree(Promotion):
         free_items = quantity // 3
         payable_items = quantity - free_items
         return payable_items * product.price
+
+    def apply_promotion_batch(self, prices, quantities):
+        _require_numpy()
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        free_items = quantities // 3
+        payable_items = quantities - free_items
+        return payable_items * prices
+
+    def apply_promotion_cents(self, price_cents: int, quantity: int) -> int:
+        """
+            Rounding: none needed, every paid unit costs exactly the unit price.
+        """
+        return (quantity - quantity // 3) * price_cents
+
+    def apply_promotion_cents_batch(self, prices_cents, quantities):
+        _require_numpy()
+        quantities = np.asarray(quantities, dtype=np.int64)
+        return (quantities - quantities // 3) * np.asarray(prices_cents, dtype=np.int64)
+
+
+def apply_promotions_batch(lines):
+    """
+        Price many order lines with mixed promotions.
+        Lines are grouped by their product's promotion and each group is priced with one
+        apply_promotion_batch call. Lines without a promotion cost price * quantity.
+        Args:
+            lines (Iterable[Tuple[Product, int]]): (product, quantity) pairs.
+        Returns:
+            numpy.ndarray: The total price of each line, in the same order as the lines.
+    """
+    _require_numpy()
+    groups = defaultdict(list)   # promotion (or None) -> indexes of its lines
+    prices, quantities = [], []
+    for index, (product, quantity) in enumerate(lines):
+        groups[product.promotion].append(index)
+        prices.append(product.price)
+        quantities.append(quantity)
+    prices = np.array(prices, dtype=np.float64)
+    quantities = np.array(quantities, dtype=np.int64)
+
+    totals = np.empty(len(prices), dtype=np.float64)
+    for promotion, indexes in groups.items():
+        indexes = np.array(indexes, dtype=np.intp)
+        if promotion is None:
+            totals[indexes] = prices[indexes] * quantities[indexes]
+        else:
+            totals[indexes] = promotion.apply_promotion_batch(prices[indexes], quantities[indexes])
+    return totals
+
+
+def apply_promotions_cents_batch(lines):
+    """
+        Price many order lines with mixed promotions in integer cents, like apply_promotions_batch.
+        Args:
+            lines (Iterable[Tuple[Product, int]]): (product, quantity) pairs.
+        Returns:
+            numpy.ndarray: The int64 total of each line in cents, in the same order as the lines.
+            Their sum is the exact order total.
+    """
+    _require_numpy()
+    groups = defaultdict(list)
+    prices, quantities = [], []
+    for index, (product, quantity) in enumerate(lines):
+        groups[product.promotion].append(index)
+        prices.append(to_cents(product.price))
+        quantities.append(quantity)
+    prices = np.array(prices, dtype=np.int64)
+    quantities = np.array(quantities, dtype=np.int64)
+
+    totals = np.empty(len(prices), dtype=np.int64)
+    for promotion, indexes in groups.items():
+        indexes = np.array(indexes, dtype=np.intp)
+        if promotion is None:
+            totals[indexes] = prices[indexes] * quantities[indexes]
+        else:
+            totals[indexes] = promotion.apply_promotion_cents_batch(prices[indexes], quantities[indexes])
+    return totals
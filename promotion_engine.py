@@ -0,0 +1,255 @@
+"""
+    Promotion engine: many Promotion rules, each limited to some products, some categories or the whole
+    catalog, and optionally to a time window. For every order line it finds the best deal among the
+    rules that apply, without scanning rules that target other products or categories.
+
+    Exclusive rules compete: the cheapest one wins (the product's own promotion competes too).
+    Stackable rules (percentage discounts only) are applied on top of the winner.
+    Products that are never discounted (NonStockedProduct) keep their regular price.
+"""
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from products import NonStockedProduct
+from promotion import Promotion, PercentDiscount
+
+
+class PromotionRule:
+    """
+        A promotion together with where and when it applies.
+        Args:
+            promotion (Promotion): Any Promotion, e.g. PercentDiscount, SecondHalfPrice or ThirdOneFree.
+            products (Iterable[str], optional): Names of the products it applies to.
+            categories (Iterable[str], optional): Categories it applies to.
+            starts_at (float, optional): Start of the active window (epoch seconds), inclusive.
+            ends_at (float, optional): End of the active window (epoch seconds), exclusive.
+            stackable (bool): Whether it can be combined with other rules. Only PercentDiscount can stack.
+        Without products and categories the rule applies to every product.
+    """
+    __slots__ = ("promotion", "products", "categories", "starts_at", "ends_at", "stackable")
+
+    def __init__(self, promotion: Promotion, products: Iterable[str] = None, categories: Iterable[str] = None,
+                 starts_at: float = None, ends_at: float = None, stackable: bool = False):
+        if not isinstance(promotion, Promotion):
+            raise TypeError("promotion must be an instance of the Promotion class.")
+        if stackable and not isinstance(promotion, PercentDiscount):
+            raise ValueError("Only percentage discounts can be stacked.")
+        if starts_at is not None and ends_at is not None and ends_at <= starts_at:
+            raise ValueError("ends_at must be after starts_at.")
+        self.promotion = promotion
+        self.products = frozenset(products or ())
+        self.categories = frozenset(categories or ())
+        self.starts_at = float("-inf") if starts_at is None else starts_at
+        self.ends_at = float("inf") if ends_at is None else ends_at
+        self.stackable = stackable
+
+    def is_active_at(self, moment: float) -> bool:
+        return self.starts_at <= moment < self.ends_at
+
+    def __repr__(self) -> str:
+        return f"<PromotionRule {self.promotion.name!r}>"
+
+
+class _RuleList:
+    """
+        The rules of one index key, bucketed by time: a scheduled rule is stored in every time bucket its window
+        overlaps, so a lookup only looks at rules that are active around that moment.
+        Rules without a window, or with a window longer than `max_buckets` buckets, are kept in
+        separate lists that every lookup checks.
+    """
+    __slots__ = ("bucket_seconds", "max_buckets", "always", "long", "buckets")
+
+    def __init__(self, bucket_seconds: float, max_buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.always: List[PromotionRule] = []
+        self.long: List[PromotionRule] = []
+        self.buckets: Dict[int, List[PromotionRule]] = {}
+
+    def _bucket_range(self, rule: PromotionRule) -> Optional[range]:
+        if rule.starts_at == float("-inf") or rule.ends_at == float("inf"):
+            return None
+        first = math.floor(rule.starts_at / self.bucket_seconds)
+        last = math.ceil(rule.ends_at / self.bucket_seconds)
+        return range(first, last) if last - first <= self.max_buckets else None
+
+    def add(self, rule: PromotionRule):
+        buckets = self._bucket_range(rule)
+        if buckets is not None:
+            for bucket in buckets:
+                self.buckets.setdefault(bucket, []).append(rule)
+        elif rule.starts_at == float("-inf") and rule.ends_at == float("inf"):
+            self.always.append(rule)
+        else:
+            self.long.append(rule)
+
+    def remove(self, rule: PromotionRule):
+        buckets = self._bucket_range(rule)
+        if buckets is not None:
+            for bucket in buckets:
+                self.buckets[bucket].remove(rule)
+                if not self.buckets[bucket]:
+                    del self.buckets[bucket]
+        elif rule in self.always:
+            self.always.remove(rule)
+        else:
+            self.long.remove(rule)
+
+    def active_at(self, moment: float) -> Iterable[PromotionRule]:
+        yield from self.always
+        for rule in self.long:
+            if rule.is_active_at(moment):
+                yield rule
+        for rule in self.buckets.get(math.floor(moment / self.bucket_seconds), ()):
+            if rule.is_active_at(moment):
+                yield rule
+
+
+class Deal:
+    """
+        The outcome of pricing a line: its total and the rules that produced it (empty at regular price).
+    """
+    __slots__ = ("total", "rules")
+
+    def __init__(self, total: float, rules: Tuple[PromotionRule, ...]):
+        self.total = total
+        self.rules = rules
+
+    def __repr__(self) -> str:
+        return f"<Deal total={self.total} rules={list(self.rules)}>"
+
+
+class PromotionEngine:
+    """
+        Indexed collection of promotion rules that prices order lines with the best deal.
+        Args:
+            categories (Dict[str, str], optional): Product name -> category.
+            bucket_seconds (float): Width of the time buckets scheduled rules are indexed by (default one day).
+            max_buckets (int): Rules spanning more buckets than this are checked on every lookup instead.
+    """
+
+    def __init__(self, categories: Dict[str, str] = None, bucket_seconds: float = 86400, max_buckets: int = 31):
+        if bucket_seconds <= 0 or max_buckets < 1:
+            raise ValueError("bucket_seconds must be positive and max_buckets at least 1.")
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.categories: Dict[str, str] = dict(categories or {})
+        self._by_product: Dict[str, _RuleList] = {}
+        self._by_category: Dict[str, _RuleList] = {}
+        self._everywhere = self._new_list()
+        self._rules: Set[PromotionRule] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def set_category(self, product_name: str, category: Optional[str]):
+        if category is None:
+            self.categories.pop(product_name, None)
+        else:
+            self.categories[product_name] = category
+
+    def _new_list(self) -> _RuleList:
+        return _RuleList(self.bucket_seconds, self.max_buckets)
+
+    def _lists(self, rule: PromotionRule, create: bool) -> List[_RuleList]:
+        if not rule.products and not rule.categories:
+            return [self._everywhere]
+        lists = []
+        for index, keys in ((self._by_product, rule.products), (self._by_category, rule.categories)):
+            for key in keys:
+                if create:
+                    if key not in index:
+                        index[key] = self._new_list()
+                    lists.append(index[key])
+                elif key in index:
+                    lists.append(index[key])
+        return lists
+
+    def add_rule(self, rule: PromotionRule) -> PromotionRule:
+        """
+            Raises:
+                ValueError: If the rule was already added.
+        """
+        with self._lock:
+            if rule in self._rules:
+                raise ValueError("Rule is already in the promotion engine.")
+            for rule_list in self._lists(rule, create=True):
+                rule_list.add(rule)
+            self._rules.add(rule)
+        return rule
+
+    def remove_rule(self, rule: PromotionRule):
+        """
+            Raises:
+                ValueError: If the rule is not in the engine. Nothing is changed then.
+        """
+        with self._lock:
+            if rule not in self._rules:
+                raise ValueError("Rule not found in the promotion engine.")
+            for rule_list in self._lists(rule, create=False):
+                rule_list.remove(rule)
+            self._rules.remove(rule)
+
+    def applicable_rules(self, product, moment: float = None) -> List[PromotionRule]:
+        """
+            Get the rules that apply to a product at a moment (default: now).
+            Only the rules indexed under the product's name, its category, or the whole catalog are looked at.
+        """
+        moment = time.time() if moment is None else moment
+        rules = {}
+        # The lock keeps add_rule/remove_rule from changing the lists while they are read.
+        with self._lock:
+            lists = [self._everywhere, self._by_product.get(product.name)]
+            category = self.categories.get(product.name)
+            if category is not None:
+                lists.append(self._by_category.get(category))
+            for rule_list in lists:
+                if rule_list is not None:
+                    for rule in rule_list.active_at(moment):
+                        rules[id(rule)] = rule   # a rule can be indexed under both the product and its category
+        return list(rules.values())
+
+    def best_deal(self, product, quantity: int, moment: float = None, cents: bool = False) -> Deal:
+        """
+            Find the cheapest price for `quantity` units of a product.
+            With cents=True, all candidates are priced in integer cents with the promotions'
+            rounding rules, and a stacked discount rounds the running total the same way.
+            A product that ignores promotions (NonStockedProduct) gets no rules either.
+            Returns:
+                Deal: The total and the rules applied.
+        """
+        # The product's own price (with its promotion, if it takes one) is the deal to beat.
+        if cents:
+            def line_price(promotion):
+                return promotion.apply_promotion_cents(product.price_cents, quantity)
+            best_total = product._line_price_cents(quantity)
+        else:
+            def line_price(promotion):
+                return promotion.apply_promotion(product, quantity)
+            best_total = product._line_price(quantity)
+        best_rules = ()
+        if isinstance(product, NonStockedProduct):
+            return Deal(best_total, best_rules)
+        stack = []
+        for rule in self.applicable_rules(product, moment):
+            if rule.stackable:
+                stack.append(rule)
+                continue
+            total = line_price(rule.promotion)
+            if total < best_total:
+                best_total, best_rules = total, (rule,)
+        for rule in stack:
+            if cents:
+                best_total = rule.promotion.discount_cents(best_total)
+            else:
+                best_total -= best_total * rule.promotion.percent / 100
+        return Deal(best_total, best_rules + tuple(stack))
+
+    def price(self, product, quantity: int, moment: float = None) -> float:
+        return self.best_deal(product, quantity, moment).total
+
+    def price_cents(self, product, quantity: int, moment: float = None) -> int:
+        return self.best_deal(product, quantity, moment, cents=True).total
@@ -0,0 +1,164 @@
+"""
+    Headless order replay: stream a recorded or synthetic order log through Store.order and measure
+    throughput, latency and failures.
+
+    An order log is a JSONL file with one order per line:
+        {"items": [["MacBook Air M2", 2], ["Shipping", 1]]}
+    Products are referred to by name.
+"""
+import json
+import math
+import random
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from store import Store
+
+# An order as read from a log: (product name, quantity) lines.
+OrderLines = List[Tuple[str, int]]
+
+
+class ReplayReport:
+    """
+        Results of a replay.
+    """
+
+    def __init__(self):
+        self.orders = 0
+        self.succeeded = 0
+        self.failures: Counter = Counter()      # reason -> number of failed orders
+        self.latencies: List[float] = []        # seconds, one per order
+        self.seconds = 0.0
+        self.invalid_lines: List[str] = []      # order log lines skipped as malformed (see read_order_log)
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.orders / self.seconds if self.seconds else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+            The latency (in seconds) that `percent` % of the orders stayed within.
+        """
+        return _percentile(sorted(self.latencies), percent)
+
+    def summary(self) -> str:
+        lines = [f"{self.orders} orders in {self.seconds:.2f}s: {self.orders_per_second:,.0f} orders/sec, "
+                 f"{self.succeeded} succeeded, {self.orders - self.succeeded} failed"]
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            lines.append("latency: " + ", ".join(f"p{percent:g} {_percentile(ordered, percent) * 1e6:,.0f}us"
+                                                 for percent in (50, 90, 99, 99.9)) +
+                         f", max {ordered[-1] * 1e6:,.0f}us")
+        for reason, count in self.failures.most_common():
+            lines.append(f"  {count} x {reason}")
+        if self.invalid_lines:
+            lines.append(f"{len(self.invalid_lines)} invalid log lines skipped:")
+            lines.extend(f"  {message}" for message in self.invalid_lines[:10])
+            if len(self.invalid_lines) > 10:
+                lines.append(f"  ... and {len(self.invalid_lines) - 10} more")
+        return "\n".join(lines)
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    # Nearest-rank percentile of sorted values.
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(len(ordered) * percent / 100))
+    return ordered[rank - 1]
+
+
+def read_order_log(path: str, invalid: Optional[List[str]] = None) -> Iterator[OrderLines]:
+    """
+        Stream the orders of a JSONL order log, one at a time. Lines that are not a valid order are
+        skipped, so one bad line doesn't abort a replay.
+        Args:
+            path (str): The order log.
+            invalid (List[str], optional): Gets a message (with the line number) for every skipped line.
+    """
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                items = json.loads(line)["items"]
+                order = [(str(name), int(quantity)) for name, quantity in items]
+            except (ValueError, KeyError, TypeError) as error:
+                if invalid is not None:
+                    invalid.append(f"{path}:{line_number}: not a valid order ({error}).")
+                continue
+            yield order
+
+
+def write_order_log(path: str, orders: Iterable[OrderLines]) -> int:
+    """
+        Write orders to a JSONL order log.
+        Returns:
+            int: The number of orders written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as file:
+        for order in orders:
+            file.write(json.dumps({"items": [[name, quantity] for name, quantity in order]}) + "\n")
+            count += 1
+    return count
+
+
+def generate_orders(store: Store, count: int, seed: int = 0, max_lines: int = 3,
+                    max_quantity: int = 3) -> Iterator[OrderLines]:
+    """
+        Synthetic traffic: `count` random orders over the store's active products. The same seed
+        and catalog always give the same orders, so capacity tests can be repeated anywhere.
+        Popular products are ordered more often (a Zipf-like 1/rank weighting).
+    """
+    rng = random.Random(seed)
+    names = [product.name for product in store.get_all_products()]
+    if not names:
+        raise ValueError("The store has no active products to order.")
+    weights = [1 / rank for rank in range(1, len(names) + 1)]
+    for _ in range(count):
+        lines = rng.choices(names, weights, k=rng.randint(1, max_lines))
+        yield [(name, rng.randint(1, max_quantity)) for name in lines]
+
+
+def replay(store: Store, orders: Iterable[OrderLines], rate: Optional[float] = None) -> ReplayReport:
+    """
+        Place every order through store.order and measure it.
+        Args:
+            store (Store): The store to order from.
+            orders (Iterable[OrderLines]): The orders, e.g. from read_order_log or generate_orders.
+            rate (float, optional): Target orders per second. None places orders as fast as possible.
+            When a rate is set, latency is measured from the time an order was due, so falling
+            behind the schedule shows up in the latency instead of being hidden.
+        Returns:
+            ReplayReport: Throughput, latencies and failures by reason.
+    """
+    if rate is not None and rate <= 0:
+        raise ValueError("Rate must be positive.")
+    report = ReplayReport()
+    products: Dict[str, object] = {}
+    clock = time.perf_counter
+    started = clock()
+    for number, order in enumerate(orders):
+        due = started + number / rate if rate else clock()
+        if rate:
+            delay = due - clock()
+            if delay > 0:
+                time.sleep(delay)
+                due = clock()   # on schedule: don't count the sleep's own overshoot as latency
+        report.orders += 1
+        try:
+            shopping_list = []
+            for name, quantity in order:
+                product = products.get(name) or store.get_product(name)
+                if product is None:
+                    raise LookupError(f"unknown product {name!r}")
+                products[name] = product
+                shopping_list.append((product, quantity))
+            store.order(shopping_list)
+            report.succeeded += 1
+        except Exception as error:
+            report.failures[f"{type(error).__name__}: {str(error).strip()}"] += 1
+        report.latencies.append(clock() - due)
+    report.seconds = clock() - started
+    return report
@@ -0,0 +1,119 @@
+"""
+    Stock reservations ("holds"): units set aside for a customer for a limited time, e.g. while they pay.
+
+    A hold does not change a product's quantity on hand; it lowers the quantity available to other
+    buyers until it is committed (turned into a purchase), released, or it expires. Holds live only in
+    memory: they are not part of snapshots or the inventory log, so after a restart all held stock is
+    available again.
+"""
+import heapq
+import threading
+import time
+from itertools import count
+from typing import Callable, Dict, List, Tuple
+
+from products import Product, NonStockedProduct
+
+
+class Hold:
+    """
+        Units of a product set aside until `expires_at` (in the table's clock).
+    """
+    __slots__ = ("product", "quantity", "expires_at")
+
+    def __init__(self, product: Product, quantity: int, expires_at: float):
+        self.product = product
+        self.quantity = quantity
+        self.expires_at = expires_at
+
+
+class HoldTable:
+    """
+        The active holds of a store and the number of units held per product.
+        Expiry times are kept in a min-heap, so reclaiming expired holds costs O(log n) per expired
+        hold and nothing for the others. Committed or released holds leave their heap entry behind;
+        it is skipped when it comes up, and the heap is compacted once such entries are the majority.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._holds: Dict[int, Hold] = {}
+        self._held: Dict[Product, int] = {}         # only products with at least one hold
+        self._heap: List[Tuple[float, int]] = []    # (expires_at, hold id)
+        self._ids = count(1)
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def add(self, product: Product, quantity: int, ttl: float) -> int:
+        expires_at = self._clock() + ttl
+        with self._lock:
+            hold_id = next(self._ids)
+            self._holds[hold_id] = Hold(product, quantity, expires_at)
+            heapq.heappush(self._heap, (expires_at, hold_id))
+            if not isinstance(product, NonStockedProduct):
+                self._held[product] = self._held.get(product, 0) + quantity
+        return hold_id
+
+    def get(self, hold_id: int) -> Hold:
+        hold = self._holds.get(hold_id)
+        if hold is None:
+            raise ValueError(f"Hold {hold_id!r} not found, it was committed, released or it expired.")
+        return hold
+
+    def pop(self, hold_id: int) -> Hold:
+        """
+            Remove a hold, giving its units back to the available stock.
+            Raises:
+                ValueError: If there is no such hold (anymore).
+        """
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+            if hold is None:
+                raise ValueError(f"Hold {hold_id!r} not found, it was committed, released or it expired.")
+            self._unhold(hold)
+            if len(self._heap) > 2 * len(self._holds) + 1024:
+                self._heap = [entry for entry in self._heap if entry[1] in self._holds]
+                heapq.heapify(self._heap)
+        return hold
+
+    def _unhold(self, hold: Hold):
+        # Called with the lock held.
+        if isinstance(hold.product, NonStockedProduct):
+            return
+        remaining = self._held[hold.product] - hold.quantity
+        if remaining:
+            self._held[hold.product] = remaining
+        else:
+            del self._held[hold.product]
+
+    def held(self, product: Product) -> int:
+        """
+            The number of units of `product` held, after reclaiming any holds that have expired.
+        """
+        if not self._holds:
+            return 0
+        heap = self._heap
+        if heap and heap[0][0] <= self._clock():
+            self.expire()
+        return self._held.get(product, 0)
+
+    def expire(self, now: float = None) -> List[Hold]:
+        """
+            Remove the holds that expired at or before `now` (default: the current time).
+            Returns:
+                List[Hold]: The expired holds.
+        """
+        if now is None:
+            now = self._clock()
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _, hold_id = heapq.heappop(heap)
+                hold = self._holds.pop(hold_id, None)
+                if hold is not None:
+                    self._unhold(hold)
+                    expired.append(hold)
+        return expired
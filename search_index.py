@@ -0,0 +1,177 @@
+"""
+    Name search over a store's catalog: prefix search on any word of a product name, and
+    typo-tolerant (fuzzy) search based on character trigrams.
+
+    The index follows the store through its "add" and "remove" events. New names are buffered and
+    merged into the sorted prefix list on the next query: a few are inserted in place, and bulk loads
+    cost one sort instead of one insertion per product. Removed products are skipped and cleaned up
+    on the next merge.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+from products import Product
+
+# Trigrams found in more than this share of the names say little about a match and are skipped.
+COMMON_TRIGRAM_SHARE = 0.05
+# Up to this many buffered keys are inserted one by one (a memmove each); more are merged with one sort,
+# which has to compare every entry of the prefix list.
+INSERT_LIMIT = 64
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+        The set of 3-character substrings of a lowercased, space-padded text.
+    """
+    padded = f"  {text.lower()} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+        Prefix and fuzzy search index over product names.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products: Dict[int, Product] = {}        # id -> product (only products in the index)
+        self._ids: Dict[Product, int] = {}
+        self._next_id = 0
+        self._prefixes: List[Tuple[str, int]] = []     # sorted (lowercased name from a word start, id)
+        self._pending: List[Tuple[str, int]] = []      # added since the last merge
+        self._stale = 0                                # entries of removed products still in _prefixes
+        self._trigrams: Dict[str, List[int]] = {}      # trigram -> ids
+        self._trigram_counts: Dict[int, int] = {}      # id -> number of trigrams of its name
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    @staticmethod
+    def _keys(name: str) -> List[str]:
+        # "Google Pixel 7" can be found by "goo", "pix" and "7".
+        words = name.lower().split()
+        return [" ".join(words[index:]) for index in range(len(words))]
+
+    def add(self, product: Product):
+        with self._lock:
+            if product in self._ids:
+                return
+            product_id = self._next_id
+            self._next_id += 1
+            self._products[product_id] = product
+            self._ids[product] = product_id
+            self._pending.extend((key, product_id) for key in self._keys(product.name))
+            name_trigrams = trigrams(product.name)
+            for trigram in name_trigrams:
+                self._trigrams.setdefault(trigram, []).append(product_id)
+            self._trigram_counts[product_id] = len(name_trigrams)
+
+    def remove(self, product: Product):
+        with self._lock:
+            product_id = self._ids.pop(product, None)
+            if product_id is None:
+                return
+            del self._products[product_id]
+            del self._trigram_counts[product_id]
+            self._stale += len(self._keys(product.name))
+
+    def __call__(self, event: str, product: Product):
+        """
+            Store listener: keep the index in step with the catalog.
+        """
+        if event == "add":
+            self.add(product)
+        elif event == "remove":
+            self.remove(product)
+
+    def _merge(self):
+        # Called with the lock held, before a prefix query.
+        if len(self._pending) > INSERT_LIMIT:
+            self._prefixes.extend(self._pending)
+            self._prefixes.sort()
+            self._pending = []
+        elif self._pending:
+            for entry in self._pending:
+                insort(self._prefixes, entry)
+            self._pending = []
+        if self._stale > len(self._prefixes) // 2:
+            self._prefixes = [entry for entry in self._prefixes if entry[1] in self._products]
+            for trigram, ids in list(self._trigrams.items()):
+                ids[:] = [product_id for product_id in ids if product_id in self._products]
+                if not ids:
+                    del self._trigrams[trigram]
+            self._stale = 0
+
+    def prefix(self, query: str, limit: int = 10, active_only: bool = False) -> List[Product]:
+        """
+            Find products with a word of their name starting with `query` (case-insensitive).
+            Returns:
+                List[Product]: Up to `limit` products, in alphabetical order of the matching text.
+        """
+        query = " ".join(query.lower().split())
+        results, seen = [], set()
+        with self._lock:
+            self._merge()
+            index = bisect_left(self._prefixes, (query,))
+            while index < len(self._prefixes) and len(results) < limit:
+                key, product_id = self._prefixes[index]
+                if not key.startswith(query):
+                    break
+                index += 1
+                product = self._products.get(product_id)
+                if product is None or product_id in seen or (active_only and not product.is_active()):
+                    continue
+                seen.add(product_id)
+                results.append(product)
+        return results
+
+    def fuzzy(self, query: str, limit: int = 10, active_only: bool = False,
+              min_similarity: float = 0.4) -> List[Product]:
+        """
+            Find products whose names are similar to `query`, tolerating typos.
+            Similarity is the share of the query's trigrams found in the name; ties go to the
+            name closest in length (by Jaccard index of the two trigram sets).
+            Returns:
+                List[Product]: Up to `limit` products, most similar first.
+        """
+        query_trigrams = trigrams(query)
+        with self._lock:
+            common = max(1, int(len(self._products) * COMMON_TRIGRAM_SHARE))
+            postings = [self._trigrams[trigram] for trigram in query_trigrams if trigram in self._trigrams]
+            selective = [ids for ids in postings if len(ids) <= common]
+            hits = Counter()
+            for ids in selective or postings:
+                hits.update(ids)
+            # A candidate can match at most the skipped common trigrams on top of its hits.
+            skipped = len(postings) - len(selective) if selective else 0
+            needed = min_similarity * len(query_trigrams) - skipped
+            scored = []
+            for product_id, shared in hits.items():
+                if shared < needed:
+                    continue
+                product = self._products.get(product_id)
+                if product is None or (active_only and not product.is_active()):
+                    continue
+                if selective and len(selective) < len(postings):
+                    # Common trigrams were skipped; count them for the candidates that matched the rest.
+                    shared = len(query_trigrams & trigrams(product.name))
+                similarity = shared / len(query_trigrams)
+                if similarity >= min_similarity:
+                    jaccard = shared / (len(query_trigrams) + self._trigram_counts[product_id] - shared)
+                    scored.append((similarity, jaccard, -product_id, product))
+        return [entry[-1] for entry in heapq.nlargest(limit, scored, key=lambda entry: entry[:3])]
+
+    def search(self, query: str, limit: int = 10, active_only: bool = False) -> List[Product]:
+        """
+            Prefix matches first, then fuzzy matches to fill up to `limit` results.
+        """
+        results = self.prefix(query, limit, active_only)
+        if len(results) < limit:
+            found = set(results)
+            for product in self.fuzzy(query, limit, active_only):
+                if product not in found and len(results) < limit:
+                    results.append(product)
+        return results
@@ -0,0 +1,309 @@
+"""
+    Multi-process sharded store: products are partitioned across worker processes by a hash of their
+    name, so order processing is spread over several cores instead of being capped by the GIL.
+
+    Each worker owns a regular Store with its share of the products. The coordinator (ShardedStore)
+    routes order lines to the owning shard. Orders that touch one shard are placed there directly;
+    orders that span shards use two-phase reserve/commit (every shard first holds the stock of its
+    lines, see Store.reserve), so they stay all-or-nothing.
+    Products are referred to by name, and the products returned by queries are detached copies.
+"""
+import itertools
+import multiprocessing
+import threading
+import zlib
+from contextlib import ExitStack
+from typing import Dict, Iterable, List, Tuple, Union
+
+from products import Product
+from store import Store
+
+ProductKey = Union[Product, str]
+# Holds of a cross-shard order only need to outlive the round trip to its commit.
+_HOLD_TTL = 60.0
+
+
+def shard_of(name: str, shards: int) -> int:
+    """
+        Get the shard that owns the product with this name. Stable across processes and runs.
+    """
+    return zlib.crc32(name.encode("utf-8")) % shards
+
+
+def _lines(store: Store, lines: List[Tuple[str, int]]) -> List[Tuple[Product, int]]:
+    shopping_list = []
+    for name, quantity in lines:
+        product = store.get_product(name)
+        if product is None:
+            raise Exception(f"This {name} is not found in store")
+        shopping_list.append((product, quantity))
+    return shopping_list
+
+
+def _worker(connection, products: List[Product]):
+    """
+        Main loop of a shard process: answer (command, payload) requests until "stop".
+    """
+    store = Store(products)
+    reservations: Dict[int, List[int]] = {}     # transaction id -> hold ids of its lines
+
+    def handle(command, payload):
+        if command == "order":
+            return store.order(_lines(store, payload))
+        if command == "order_batch":
+            shopping_lists = []
+            for lines in payload:
+                try:
+                    shopping_lists.append(_lines(store, lines))
+                except Exception as error:
+                    shopping_lists.append(error)
+            valid = [shopping_list for shopping_list in shopping_lists if not isinstance(shopping_list, Exception)]
+            placed = iter(store.order_batch(valid))
+            return [result if isinstance(result, Exception) else next(placed) for result in shopping_lists]
+        if command == "reserve":
+            # Phase one: check and price the lines, and hold their stock so that no other order can
+            # take it. Nothing is bought (and no listener hears of the order) until the commit.
+            transaction, lines = payload
+            shopping_list = _lines(store, lines)
+            total = store.quote(shopping_list)
+            wanted: Dict[Product, int] = {}
+            for product, quantity in shopping_list:
+                wanted[product] = wanted.get(product, 0) + quantity
+            holds: List[int] = []
+            try:
+                for product, quantity in wanted.items():
+                    holds.append(store.reserve(product, quantity, _HOLD_TTL))
+            except Exception:
+                for hold in holds:
+                    store.release(hold)
+                raise
+            reservations[transaction] = holds
+            return total
+        if command == "commit":
+            holds = reservations.pop(payload)
+            for index, hold in enumerate(holds):
+                try:
+                    store.commit(hold)
+                except Exception:
+                    # Only a product removed while the order was pending gets here.
+                    for later in holds[index + 1:]:
+                        store.release(later)
+                    raise
+            return None
+        if command == "abort":
+            for hold in reservations.pop(payload, []):
+                store.release(hold)
+            return None
+        if command == "add":
+            store.add_products(payload)
+            return None
+        if command == "remove":
+            store.remove_product(_lines(store, [(payload, 0)])[0][0])
+            return None
+        if command == "total":
+            return store.get_total_quantity()
+        if command == "products":
+            return store.get_all_products()
+        raise ValueError(f"Unknown command {command!r}")
+
+    while True:
+        command, payload = connection.recv()
+        if command == "stop":
+            connection.close()
+            return
+        try:
+            connection.send((True, handle(command, payload)))
+        except Exception as error:
+            connection.send((False, error))
+
+
+class ShardedStore:
+    """
+        A store whose products are spread across worker processes.
+        Args:
+            products (List[Product]): The initial products. Each one is copied into the process that owns it.
+            workers (int): Number of shard processes.
+
+        Use it as a context manager, or call close() to stop the workers.
+    """
+
+    def __init__(self, products: List[Product] = None, workers: int = 4):
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        products = products or []
+        if any(not isinstance(product, Product) for product in products):
+            raise TypeError("All items in products list must be of type Product.")
+        self.workers = workers
+        # Position of every product, so listings can be returned in catalog order.
+        self._positions: Dict[str, int] = {}
+        self._next_position = itertools.count()
+        partitions: List[List[Product]] = [[] for _ in range(workers)]
+        for product in products:
+            if product.name in self._positions:
+                raise ValueError(f"A product named {product.name!r} is already in store inventory.")
+            self._positions[product.name] = next(self._next_position)
+            partitions[shard_of(product.name, workers)].append(product)
+
+        self._connections = []
+        self._processes = []
+        for partition in partitions:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child, partition), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        # One lock per shard connection, always taken in shard order.
+        self._locks = [threading.Lock() for _ in range(workers)]
+        self._transactions = itertools.count(1)
+
+    def __enter__(self) -> "ShardedStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+            Stop the worker processes.
+        """
+        for lock, connection in zip(self._locks, self._connections):
+            with lock:
+                if not connection.closed:
+                    connection.send(("stop", None))
+                    connection.close()
+        for process in self._processes:
+            process.join()
+
+    def _scatter(self, requests: Dict[int, Tuple[str, object]]) -> Dict[int, Tuple[bool, object]]:
+        """
+            Send one request to each of the given shards, then collect the replies,
+            so the shards work on them in parallel.
+        """
+        shards = sorted(requests)
+        with ExitStack() as stack:
+            for shard in shards:
+                stack.enter_context(self._locks[shard])
+            for shard in shards:
+                self._connections[shard].send(requests[shard])
+            return {shard: self._connections[shard].recv() for shard in shards}
+
+    def _call(self, shard: int, command: str, payload=None):
+        ok, result = self._scatter({shard: (command, payload)})[shard]
+        if not ok:
+            raise result
+        return result
+
+    def _route(self, shopping_list: List[Tuple[ProductKey, int]]) -> Dict[int, List[Tuple[str, int]]]:
+        Store._check_shopping_list(shopping_list)
+        by_shard: Dict[int, List[Tuple[str, int]]] = {}
+        for product, quantity in shopping_list:
+            name = product.name if isinstance(product, Product) else product
+            if not isinstance(name, str):
+                raise Exception(f"This {product} is not found in store")
+            by_shard.setdefault(shard_of(name, self.workers), []).append((name, quantity))
+        return by_shard
+
+    def order(self, shopping_list: List[Tuple[ProductKey, int]]) -> float:
+        """
+            Place an order. Lines may name products by Product or by name.
+            Returns:
+                float: The total cost.
+            Raises:
+                Exception: Whatever Store.order raises for the failing line. No line keeps its stock then.
+        """
+        by_shard = self._route(shopping_list)
+        if not by_shard:
+            return 0.0
+        if len(by_shard) == 1:
+            (shard, lines), = by_shard.items()
+            return self._call(shard, "order", lines)
+        return self._order_across_shards(by_shard)
+
+    def _order_across_shards(self, by_shard: Dict[int, List[Tuple[str, int]]]) -> float:
+        # Phase one: every shard reserves its lines. Phase two: commit all, or abort those that reserved.
+        transaction = next(self._transactions)
+        replies = self._scatter({shard: ("reserve", (transaction, lines)) for shard, lines in by_shard.items()})
+        reserved = [shard for shard, (ok, _) in replies.items() if ok]
+        failures = [result for ok, result in replies.values() if not ok]
+        decision = "abort" if failures else "commit"
+        for ok, result in self._scatter({shard: (decision, transaction) for shard in reserved}).values():
+            if not ok:
+                raise result
+        if failures:
+            raise failures[0]
+        return sum(total for _, total in replies.values())
+
+    def order_batch(self, shopping_lists: List[List[Tuple[ProductKey, int]]]) -> List[object]:
+        """
+            Place many orders. Single-shard orders are sent to their shards in one message per shard
+            and placed by all shards in parallel; orders spanning shards go through reserve/commit.
+            Returns:
+                List[object]: For each order, its total cost, or the exception that made it fail.
+                A malformed order only fails itself.
+        """
+        results: List[object] = [None] * len(shopping_lists)
+        local: Dict[int, List[Tuple[int, list]]] = {}    # shard -> (index, lines) of orders placed entirely there
+        spanning: List[Tuple[int, dict]] = []
+        for index, shopping_list in enumerate(shopping_lists):
+            try:
+                by_shard = self._route(shopping_list)
+            except Exception as error:
+                results[index] = error
+                continue
+            if len(by_shard) == 1:
+                (shard, lines), = by_shard.items()
+                local.setdefault(shard, []).append((index, lines))
+            elif not by_shard:
+                results[index] = 0.0
+            else:
+                spanning.append((index, by_shard))
+
+        replies = self._scatter({shard: ("order_batch", [lines for _, lines in orders])
+                                 for shard, orders in local.items()})
+        for shard, (ok, shard_results) in replies.items():
+            if not ok:
+                shard_results = [shard_results] * len(local[shard])
+            for (index, _), result in zip(local[shard], shard_results):
+                results[index] = result
+        for index, by_shard in spanning:
+            try:
+                results[index] = self._order_across_shards(by_shard)
+            except Exception as error:
+                results[index] = error
+        return results
+
+    def add_products(self, product: Product):
+        """
+            Add a product to the shard that owns its name.
+        """
+        if not isinstance(product, Product):
+            raise TypeError("Product must be an instance of the Product class")
+        self._call(shard_of(product.name, self.workers), "add", product)
+        self._positions[product.name] = next(self._next_position)
+
+    def remove_product(self, product: ProductKey):
+        name = product.name if isinstance(product, Product) else product
+        if not isinstance(name, str):
+            raise Exception(f"This {product} is not found in store")
+        self._call(shard_of(name, self.workers), "remove", name)
+        del self._positions[name]
+
+    def _gather(self, command: str) -> Iterable[object]:
+        for ok, result in self._scatter({shard: (command, None) for shard in range(self.workers)}).values():
+            if not ok:
+                raise result
+            yield result
+
+    def get_total_quantity(self) -> int:
+        """
+            Get the total quantity of all products, summed over all shards in parallel.
+        """
+        return sum(self._gather("total"))
+
+    def get_all_products(self) -> List[Product]:
+        """
+            Get copies of all active products from all shards, in the order they were added.
+        """
+        products = [product for shard_products in self._gather("products") for product in shard_products]
+        return sorted(products, key=lambda product: self._positions[product.name])
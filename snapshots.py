@@ -0,0 +1,142 @@
+"""
+    Point-in-time, read-only views of a store's inventory (see Store.snapshot).
+
+    Taking a snapshot copies nothing: it records how far the catalog went and the total stock at that
+    moment. Products keep being read from the live store until they change; just before a product's
+    first change after the snapshot, the store hands the snapshot a copy of its old state. A snapshot
+    so costs memory in proportion to the products changed while it is open, and readers never block
+    writers.
+"""
+import heapq
+from typing import Dict, List, Optional
+
+from products import Product
+
+
+class ProductState:
+    """
+        The state of a product at the time of a snapshot. Immutable.
+    """
+    __slots__ = ("product", "name", "price", "quantity", "active", "promotion", "position")
+
+    def __init__(self, product: Product, position: int):
+        for name, value in (("product", product), ("name", product.name), ("price", product.price),
+                            ("quantity", product.get_quantity()), ("active", product.is_active()),
+                            ("promotion", product.promotion), ("position", position)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, attribute):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def get_quantity(self) -> int:
+        return self.quantity
+
+    def is_active(self) -> bool:
+        return self.active
+
+    def __repr__(self) -> str:
+        return f"<ProductState {self.name!r} price={self.price} quantity={self.quantity} active={self.active}>"
+
+
+class StoreSnapshot:
+    """
+        The inventory of a store as it was when the snapshot was taken.
+        Use it as a context manager, or call close(), so the store stops saving old states for it.
+    """
+
+    def __init__(self, store, end_position: int, size: int, total_quantity: int):
+        self._store = store
+        self._end = end_position    # products added at or after this catalog position came later
+        self._size = size
+        self._total_quantity = total_quantity
+        self._saved: Dict[Product, ProductState] = {}   # products changed or removed since
+        self._removed: Dict[str, ProductState] = {}     # by name, products removed since
+
+    def __enter__(self) -> "StoreSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+            Release the snapshot. Its saved states are dropped; it must not be used afterwards.
+        """
+        if self._store is not None:
+            self._store._drop_snapshot(self)
+            self._store = None
+            self._saved = {}
+            self._removed = {}
+
+    def _preserve(self, product: Product, removed: bool = False):
+        """
+            Called by the store just before `product` changes (or is removed).
+        """
+        store = self._store
+        if store is None:
+            return  # closed while the change was under way
+        state = self._saved.get(product)
+        if state is None:
+            position = store._position(product)
+            if position is None or position >= self._end:
+                return  # not part of the snapshot
+            state = self._saved.setdefault(product, ProductState(product, position))
+        if removed:
+            self._removed[state.name] = state
+
+    def _state(self, product: Product, position: int) -> ProductState:
+        # Read the live product first and check for a saved state afterwards: a writer saves the old
+        # state before changing anything, so if a change raced with the read, the saved copy is there now.
+        state = ProductState(product, position)
+        return self._saved.get(product, state)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, product) -> bool:
+        return self.state(product) is not None
+
+    def state(self, product: Product) -> Optional[ProductState]:
+        """
+            The state of `product` in the snapshot, or None if it was not in the store then.
+        """
+        saved = self._saved.get(product)
+        if saved is not None:
+            return saved
+        position = self._store._position(product)
+        if position is None or position >= self._end:
+            return self._saved.get(product)
+        return self._state(product, position)
+
+    @property
+    def products(self) -> List[ProductState]:
+        """
+            All products of the snapshot (active or not), in the order they were added.
+        """
+        live = ((position, product) for product, position in self._store._positions() if position < self._end)
+        live = [self._state(product, position) for position, product in live]
+        removed = sorted(self._removed.values(), key=lambda state: state.position)
+        if not removed:
+            return live
+        # A product removed while the listing was read shows up in both lists.
+        live = [state for state in live if self._removed.get(state.name) is not state]
+        return list(heapq.merge(live, removed, key=lambda state: state.position))
+
+    def get_all_products(self) -> List[ProductState]:
+        """
+            The products that were active.
+        """
+        return [state for state in self.products if state.active]
+
+    def get_total_quantity(self) -> int:
+        return self._total_quantity
+
+    def get_product(self, name: str) -> Optional[ProductState]:
+        product = self._store.get_product(name)
+        state = None if product is None else self.state(product)
+        if state is not None and state.name == name:
+            return state
+        return self._removed.get(name)
@@ -0,0 +1,273 @@
+"""
+    Ordered secondary indexes on product quantity and price, for questions such as "which products
+    have fewer than 10 units left", "which products cost between $100 and $500" or "what are the
+    50 most-stocked products", and for low-stock alerts.
+
+    The index follows the store through its events: every buy, quantity change, restock, rollback
+    or price change moves just that product's entry, so a query only walks the entries it returns
+    instead of the whole catalog.
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from products import Product, NonStockedProduct
+
+FIELDS = ("quantity", "price")
+# Quantity keys are quantity << ID_BITS | product id.
+ID_BITS = 40
+ID_MASK = (1 << ID_BITS) - 1
+
+
+class SortedKeyList:
+    """
+        A sorted list split into buckets of a few hundred items, so adding or removing an item moves
+        at most one bucket instead of shifting the whole list.
+    """
+    LOAD = 500
+
+    def __init__(self):
+        self._buckets: List[list] = []
+        self._maxes: list = []      # last (largest) item of each bucket
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, item):
+        if not self._buckets:
+            self._buckets.append([item])
+            self._maxes.append(item)
+        else:
+            position = bisect_left(self._maxes, item)
+            if position == len(self._maxes):
+                position -= 1
+                self._buckets[position].append(item)
+                self._maxes[position] = item
+            else:
+                insort(self._buckets[position], item)
+            bucket = self._buckets[position]
+            if len(bucket) > 2 * self.LOAD:
+                self._buckets[position:position + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+                self._maxes[position:position + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+        self._size += 1
+
+    def _locate(self, item) -> Tuple[int, int]:
+        position = bisect_left(self._maxes, item)
+        bucket = self._buckets[position] if position < len(self._buckets) else []
+        index = bisect_left(bucket, item)
+        if index == len(bucket) or bucket[index] != item:
+            raise ValueError(f"{item!r} not in list")
+        return position, index
+
+    def _delete(self, position: int, index: int):
+        bucket = self._buckets[position]
+        del bucket[index]
+        if bucket:
+            self._maxes[position] = bucket[-1]
+        else:
+            del self._buckets[position]
+            del self._maxes[position]
+        self._size -= 1
+
+    def remove(self, item):
+        self._delete(*self._locate(item))
+
+    def replace(self, old, new):
+        """
+            Remove `old` and add `new`. When `new` belongs in the same bucket, only that bucket is touched.
+        """
+        position, index = self._locate(old)
+        bucket = self._buckets[position]
+        if len(bucket) > 1 and bucket[0] <= new <= bucket[-1]:
+            del bucket[index]
+            insort(bucket, new)
+            self._maxes[position] = bucket[-1]
+        else:
+            self._delete(position, index)
+            self.add(new)
+
+    def irange(self, low=None, high=None, reverse: bool = False) -> Iterator:
+        """
+            Iterate over the items with low <= item < high (None means unbounded), in order.
+        """
+        if not self._buckets:
+            return
+        if low is None:
+            first, first_index = 0, 0
+        else:
+            first = bisect_left(self._maxes, low)
+            if first == len(self._buckets):
+                return
+            first_index = bisect_left(self._buckets[first], low)
+        if high is None:
+            last, last_index = len(self._buckets) - 1, len(self._buckets[-1])
+        else:
+            last = min(bisect_left(self._maxes, high), len(self._buckets) - 1)
+            last_index = bisect_left(self._buckets[last], high)
+        if (last, last_index) <= (first, first_index):
+            return
+        positions = range(first, last + 1)
+        for position in reversed(positions) if reverse else positions:
+            bucket = self._buckets[position]
+            start = first_index if position == first else 0
+            stop = last_index if position == last else len(bucket)
+            if reverse:
+                yield from reversed(bucket[start:stop])
+            else:
+                yield from bucket[start:stop]
+
+
+class StockIndex:
+    """
+        Quantity and price indexes over the products of a store, plus low-stock subscriptions.
+        Non-stocked products have no meaningful quantity and only appear in the price index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products: Dict[int, Product] = {}
+        self._ids: Dict[Product, int] = {}
+        self._next_id = 0
+        self._lists: Dict[str, SortedKeyList] = {field: SortedKeyList() for field in FIELDS}
+        self._values: Dict[str, Dict[Product, float]] = {field: {} for field in FIELDS}
+        # Sorted (threshold, subscription number, callback); a change only visits the thresholds it crosses.
+        self._alerts: List[Tuple[int, int, Callable[[Product, int], None]]] = []
+        self._next_alert = 0
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    @staticmethod
+    def _key(field: str, value, product_id: int):
+        # Quantities are non-negative ints, so (quantity, id) packs into one int, which compares
+        # much faster than a tuple; purchases move quantity keys all the time.
+        if field == "quantity":
+            return value << ID_BITS | product_id
+        return value, product_id
+
+    @staticmethod
+    def _bounds(field: str, low, high):
+        # Half-open key range covering low <= value <= high.
+        if field == "quantity":
+            return (None if low is None else max(math.ceil(low), 0) << ID_BITS,
+                    None if high is None else max(math.floor(high) + 1, 0) << ID_BITS)
+        return None if low is None else (low,), None if high is None else (high, math.inf)
+
+    @staticmethod
+    def _read(product: Product, field: str):
+        return product.get_quantity() if field == "quantity" else product.price
+
+    def add(self, product: Product):
+        with self._lock:
+            if product in self._ids:
+                return
+            product_id = self._next_id
+            self._next_id += 1
+            self._products[product_id] = product
+            self._ids[product] = product_id
+            for field in FIELDS:
+                if field == "quantity" and isinstance(product, NonStockedProduct):
+                    continue
+                value = self._read(product, field)
+                self._values[field][product] = value
+                self._lists[field].add(self._key(field, value, product_id))
+
+    def remove(self, product: Product):
+        with self._lock:
+            product_id = self._ids.pop(product, None)
+            if product_id is None:
+                return
+            del self._products[product_id]
+            for field in FIELDS:
+                value = self._values[field].pop(product, None)
+                if value is not None:
+                    self._lists[field].remove(self._key(field, value, product_id))
+
+    def update(self, product: Product, field: str):
+        """
+            Move a product's entry to its current quantity or price. After a quantity drop, call the
+            low-stock listeners whose threshold it fell below.
+        """
+        with self._lock:
+            previous = self._values[field].get(product)
+            if previous is None:
+                return
+            value = self._read(product, field)
+            if value == previous:
+                return
+            product_id = self._ids[product]
+            self._values[field][product] = value
+            self._lists[field].replace(self._key(field, previous, product_id), self._key(field, value, product_id))
+            alerts = []
+            if field == "quantity" and value < previous:
+                # Thresholds t with value < t <= previous were crossed.
+                first = bisect_right(self._alerts, (value, math.inf))
+                last = bisect_right(self._alerts, (previous, math.inf))
+                alerts = [callback for _, _, callback in self._alerts[first:last]]
+        for callback in alerts:
+            callback(product, value)
+
+    def __call__(self, event: str, product: Product):
+        """
+            Store listener: keep the index in step with the catalog.
+        """
+        if event == "add":
+            self.add(product)
+        elif event == "remove":
+            self.remove(product)
+        elif event in ("buy", "set_quantity", "rollback"):
+            self.update(product, "quantity")
+        elif event == "price":
+            self.update(product, "price")
+
+    def range(self, field: str, low: Optional[float] = None, high: Optional[float] = None,
+              limit: Optional[int] = None, reverse: bool = False, active_only: bool = False) -> List[Product]:
+        """
+            Products with low <= value <= high for the given field ("quantity" or "price").
+            Args:
+                low, high (float, optional): Inclusive bounds, None for unbounded.
+                limit (int, optional): Maximum number of results.
+                reverse (bool): Largest values first instead of smallest.
+                active_only (bool): Skip products that are not available for sale.
+            Returns:
+                List[Product]: The products, ordered by the field (ties in the order they were indexed).
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {field!r}, expected one of {FIELDS}.")
+        results = []
+        if limit is not None and limit <= 0:
+            return results
+        with self._lock:
+            for key in self._lists[field].irange(*self._bounds(field, low, high), reverse):
+                product = self._products[key & ID_MASK if field == "quantity" else key[1]]
+                if active_only and not product.is_active():
+                    continue
+                results.append(product)
+                if len(results) == limit:
+                    break
+        return results
+
+    def top(self, field: str, count: int, largest: bool = True, active_only: bool = False) -> List[Product]:
+        """
+            The `count` products with the largest (or smallest) value of the field.
+        """
+        return self.range(field, limit=count, reverse=largest, active_only=active_only)
+
+    def add_low_stock_listener(self, threshold: int, callback: Callable[[Product, int], None]):
+        """
+            Call `callback(product, quantity)` whenever a product's quantity falls below `threshold`.
+        """
+        with self._lock:
+            insort(self._alerts, (threshold, self._next_alert, callback))
+            self._next_alert += 1
+
+    def remove_low_stock_listener(self, callback: Callable[[Product, int], None]):
+        with self._lock:
+            for index, (_, _, registered) in enumerate(self._alerts):
+                if registered == callback:
+                    del self._alerts[index]
+                    return
+        raise ValueError("Callback is not registered.")
+
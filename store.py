@@ -1,5 +1,17 @@
-from typing import List, Tuple
+import threading
+import weakref
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from products import Product
+from change_feed import ChangeFeed
+from pricing_cache import PriceCache
+from reservations import HoldTable
+from search_index import NameIndex
+from snapshots import StoreSnapshot
+from stock_index import StockIndex
+
+# Number of locks that products are spread across. Orders touching different stripes never wait on each other.
+LOCK_STRIPES = 64
 
 
 class Store:
@@ -8,9 +20,16 @@ class Store:
         Args:
             products (List[Product], optional): A list of Product objects.
             Defaults to an empty list if not provided.
+            check_consistency (bool, optional): If True, every call to get_total_quantity and
+            get_all_products also recomputes the value from scratch and raises if the
+            incrementally maintained value disagrees. Meant for tests, as it makes both calls O(n).
+            quote_cache_size (int, optional): Number of line prices quote() keeps cached.
+            promotion_engine (PromotionEngine, optional): If set, order() and quote() price every line with
+            the engine's best deal instead of only the product's own promotion.
     """
 
-    def __init__(self, products: List[Product] = None):
+    def __init__(self, products: List[Product] = None, check_consistency: bool = False,
+                 quote_cache_size: int = 100_000, promotion_engine=None):
         if products and not isinstance(products, list):
             raise TypeError("Products must be a list.")
         if products and any(not isinstance(product, Product) for product in products):
@@ -21,23 +40,110 @@ class Store:
         # If it is, the code then checks each item in the list to ensure that
         # every item is an instance of the Product class.
 
-        if products:
-            self.products = products
-            # Use the provided list of products
-        else:
-            self.products = []
-            # Create an empty list if no products are provided
-        # or like this:   self.products = products if products else []
+        # The catalog is a dict keyed by the product object itself (products hash by identity).
+        # Dicts keep insertion order, so it doubles as the ordered product list,
+        # and membership checks and removals are O(1) instead of a list scan.
+        # The value is the position the product was added at, used to keep listings in catalog order.
+        self._catalog: Dict[Product, int] = {}
+        self._next_position = 0
+        # Secondary index to find a product by its name in O(1).
+        self._names: Dict[str, Product] = {}
+        # Active products and the total stock are kept up to date by the products themselves
+        # (see Product._changed), so the queries below don't have to walk the whole catalog.
+        self._active: Dict[Product, int] = {}
+        self._active_listing: Optional[List[Product]] = None  # Cached get_all_products() result
+        self._total_quantity = 0
+        self.check_consistency = check_consistency
+        # Stock changes are protected by per-product striped locks (see _locked), while the short
+        # bookkeeping updates above (catalog, active set, total) share a single state lock.
+        # The stripes are reentrant, so a listener called during an order can restock that product.
+        self._stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._state_lock = threading.Lock()
+        self._listeners: List[Callable[[str, Product], None]] = []
+        self._quote_cache = PriceCache(quote_cache_size)
+        self.promotion_engine = promotion_engine
+        self._holds = HoldTable()   # stock reservations, see reserve()
+        # Weak references to the open snapshots, which get a copy of each product before it changes.
+        self._snapshots: Tuple[weakref.ref, ...] = ()
+        self._snapshot_lock = threading.Lock()
+        self._search_index: Optional[NameIndex] = None     # built on the first search()
+        self._stock_index: Optional[StockIndex] = None     # built on the first quantity or price query
+        self._change_feed: Optional[ChangeFeed] = None     # created by the first change_feed() call
+        for product in products or []:
+            self.add_products(product)
+
+    @property
+    def products(self) -> List[Product]:
+        """
+            All products in the store (active or not), in the order they were added.
+            This is a copy taken under the store's lock, so it costs O(n) per read but stays valid
+            while other threads add or remove products. Use `product in store` and `len(store)`
+            for membership and size, which are O(1).
+        """
+        with self._state_lock:
+            return list(self._catalog)
+
+    def __contains__(self, product) -> bool:
+        return product in self._catalog
+
+    def __len__(self) -> int:
+        return len(self._catalog)
 
     def add_products(self, product: Product):
         """
-            Add a product to the store.
+            Add a product to the store. Names are unique within a store, since products are looked up,
+            searched, persisted and routed by name.
+            Raises:
+                ValueError: If the product, or another product with the same name, is already in the store.
         """
         # The isinstance() function checks whether the variable product is an instance of the Product class.
         if not isinstance(product, Product):
             raise TypeError("Product must be an instance of the Product class")
+        if product in self._catalog:
+            raise ValueError("Product is already in store inventory.")
+        if product._store is not None:
+            raise ValueError("Product already belongs to another store.")
+
+        with self._state_lock:
+            if product.name in self._names:
+                raise ValueError(f"A product named {product.name!r} is already in store inventory.")
+            self._insert(product)
+        self._notify("add", product)
 
-        self.products.append(product)
+    def add_products_batch(self, products: List[Product]):
+        """
+            Add many products to the store at once, taking the store's lock only once.
+            Either all products are added or, if one of them is invalid, none are.
+            Raises:
+                ValueError: If a product or its name is already in the store or appears twice in the batch.
+        """
+        if any(not isinstance(product, Product) for product in products):
+            raise TypeError("All items in products list must be of type Product.")
+        with self._state_lock:
+            names = set()
+            for product in products:
+                if product._store is not None:
+                    raise ValueError("Product already belongs to a store.")
+                if product.name in self._names or product.name in names:
+                    raise ValueError(f"A product named {product.name!r} is already in store inventory.")
+                names.add(product.name)
+            for product in products:
+                self._insert(product)
+        for product in products:
+            self._notify("add", product)
+
+    def _insert(self, product: Product):
+        """
+            Put a product in the catalog and the indexes. The caller holds the state lock.
+        """
+        self._catalog[product] = self._next_position
+        self._next_position += 1
+        self._names[product.name] = product
+        product._store = self
+        self._total_quantity += product.get_quantity()
+        if product.is_active():
+            self._active[product] = self._catalog[product]
+            self._active_listing = None
 
     def remove_product(self, product: Product):
         """
@@ -45,15 +151,248 @@ class Store:
         """
         if not isinstance(product, Product):
             raise TypeError("Product must be an instance of the Product class.")
+        # Holding the product's stripe lock makes sure no order is halfway through buying it.
+        with self._locked([product]), self._state_lock:
             # Check if the product exists in the store's product list
-        if product not in self.products:
-            raise ValueError("Product not found in store inventory.")
+            if product not in self._catalog:
+                raise ValueError("Product not found in store inventory.")
+            if self._snapshots:
+                self._save_versions(product, removed=True)
+            del self._catalog[product]
+            del self._names[product.name]
+            product._store = None
+            self._total_quantity -= product.get_quantity()
+            if self._active.pop(product, None) is not None:
+                self._active_listing = None
+        self._notify("remove", product)
+
+    def add_listener(self, listener: Callable[[str, Product], None]):
+        """
+            Register a function to be called after every change to the inventory.
+            Args:
+                listener (Callable[[str, Product], None]): Called with the event name and the product.
+                Events are "add", "remove", and the Product events "buy", "set_quantity",
+                "activate", "deactivate", "rollback", "price" and "promotion".
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, Product], None]):
+        self._listeners.remove(listener)
+
+    def _notify(self, event: str, product: Product):
+        if event in ("price", "promotion", "remove"):
+            self._quote_cache.invalidate(product)
+        for listener in self._listeners:
+            listener(event, product)
+
+    def _product_changed(self, product: Product, event: str, previous_quantity: int, was_active: bool):
+        """
+            Called by a product in this store after its quantity or active state changed.
+        """
+        with self._state_lock:
+            self._total_quantity += product.get_quantity() - previous_quantity
+            is_active = product.is_active()
+            if is_active != was_active:
+                if is_active:
+                    self._active[product] = self._catalog[product]
+                else:
+                    del self._active[product]
+                self._active_listing = None
+        self._notify(event, product)
+
+    @contextmanager
+    def _locked(self, products: Iterable[Product]):
+        """
+            Hold the stripe locks of the given products for the duration of the with block.
+            Locks are always taken in ascending stripe order, so two orders can never deadlock.
+        """
+        stripes = sorted({hash(product) % LOCK_STRIPES for product in products})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._stripes[stripe])
+            yield
+
+    def _stripe(self, product: Product) -> threading.RLock:
+        # The stripe lock of one product.
+        return self._stripes[hash(product) % LOCK_STRIPES]
+
+    @contextmanager
+    def _locked_all(self):
+        """
+            Hold every stripe lock, for operations that touch the whole inventory at once.
+        """
+        with ExitStack() as stack:
+            for lock in self._stripes:
+                stack.enter_context(lock)
+            yield
+
+    def get_product(self, name: str) -> Optional[Product]:
+        """
+            Look up a product by its name.
+            Returns:
+                Optional[Product]: The product, or None if no product with that name is in the store.
+        """
+        return self._names.get(name)
+
+    def search(self, query: str, limit: int = 10, active_only: bool = True, fuzzy: bool = True) -> List[Product]:
+        """
+            Find products by name: names with a word starting with `query` come first, then
+            (if fuzzy is True) names similar to it, so small typos still find the product.
+            Args:
+                query (str): Text to search for, case-insensitive.
+                limit (int): Maximum number of results.
+                active_only (bool): Only return products that are available for sale.
+                fuzzy (bool): Also return typo-tolerant matches.
+            Returns:
+                List[Product]: Up to `limit` matching products.
+        """
+        if self._search_index is None:
+            self._search_index = self._attach_index(NameIndex())
+        if fuzzy:
+            return self._search_index.search(query, limit, active_only)
+        return self._search_index.prefix(query, limit, active_only)
+
+    def _attach_index(self, index):
+        """
+            Fill a secondary index with the current products and keep it up to date from then on.
+        """
+        # Listen first, so products added while the index is being filled aren't missed.
+        self.add_listener(index)
+        for product in self.products:
+            if product in self:
+                index.add(product)
+        return index
+
+    def _get_stock_index(self) -> StockIndex:
+        if self._stock_index is None:
+            self._stock_index = self._attach_index(StockIndex())
+        return self._stock_index
+
+    def find_by_quantity(self, low: Optional[int] = None, high: Optional[int] = None,
+                         limit: Optional[int] = None, active_only: bool = False) -> List[Product]:
+        """
+            Find products whose quantity lies between low and high (both inclusive), fewest units first.
+            Non-stocked products are never returned. The cost grows with the number of results,
+            not with the size of the catalog.
+            Args:
+                low (int, optional): Smallest quantity, None for no lower bound.
+                high (int, optional): Largest quantity, None for no upper bound.
+                limit (int, optional): Maximum number of results.
+                active_only (bool): Only return products that are available for sale.
+            Returns:
+                List[Product]: The matching products.
+        """
+        return self._get_stock_index().range("quantity", low, high, limit, active_only=active_only)
+
+    def find_by_price(self, low: Optional[float] = None, high: Optional[float] = None,
+                      limit: Optional[int] = None, active_only: bool = False) -> List[Product]:
+        """
+            Find products whose price lies between low and high (both inclusive), cheapest first.
+            Args:
+                low (float, optional): Lowest price, None for no lower bound.
+                high (float, optional): Highest price, None for no upper bound.
+                limit (int, optional): Maximum number of results.
+                active_only (bool): Only return products that are available for sale.
+            Returns:
+                List[Product]: The matching products.
+        """
+        return self._get_stock_index().range("price", low, high, limit, active_only=active_only)
+
+    def top_products(self, count: int, by: str = "quantity", largest: bool = True,
+                     active_only: bool = False) -> List[Product]:
+        """
+            Get the `count` products with the largest (or smallest) quantity or price.
+            Args:
+                count (int): Number of products.
+                by (str): "quantity" or "price".
+                largest (bool): Largest values first if True, smallest first otherwise.
+                active_only (bool): Only return products that are available for sale.
+            Returns:
+                List[Product]: Up to `count` products.
+        """
+        return self._get_stock_index().top(by, count, largest, active_only)
+
+    def low_stock(self, threshold: int) -> List[Product]:
+        """
+            Get the stocked products with fewer than `threshold` units left, fewest first.
+        """
+        return self.find_by_quantity(high=threshold - 1)
+
+    def add_low_stock_listener(self, threshold: int, callback: Callable[[Product, int], None]):
+        """
+            Register a function to be called whenever a product's quantity falls below `threshold`
+            (by a purchase, set_quantity or restock), with the product and its new quantity.
+            A product that stays below the threshold does not trigger it again until it is restocked
+            to `threshold` or more and then falls below it once more.
+        """
+        self._get_stock_index().add_low_stock_listener(threshold, callback)
+
+    def remove_low_stock_listener(self, callback: Callable[[Product, int], None]):
+        self._get_stock_index().remove_low_stock_listener(callback)
+
+    def change_feed(self, capacity: int = 65536) -> ChangeFeed:
+        """
+            The store's stream of inventory changes, for consumers that want to learn about every
+            purchase, stock or activity change, addition and removal without polling the catalog.
+            It records events from the first call on; open a cursor on it to read them:
+            `cursor = store.change_feed().cursor()`, then `cursor.read()` in a loop.
+            Args:
+                capacity (int): Number of events kept for slow consumers. Only used by the first call.
+            Returns:
+                ChangeFeed: The feed.
+        """
+        if self._change_feed is None:
+            feed = ChangeFeed(capacity)
+            self.add_listener(feed)
+            self._change_feed = feed
+        return self._change_feed
+
+    def snapshot(self) -> StoreSnapshot:
+        """
+            Take a consistent, read-only view of the inventory as it is now. It is cheap to take
+            (nothing is copied) and doesn't block orders: products are copied into it only when they
+            change later, once each. Close it (or use it in a with block) when done.
+            Returns:
+                StoreSnapshot: The view, with the Store read API (products, get_all_products,
+                get_total_quantity, get_product) returning ProductState objects.
+        """
+        # Waiting for every stripe lets orders in progress finish, so no order is half in the snapshot.
+        with self._locked_all(), self._state_lock:
+            snapshot = StoreSnapshot(self, *self._snapshot_bounds())
+            with self._snapshot_lock:
+                self._snapshots += (weakref.ref(snapshot),)
+        return snapshot
+
+    def _snapshot_bounds(self) -> Tuple[int, int, int]:
+        # End position, number of products and total quantity, read with all locks held.
+        return self._next_position, len(self._catalog), self._total_quantity
+
+    def _position(self, product: Product) -> Optional[int]:
+        return self._catalog.get(product)
+
+    def _positions(self) -> List[Tuple[Product, int]]:
+        with self._state_lock:
+            return list(self._catalog.items())
+
+    def _save_versions(self, product: Product, removed: bool = False):
+        """
+            Called just before `product` changes (or is removed) while snapshots are open.
+        """
+        closed = False
+        for reference in self._snapshots:
+            snapshot = reference()
+            if snapshot is None:
+                closed = True
+            else:
+                snapshot._preserve(product, removed)
+        if closed:
+            self._drop_snapshot(None)
 
-        for store_product in self.products:
-            if store_product == product:  # Check if the current product is the one to be removed.
-                self.products.remove(store_product)
-                break
-                # Exit the loop after removing product to avoid modifying the list while iterating
+    def _drop_snapshot(self, snapshot: Optional[StoreSnapshot]):
+        # Forget `snapshot` and any snapshot that was garbage collected without being closed.
+        with self._snapshot_lock:
+            self._snapshots = tuple(reference for reference in self._snapshots
+                                    if reference() is not None and reference() is not snapshot)
 
     def get_total_quantity(self) -> int:
         """
@@ -61,12 +400,9 @@ class Store:
             Returns:
                 int: The total quantity of all products.
         """
-        total_quantity = 0
-        for product in self.products:
-            total_quantity += product.get_quantity()  #
-        return total_quantity
-
-    # or like this:         return sum(product.get_quantity() for product in self.products)
+        if self.check_consistency:
+            self.verify()
+        return self._total_quantity
 
     def get_all_products(self) -> List[Product]:
         """
@@ -74,17 +410,36 @@ class Store:
             Returns:
                 List[Product]: A list of active Product objects.
         """
-        active_products = []
-        for product in self.products:
-            if product.is_active():
-                active_products.append(product)
-        return active_products
+        if self.check_consistency:
+            self.verify()
+        with self._state_lock:
+            if self._active_listing is None:
+                # Only the active products are sorted back into catalog order, and only after a change.
+                self._active_listing = sorted(self._active, key=self._active.__getitem__)
+            return list(self._active_listing)
 
-    # or like this: return [product for product in self.products if product.is_active()]
+    def verify(self):
+        """
+            Recompute the total quantity and the active products from scratch
+            and compare them with the incrementally maintained values.
+            Raises:
+                RuntimeError: If they disagree.
+        """
+        with self._state_lock:
+            total_quantity = sum(product.get_quantity() for product in self._catalog)
+            if total_quantity != self._total_quantity:
+                raise RuntimeError(f"Total quantity out of sync: tracked {self._total_quantity}, "
+                                   f"actual {total_quantity}.")
+            active_products = [product for product in self._catalog if product.is_active()]
+            if active_products != sorted(self._active, key=self._active.__getitem__):
+                raise RuntimeError("Active products out of sync with the catalog.")
 
     def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
         """
         Place an order for multiple products and calculate the total cost.
+        The order is all-or-nothing: every line is checked before any stock is taken, so a failed
+        order changes nothing.
+        It is safe to call from several threads at once on the same store.
         Args:
             shopping_list (List[Tuple[Product, int]]):
             A list of tuples, where each tuple contains a Product object and the quantity to buy.
@@ -93,14 +448,307 @@ class Store:
         Raises:
             Exception: If a product in the shopping list is not found in the store.
         """
+        self._check_shopping_list(shopping_list)
+        with self._locked(product for product, _ in shopping_list):
+            return self._apply_order(shopping_list)
+
+    def order_cents(self, shopping_list: List[Tuple[Product, int]]) -> int:
+        """
+        Place an order like order(), but price it in integer cents: every line is priced with its
+        promotion's integer rounding rule, and the total is their exact sum.
+        Returns:
+            int: Total cost in cents (see money.format_cents).
+        """
+        self._check_shopping_list(shopping_list)
+        with self._locked(product for product, _ in shopping_list):
+            return self._apply_order(shopping_list, cents=True)
+
+    def order_batch(self, shopping_lists: List[List[Tuple[Product, int]]], policy: str = "fifo") -> List[object]:
+        """
+            Place many orders in one pass. The stripe locks of all products in the batch are taken
+            once for the whole batch, all orders are checked together, and the demand is grouped
+            by product, so each product's stock is updated once for the whole batch.
+            Each order is still all-or-nothing, and one failing order doesn't affect the others.
+            Args:
+                shopping_lists (List[List[Tuple[Product, int]]]): The shopping list of each order.
+                policy (str): Which orders get the stock when there isn't enough for all of them:
+                "fifo" fills orders in the given order, with the same results as calling order()
+                for each; "max_filled" fills the smallest orders first, to fill as many orders as possible.
+            Returns:
+                List[object]: For each order (in the given order), its total cost, or the exception
+                order() would have raised for it. A failed order takes no stock.
+        """
+        if policy not in ("fifo", "max_filled"):
+            raise ValueError("policy must be 'fifo' or 'max_filled'.")
+        results: List[object] = [None] * len(shopping_lists)
+        valid = []
+        for index, shopping_list in enumerate(shopping_lists):
+            try:
+                # A malformed or unknown line fails its own order here, before any lock is taken.
+                self._check_shopping_list(shopping_list)
+                for product, _ in shopping_list:
+                    if product not in self:
+                        raise Exception(f"This {product} is not found in store")
+                valid.append(index)
+            except Exception as error:
+                results[index] = error
+        if policy == "max_filled":
+            valid.sort(key=lambda index: sum(quantity for _, quantity in shopping_lists[index]
+                                             if isinstance(quantity, int)))
+
+        with self._locked(product for index in valid for product, _ in shopping_lists[index]):
+            taken: Dict[Product, int] = {}  # units taken by the orders accepted so far
+            for index in valid:
+                order_taken: Dict[Product, int] = {}
+                total_price = 0.0
+                try:
+                    for product, quantity in shopping_lists[index]:
+                        if product not in self:     # removed since the check above
+                            raise Exception(f"This {product} is not found in store")
+                        ordered = order_taken.get(product, 0)
+                        product._check_purchase(quantity, taken.get(product, 0) + ordered, ordered)
+                        order_taken[product] = ordered + quantity
+                        if self.promotion_engine is None:
+                            total_price += self._quote_cache.line_price(product, quantity)
+                        else:
+                            total_price += self.promotion_engine.price(product, quantity)
+                except Exception as error:
+                    results[index] = error
+                    continue
+                for product, quantity in order_taken.items():
+                    taken[product] = taken.get(product, 0) + quantity
+                results[index] = total_price
+            # One stock update per product for the whole batch.
+            for product, quantity in taken.items():
+                product._take(quantity)
+        return results
+
+    def quote(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        """
+            Price an order without placing it: runs the same checks as order()
+            (store membership, active state, stock, LimitedProduct maximum) and applies promotions,
+            but changes nothing. Line prices come from a bounded LRU cache, so quoting the same
+            cart again costs about one dictionary lookup per line.
+            Args:
+                shopping_list (List[Tuple[Product, int]]): The order to price.
+            Returns:
+                float: What order() would currently charge for it.
+            Raises:
+                Exception: The exception order() would currently raise for it.
+        """
+        return self._quote(shopping_list, cents=False)
+
+    def quote_cents(self, shopping_list: List[Tuple[Product, int]]) -> int:
+        """
+            Like quote(), in integer cents: what order_cents() would currently charge.
+        """
+        return self._quote(shopping_list, cents=True)
+
+    def _quote(self, shopping_list: List[Tuple[Product, int]], cents: bool):
+        self._check_shopping_list(shopping_list)
+        with self._locked(product for product, _ in shopping_list):
+            for product, _ in shopping_list:
+                if product not in self:
+                    raise Exception(f"This {product} is not found in store")
+            taken: Dict[Product, int] = {}
+            total_price = 0 if cents else 0.0
+            for product, quantity in shopping_list:
+                already_taken = taken.get(product, 0)
+                product._check_purchase(quantity, already_taken, already_taken)
+                taken[product] = already_taken + quantity
+                total_price += self.line_price(product, quantity, cents)
+        return total_price
+
+    def line_price(self, product: Product, quantity: int, cents: bool = False):
+        """
+            The price of `quantity` units of a product at this store: with its promotion, or the promotion
+            engine's best deal if the store has one. Stock is not checked. Prices come from the quote cache.
+            Returns:
+                float: The price, or integer cents if `cents` is True.
+        """
+        if self.promotion_engine is None:
+            return self._quote_cache.line_price(product, quantity, cents)
+        if cents:
+            return self.promotion_engine.price_cents(product, quantity)
+        # Engine prices depend on the time of day, so they are not cached.
+        return self.promotion_engine.price(product, quantity)
+
+    def prepare(self, shopping_list: List[Tuple[Product, int]]) -> "PreparedOrder":
+        """
+            Check and price an order and keep its products locked, without taking any stock yet: the first
+            phase of placing orders in several stores all-or-nothing (see federation.FederatedStore).
+            Until the prepared order is committed or aborted nothing else can buy, reserve, change or
+            remove its products, so its commit() cannot run out of stock. Keep it short, and don't order the
+            same products from this store in between.
+            Use it as a context manager: leaving the with block without commit() aborts it.
+            Returns:
+                PreparedOrder: The checked order, with its total.
+            Raises:
+                Exception: The exception order() would raise for it. Nothing stays locked then.
+        """
+        self._check_shopping_list(shopping_list)
+        locks = ExitStack()
+        locks.enter_context(self._locked(product for product, _ in shopping_list))
+        try:
+            total_price = self._check_order(shopping_list)
+        except BaseException:
+            locks.close()
+            raise
+        return PreparedOrder(self, shopping_list, total_price, locks)
+
+    def reserve(self, product: Product, quantity: int, ttl: float = 900.0) -> int:
+        """
+            Hold units of a product for a customer, e.g. while they pay. Held units stay on hand
+            (get_quantity) but can't be bought by anyone else (get_available_quantity) until the hold
+            is committed, released, or expires after `ttl` seconds.
+            Args:
+                product (Product): The product to hold.
+                quantity (int): The number of units to hold.
+                ttl (float): Seconds until the hold expires and its units become available again.
+            Returns:
+                int: The hold id, to pass to commit() or release().
+            Raises:
+                Exception: The exception buying the units would currently raise.
+        """
+        if not isinstance(ttl, (int, float)) or ttl <= 0:
+            raise ValueError("Hold time must be a positive number of seconds.")
+        with self._stripe(product):
+            if product not in self:
+                raise Exception(f"This {product} is not found in store")
+            product._check_purchase(quantity)
+            return self._holds.add(product, quantity, ttl)
+
+    def commit(self, hold_id: int) -> float:
+        """
+            Buy the units of a hold, at the current price.
+            Returns:
+                float: The price paid.
+            Raises:
+                ValueError: If the hold was already committed, released or has expired.
+                Exception: If the purchase fails (e.g. the product was deactivated or its stock was set
+                below the held units); the hold is released in that case.
+        """
+        product = self._holds.get(hold_id).product
+        # The stripe lock keeps other buyers from taking the units between dropping the hold and buying them.
+        with self._stripe(product):
+            hold = self._holds.pop(hold_id)
+            return self._apply_order([(product, hold.quantity)])
+
+    def release(self, hold_id: int):
+        """
+            Cancel a hold, making its units available again.
+            Raises:
+                ValueError: If the hold was already committed, released or has expired.
+        """
+        self._holds.pop(hold_id)
+
+    def expire_holds(self, now: Optional[float] = None) -> int:
+        """
+            Release the holds that have expired. This also happens on its own whenever the available
+            quantity of a product is needed, so calling it is only useful to free memory early.
+            Args:
+                now (float, optional): A time.monotonic() value to expire against, instead of the current time.
+            Returns:
+                int: The number of holds released.
+        """
+        return len(self._holds.expire(now))
+
+    @staticmethod
+    def _check_shopping_list(shopping_list):
         if not isinstance(shopping_list, list):
             raise TypeError("Shopping list must be a list.")
-        if any(not isinstance(item, tuple) for item in shopping_list):
+        if any(not isinstance(item, tuple) or len(item) != 2 for item in shopping_list):
             raise TypeError("Each item in shopping list must be a tuple of [Product, int]")
 
-        total_price = 0.0
-        for product, quantity in shopping_list:
-            if product not in self.products:
+    def _apply_order(self, shopping_list: List[Tuple[Product, int]], cents: bool = False):
+        """
+            Buy every line of an order, or none of them. The caller holds the stripe locks of its products.
+            Returns the total as a float, or in integer cents if `cents` is True.
+        """
+        total_price = self._check_order(shopping_list, cents)
+        self._take_order(shopping_list)
+        return total_price
+
+    def _check_order(self, shopping_list: List[Tuple[Product, int]], cents: bool = False):
+        """
+            Check and price every line of an order without taking any stock, so a rejected order
+            changes nothing and listeners (indexes, WAL, change feed) never see it.
+            The caller holds the stripe locks of its products.
+        """
+        for product, _ in shopping_list:
+            if product not in self:
                 raise Exception(f"This {product} is not found in store")
-            total_price += product.buy(quantity)
+        taken: Dict[Product, int] = {}
+        total_price = 0 if cents else 0.0
+        for product, quantity in shopping_list:
+            already_taken = taken.get(product, 0)
+            product._check_purchase(quantity, already_taken, already_taken)
+            taken[product] = already_taken + quantity
+            if cents:
+                if self.promotion_engine is None:
+                    total_price += product._line_price_cents(quantity)
+                else:
+                    total_price += self.promotion_engine.price_cents(product, quantity)
+            elif self.promotion_engine is None:
+                total_price += product._line_price(quantity)
+            else:
+                total_price += self.promotion_engine.price(product, quantity)
         return total_price
+
+    def _take_order(self, shopping_list: List[Tuple[Product, int]]):
+        """
+            Take the stock of an order that _check_order accepted. The caller holds the stripe locks.
+        """
+        saved_state = {product: (product.get_quantity(), product.is_active()) for product, _ in shopping_list}
+        try:
+            for product, quantity in shopping_list:
+                product._take(quantity)
+        except Exception:
+            # Only a failing listener gets here: put back the lines already taken.
+            for product, (quantity, active) in saved_state.items():
+                if (product.get_quantity(), product.is_active()) != (quantity, active):
+                    product._restore(quantity, active)
+            raise
+
+
+class PreparedOrder:
+    """
+        An order checked and priced by Store.prepare, holding the stripe locks of its products.
+        commit() takes the stock and abort() gives up; both release the locks.
+    """
+
+    def __init__(self, store: Store, shopping_list: List[Tuple[Product, int]], total: float, locks: ExitStack):
+        self.store = store
+        self.shopping_list = shopping_list
+        self.total = total
+        self._locks: Optional[ExitStack] = locks
+
+    def __enter__(self) -> "PreparedOrder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.abort()
+
+    def commit(self) -> float:
+        """
+            Take the stock of the order.
+            Returns:
+                float: The total cost, as checked by prepare().
+            Raises:
+                ValueError: If the order was already committed or aborted.
+        """
+        if self._locks is None:
+            raise ValueError("Prepared order was already committed or aborted.")
+        try:
+            self.store._take_order(self.shopping_list)
+        finally:
+            self.abort()
+        return self.total
+
+    def abort(self):
+        """
+            Give up the order and release its products. Does nothing once committed or aborted.
+        """
+        locks, self._locks = self._locks, None
+        if locks is not None:
+            locks.close()
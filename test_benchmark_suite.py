@@ -0,0 +1,17 @@
+from benchmarks.suite import compare
+
+
+def test_compare_flags_only_slowdowns_above_threshold():
+    """
+    The test checks that compare() reports benchmarks that got slower than the threshold, and nothing else.
+    """
+    baseline = {"results": [{"name": "Product.buy", "size": 10, "ns_per_op": 100.0},
+                            {"name": "Store.order[1 lines]", "size": 10, "ns_per_op": 1000.0},
+                            {"name": "Store.get_total_quantity", "size": 10, "ns_per_op": 50.0}]}
+    current = {"results": [{"name": "Product.buy", "size": 10, "ns_per_op": 130.0},
+                           {"name": "Store.order[1 lines]", "size": 10, "ns_per_op": 1050.0},
+                           {"name": "Store.get_total_quantity", "size": 10, "ns_per_op": 20.0},
+                           {"name": "Store.get_all_products", "size": 10, "ns_per_op": 999.0}]}
+    regressions = compare(baseline, current, threshold=0.10)
+    assert [(r["name"], r["size"]) for r in regressions] == [("Product.buy", 10)]
+    assert regressions[0]["ratio"] == 1.3
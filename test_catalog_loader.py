@@ -0,0 +1,49 @@
+import json
+from catalog_loader import load_catalog
+from products import NonStockedProduct, LimitedProduct
+from promotion import SecondHalfPrice
+from store import Store
+
+PROMOTIONS = {"Second Half price!": SecondHalfPrice("Second Half price!")}
+
+
+def test_load_csv_catalog_with_bad_rows(tmp_path):
+    """
+    The test checks that valid CSV rows become products of the right type and that bad rows are reported, not fatal.
+    """
+    path = tmp_path / "catalog.csv"
+    path.write_text("type,name,price,quantity,maximum,promotion\n"
+                    "Product,MacBook Air M2,1450,100,,Second Half price!\n"
+                    "NonStockedProduct,Windows License,125,,,\n"
+                    "LimitedProduct,Shipping,10,250,1,\n"
+                    "Product,Broken,-5,1,,\n"
+                    "Product,Mystery,1,1,,No Such Promotion\n"
+                    "Gadget,Thing,1,1,,\n"
+                    "Product,MacBook Air M2,1,1,,\n")
+    store = Store(check_consistency=True)
+    report = load_catalog(store, str(path), PROMOTIONS, batch_size=2)
+
+    assert (report.rows, report.loaded, report.error_count) == (7, 3, 4)
+    assert [line for line, _ in report.errors] == [5, 6, 7, 8]
+    assert store.get_product("MacBook Air M2").promotion is PROMOTIONS["Second Half price!"]
+    assert isinstance(store.get_product("Windows License"), NonStockedProduct)
+    assert store.get_product("Shipping").max_quantity == 1
+    assert store.get_total_quantity() == 350
+    assert report.rows_per_sec > 0
+
+
+def test_load_jsonl_catalog(tmp_path):
+    """
+    The test checks loading a JSONL catalog, including a line that is not valid JSON.
+    """
+    path = tmp_path / "catalog.jsonl"
+    rows = [{"name": f"Item {i}", "price": 9.5, "quantity": i + 1} for i in range(25)]
+    rows.append({"type": "limited", "name": "Shipping", "price": 10, "quantity": 5, "maximum": 1})
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n{not json\n")
+    store = Store()
+    report = load_catalog(store, str(path), batch_size=10)
+
+    assert (report.rows, report.loaded, report.error_count) == (27, 26, 1)
+    assert isinstance(store.get_product("Shipping"), LimitedProduct)
+    assert store.get_total_quantity() == sum(range(1, 26)) + 5
+    assert [product.name for product in store.get_all_products()][:3] == ["Item 0", "Item 1", "Item 2"]
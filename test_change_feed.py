@@ -0,0 +1,76 @@
+import pytest
+from change_feed import ChangeFeed, FeedOverflow
+from products import Product
+from store import Store
+
+
+def make_store():
+    return Store([Product("MacBook Air M2", price=1450, quantity=100),
+                  Product("Google Pixel 7", price=500, quantity=250)])
+
+
+def summary(changes):
+    return [(event, product.name, quantity, active) for _, event, product, quantity, active in changes]
+
+
+def test_feed_records_every_change_in_order():
+    """
+    The test checks that purchases, quantity and activity changes, additions and removals are recorded in order.
+    """
+    store = make_store()
+    macbook = store.get_product("MacBook Air M2")
+    cursor = store.change_feed().cursor()
+    macbook.buy(100)
+    macbook.set_quantity(5)
+    macbook.deactivate()
+    case = Product("Pixel Case", price=20, quantity=3)
+    store.add_products(case)
+    store.remove_product(case)
+    changes = cursor.read()
+    assert [sequence for sequence, *_ in changes] == list(range(5))
+    assert summary(changes) == [("buy", "MacBook Air M2", 0, False), ("set_quantity", "MacBook Air M2", 5, True),
+                                ("deactivate", "MacBook Air M2", 5, False), ("add", "Pixel Case", 3, True),
+                                ("remove", "Pixel Case", 3, True)]
+    assert cursor.read() == [] and cursor.lag == 0
+
+
+def test_cursors_are_independent_and_read_in_batches():
+    """
+    The test checks that each cursor keeps its own position, reads in batches, and can start from the oldest event.
+    """
+    store = make_store()
+    feed = store.change_feed()
+    pixel = store.get_product("Google Pixel 7")
+    first = feed.cursor()
+    for _ in range(10):
+        pixel.buy(1)
+    second = feed.cursor()
+    pixel.buy(1)
+    assert [quantity for _, _, _, quantity, _ in first.read(4)] == [249, 248, 247, 246]
+    assert first.lag == 7
+    assert summary(second.read()) == [("buy", "Google Pixel 7", 239, True)]
+    assert len(first.read()) == 7
+    assert len(feed.cursor(start="earliest").read()) == 11
+
+
+def test_overflow_policies():
+    """
+    The test checks what a cursor does after the ring buffer overwrote events it had not read.
+    """
+    feed = ChangeFeed(capacity=8)
+    product = Product("Cable", price=1, quantity=100)
+    strict, lenient = feed.cursor(), feed.cursor(on_overflow="skip")
+    for _ in range(20):
+        product.buy(1)
+        feed("buy", product)
+    with pytest.raises(FeedOverflow) as overflow:
+        strict.read()
+    assert overflow.value.lost == 12
+    assert [sequence for sequence, *_ in strict.read()] == list(range(12, 20))
+    changes = lenient.read(5)
+    assert (lenient.lost, [sequence for sequence, *_ in changes]) == (12, [12, 13, 14, 15, 16])
+    for _ in range(3):
+        product.buy(1)
+        feed("buy", product)
+    assert [quantity for _, _, _, quantity, _ in lenient.read()] == [82, 81, 80, 79, 78, 77]
+    assert lenient.lost == 12
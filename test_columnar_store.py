@@ -0,0 +1,98 @@
+import pytest
+from columnar_store import ColumnarStore
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import PercentDiscount, SecondHalfPrice
+from promotion_engine import PromotionEngine, PromotionRule
+
+
+def make_store():
+    return ColumnarStore([Product("MacBook Air M2", price=1450, quantity=100),
+                          Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+                          NonStockedProduct("Windows License", price=125),
+                          LimitedProduct("Shipping", price=10, quantity=250, maximum=1)],
+                         check_consistency=True)
+
+
+def test_views_support_the_product_api():
+    """
+    The test checks that the views handed out by the store behave like the product types they were built from.
+    """
+    store = make_store()
+    macbook = store.get_product("MacBook Air M2")
+    assert isinstance(macbook, Product)
+    assert isinstance(store.get_product("Shipping"), LimitedProduct)
+    assert isinstance(store.get_product("Windows License"), NonStockedProduct)
+
+    macbook.set_promotion(SecondHalfPrice("Second Half price!"))
+    assert macbook.buy(2) == 1450 + 725
+    assert store.get_product("MacBook Air M2").get_quantity() == 98     # a fresh view sees the same row
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.get_product("Shipping").buy(2)
+    assert store.get_product("Windows License").buy(1000) == 125000
+
+
+def test_order_totals_and_active_filtering():
+    """
+    The test checks order, get_total_quantity and get_all_products on the columnar backend.
+    """
+    store = make_store()
+    earbuds = store.get_product("Bose QuietComfort Earbuds")
+    shipping = store.get_product("Shipping")
+    assert store.get_total_quantity() == 850
+
+    assert store.order([(earbuds, 500), (shipping, 1)]) == 500 * 250 + 10
+    assert store.get_total_quantity() == 349
+    assert [product.name for product in store.get_all_products()] == \
+        ["MacBook Air M2", "Windows License", "Shipping"]
+
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        store.order([(shipping, 1), (store.get_product("MacBook Air M2"), 101)])
+    assert shipping.get_quantity() == 249   # rolled back
+
+
+def test_remove_and_bulk_restock():
+    """
+    The test checks that removed products disappear and that restock updates many rows at once.
+    """
+    store = make_store()
+    macbook = store.get_product("MacBook Air M2")
+    macbook.set_quantity(0)
+    store.restock({"MacBook Air M2": 5, "Shipping": 50})
+    assert macbook.get_quantity() == 5 and macbook.is_active()
+    assert store.get_product("Shipping").get_quantity() == 300
+
+    store.remove_product(macbook)
+    assert macbook not in store
+    assert store.get_product("MacBook Air M2") is None
+    assert store.get_total_quantity() == 800
+    with pytest.raises(Exception, match="not found in store"):
+        store.order([(macbook, 1)])
+    # The view of a removed product can't write to its tombstone row.
+    events = []
+    store.add_listener(lambda event, product: events.append(event))
+    for change in (lambda: macbook.set_quantity(100), macbook.activate, lambda: setattr(macbook, "price", 1)):
+        with pytest.raises(ValueError, match="removed from the store"):
+            change()
+    assert events == [] and store.get_total_quantity() == 800
+    assert "MacBook Air M2" not in [product.name for product in store.get_all_products()]
+    store.verify()
+
+
+def test_many_promotions_large_limits_and_engine():
+    """
+    The test checks more than 65,535 distinct promotions, 64-bit purchase limits and a promotion engine.
+    """
+    engine = PromotionEngine()
+    engine.add_rule(PromotionRule(PercentDiscount("10% off!", percent=10), products=["Shipping"]))
+    store = ColumnarStore([LimitedProduct("Shipping", price=10, quantity=2 ** 40, maximum=2 ** 40)],
+                          promotion_engine=engine, quote_cache_size=10)
+    shipping = store.get_product("Shipping")
+    assert shipping.max_quantity == 2 ** 40
+    assert store.order([(shipping, 2)]) == pytest.approx(18)
+    promotions = [SecondHalfPrice(f"Promotion {number}") for number in range(70_000)]
+    views = store.add_products_batch([Product(f"Item {number}", price=1, quantity=1) for number in range(70_000)])
+    for view, promotion in zip(views, promotions):
+        view.set_promotion(promotion)
+    assert views[-1].promotion is promotions[-1] and views[0].promotion is promotions[0]
+    views[1].set_promotion(promotions[0])
+    assert len(store._promotions) == 70_001
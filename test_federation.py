@@ -0,0 +1,115 @@
+import pytest
+from federation import FederatedStore, NearestFirst, BalanceStock
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import SecondHalfPrice
+from store import Store
+
+
+def make_locations():
+    return {
+        "Berlin": Store([Product("MacBook Air M2", price=1450, quantity=5),
+                         Product("Google Pixel 7", price=500, quantity=100),
+                         LimitedProduct("Shipping", price=10, quantity=250, maximum=1)]),
+        "Hamburg": Store([Product("MacBook Air M2", price=1400, quantity=3),
+                          NonStockedProduct("Windows License", price=125)]),
+        "Munich": Store([Product("MacBook Air M2", price=1500, quantity=8),
+                         Product("Bose QuietComfort Earbuds", price=250, quantity=0)]),
+    }
+
+
+@pytest.fixture
+def fleet():
+    locations = make_locations()
+    locations["Munich"].get_product("Bose QuietComfort Earbuds").deactivate()
+    with FederatedStore(locations) as federation:
+        yield federation
+
+
+def test_fleet_wide_queries(fleet):
+    """
+    The test checks that the total quantity and the product listing are merged across locations.
+    """
+    assert fleet.get_total_quantity() == 5 + 100 + 250 + 3 + 8
+    products = fleet.get_all_products()
+    assert [product.name for product in products] == \
+        ["MacBook Air M2", "Google Pixel 7", "Shipping", "Windows License"]
+    macbook = products[0]
+    assert macbook.get_quantity() == 16 and macbook.price == 1400
+    assert macbook.stock() == {"Berlin": 5, "Hamburg": 3, "Munich": 8}
+    assert fleet.get_product("Bose QuietComfort Earbuds").locations == ["Munich"]
+    assert fleet.get_product("iPhone") is None
+    with FederatedStore(make_locations(), workers=1) as sequential:
+        assert sequential.get_total_quantity() == fleet.get_total_quantity()
+
+
+def test_line_is_split_across_locations(fleet):
+    """
+    The test checks that a line no location can fill alone is split, and priced as a whole where its first share is.
+    """
+    assert fleet.plan([("MacBook Air M2", 10)]) == [("Berlin", "MacBook Air M2", 5), ("Hamburg", "MacBook Air M2", 3),
+                                                    ("Munich", "MacBook Air M2", 2)]
+    assert fleet.order([("MacBook Air M2", 10), ("Windows License", 2)]) == 10 * 1450 + 250
+    assert fleet.get_product("MacBook Air M2").stock() == {"Berlin": 0, "Hamburg": 0, "Munich": 6}
+    # Repeated lines see the stock the earlier lines took.
+    assert fleet.plan([("MacBook Air M2", 4), ("MacBook Air M2", 2)]) == \
+        [("Munich", "MacBook Air M2", 4), ("Munich", "MacBook Air M2", 2)]
+
+
+def test_failed_order_keeps_all_stock(fleet):
+    """
+    The test checks that a failing line leaves every location's stock and holds as they were.
+    """
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        fleet.order([("MacBook Air M2", 10), ("Google Pixel 7", 101)])
+    with pytest.raises(Exception, match="not found in store"):
+        fleet.order([("MacBook Air M2", 1), ("iPhone", 1)])
+    with pytest.raises(Exception, match="product is not active"):
+        fleet.order([("Bose QuietComfort Earbuds", 1)])
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        fleet.order([("MacBook Air M2", 17)])
+    with pytest.raises(ValueError, match="cannot buy more than 1 units"):
+        fleet.order([("Shipping", 2)])
+    with pytest.raises(ValueError, match="cannot buy more than 1 units"):
+        fleet.order([("Shipping", 1), ("MacBook Air M2", 1), ("Shipping", 1)])
+    with pytest.raises(ValueError, match="cannot buy more than 1 units"):
+        fleet.plan([("Shipping", 1), ("Shipping", 1)])
+    with pytest.raises(Exception, match="not found in store"):
+        fleet.order([(5, 1)])
+    assert fleet.get_total_quantity() == 5 + 100 + 250 + 3 + 8
+    assert fleet.get_product("MacBook Air M2").get_available_quantity() == 16
+
+
+def test_split_line_keeps_its_promotion():
+    """
+    The test checks that a line split across locations gets its promotion on the whole line, and leaves no locks.
+    """
+    locations = {"Berlin": Store([Product("MacBook Air M2", price=100, quantity=1)]),
+                 "Hamburg": Store([Product("MacBook Air M2", price=100, quantity=1)]),
+                 "Munich": Store([Product("MacBook Air M2", price=100, quantity=2)])}
+    for store in locations.values():
+        store.get_product("MacBook Air M2").set_promotion(SecondHalfPrice("Second Half price!"))
+    with FederatedStore(locations, workers=1) as federation:
+        assert federation.order([("MacBook Air M2", 2)]) == 150
+        assert federation.get_product("MacBook Air M2").stock() == {"Berlin": 0, "Hamburg": 0, "Munich": 2}
+        assert federation.order([("MacBook Air M2", 2)]) == 150
+    # The products were unlocked again once the orders were placed.
+    berlin = locations["Berlin"]
+    berlin.get_product("MacBook Air M2").set_quantity(2)
+    assert berlin.order([(berlin.get_product("MacBook Air M2"), 2)]) == 150
+    with pytest.raises(ValueError, match="own Store"):
+        FederatedStore({"Berlin": locations["Berlin"], "Also Berlin": locations["Berlin"]})
+
+
+def test_routing_policies():
+    """
+    The test checks that nearest-first and balance-stock take the stock from different locations.
+    """
+    positions = {"Berlin": (52.5, 13.4), "Hamburg": (53.6, 10.0), "Munich": (48.1, 11.6)}
+    with FederatedStore(make_locations(), policy=NearestFirst(positions)) as nearest:
+        assert nearest.plan([("MacBook Air M2", 4)], destination=(48.4, 10.9)) == [("Munich", "MacBook Air M2", 4)]
+        assert nearest.plan([("MacBook Air M2", 4)], destination=(53.5, 10.0)) == \
+            [("Hamburg", "MacBook Air M2", 3), ("Berlin", "MacBook Air M2", 1)]
+    with FederatedStore(make_locations(), policy=BalanceStock()) as balanced:
+        for _ in range(4):
+            balanced.order([("MacBook Air M2", 2)])
+        assert balanced.get_product("MacBook Air M2").stock() == {"Berlin": 3, "Hamburg": 3, "Munich": 2}
@@ -0,0 +1,101 @@
+import json
+import pytest
+import instrumentation
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import ThirdOneFree, PercentDiscount
+from promotion_engine import PromotionEngine, PromotionRule
+from store import Store
+
+
+@pytest.fixture
+def metrics():
+    instrumentation.metrics.reset()
+    instrumentation.enable()
+    yield instrumentation.metrics
+    instrumentation.disable()
+    instrumentation.metrics.reset()
+
+
+def test_counts_calls_and_failures_by_reason(metrics):
+    """
+    The test checks that calls, latencies and failures are recorded per operation, reason and product type.
+    """
+    earbuds = Product("Bose QuietComfort Earbuds", price=250, quantity=5)
+    earbuds.set_promotion(ThirdOneFree("Third One Free!"))
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    store = Store([earbuds, shipping])
+
+    store.order([(earbuds, 3), (shipping, 1)])
+    for shopping_list in ([(earbuds, 10)], [(shipping, 2)]):
+        with pytest.raises(Exception):
+            store.order(shopping_list)
+    shipping.buy(1)
+    earbuds.buy(1)
+    with pytest.raises(Exception):
+        shipping.buy(2)
+    with pytest.raises(Exception):
+        earbuds.buy(10)
+
+    assert metrics.calls[("order", "Store")] == 3
+    # The order's stock takes and the direct buys; buy() -> _take() is not counted twice.
+    assert metrics.calls[("buy", "LimitedProduct")] == 3
+    assert metrics.calls[("buy", "Product")] == 3
+    assert metrics.failures[("check_purchase", "limit_exceeded", "LimitedProduct")] == 2
+    assert metrics.calls[("apply_promotion", "ThirdOneFree:Product")] == 2     # the order line and the buy
+    assert metrics.failures[("buy", "out_of_stock", "Product")] == 1
+    assert metrics.failures[("buy", "limit_exceeded", "LimitedProduct")] == 1
+    assert metrics.failures[("order", "out_of_stock", "Store")] == 1
+    assert metrics.latency[("order", "Store")].count == 3
+
+    exported = json.loads(metrics.export_json())
+    assert {"operation": "order", "product_type": "Store", "count": 3} in exported["calls"]
+    text = metrics.export_text()
+    assert 'store_failures_total{operation="buy",reason="limit_exceeded",product_type="LimitedProduct"} 1' in text
+    assert 'store_latency_seconds_count{operation="order",product_type="Store"} 3' in text
+
+
+def test_every_order_path_is_recorded(metrics):
+    """
+    The test checks that the batch, cents, quote, reservation and promotion engine paths are all recorded,
+    down to the purchase checks and stock takes they make.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=10)
+    macbook.set_promotion(ThirdOneFree("Third One Free!"))
+    windows = NonStockedProduct("Windows License", price=125)
+    store = Store([macbook, windows])
+
+    store.order_batch([[(macbook, 1)], [(macbook, 1), (windows, 1)], [(macbook, 100)]])
+    store.order_cents([(macbook, 1)])
+    store.quote([(macbook, 1)])
+    store.quote_cents([(macbook, 1)])
+    store.commit(store.reserve(macbook, 1))
+    engine = PromotionEngine()
+    engine.add_rule(PromotionRule(PercentDiscount("10% off!", percent=10)))
+    engine_store = Store([Product("Google Pixel 7", price=500, quantity=5)], promotion_engine=engine)
+    with pytest.raises(Exception):
+        engine_store.order([(engine_store.get_product("Google Pixel 7"), 6)])
+    engine_store.order([(engine_store.get_product("Google Pixel 7"), 2)])
+
+    for operation in ("order_batch", "order_cents", "quote", "quote_cents", "reserve", "commit"):
+        assert metrics.calls[(operation, "Store")] == 1, operation
+    assert metrics.calls[("order", "Store")] == 2
+    # order_batch takes each product's stock once for the batch; then order_cents, commit and the engine order.
+    assert metrics.calls[("buy", "Product")] == 4
+    assert metrics.calls[("buy", "NonStockedProduct")] == 1
+    assert metrics.failures[("check_purchase", "out_of_stock", "Product")] == 2
+    assert metrics.failures[("order", "out_of_stock", "Store")] == 1
+    assert metrics.calls[("apply_promotion_cents", "ThirdOneFree")] >= 2
+    assert metrics.calls[("apply_promotion", "PercentDiscount:Product")] == 1
+    assert macbook.get_quantity() == 6
+
+
+def test_disable_restores_original_methods():
+    """
+    The test checks that disabling instrumentation puts back the original, unwrapped methods.
+    """
+    original_buy, original_order, original_take = Product.buy, Store.order, Product._take
+    instrumentation.enable()
+    assert Product.buy is not original_buy and Product._take is not original_take
+    instrumentation.disable()
+    assert Product.buy is original_buy and Store.order is original_order and Product._take is original_take
+    assert not instrumentation.is_enabled()
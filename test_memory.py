@@ -0,0 +1,33 @@
+import os
+import pytest
+from benchmarks.memory import FACTORIES, measure
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree
+
+# Set BENCH_PRODUCTS=1000000 to run the memory benchmark at full size.
+PRODUCT_COUNT = int(os.environ.get("BENCH_PRODUCTS", "20000"))
+# With __slots__ a product is a bare object of 6-7 pointers, well below the ~130 bytes it took with a __dict__.
+MAX_BYTES_PER_PRODUCT = 96
+
+
+@pytest.mark.parametrize("type_name", FACTORIES)
+def test_product_memory_footprint(type_name):
+    """
+    The test checks that products of each type stay within the memory budget and have no per-instance __dict__.
+    """
+    factory = FACTORIES[type_name]
+    assert not hasattr(factory("Probe"), "__dict__")
+    result = measure(factory, PRODUCT_COUNT)
+    assert result["bytes_per_product"] <= MAX_BYTES_PER_PRODUCT
+
+
+@pytest.mark.parametrize("promotion", [PercentDiscount("30% off!", percent=30), SecondHalfPrice("Second Half price!"),
+                                       ThirdOneFree("Third One Free!")])
+def test_promotions_are_immutable(promotion):
+    """
+    The test checks that a promotion cannot be changed after creation, so it is safe to share between products.
+    """
+    with pytest.raises(AttributeError):
+        promotion.name = "Changed"
+    with pytest.raises(AttributeError):
+        promotion.percent = 90
+    assert not hasattr(promotion, "__dict__")
@@ -0,0 +1,85 @@
+from decimal import Decimal
+import pytest
+from benchmarks.money import decimal_line_price, make_lines
+from money import format_cents, to_cents
+from products import Product, NonStockedProduct
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree, apply_promotions_cents_batch
+from promotion_engine import PromotionEngine, PromotionRule
+from store import Store
+
+
+def test_to_cents():
+    """
+    The test checks conversions to cents, including floats that are not exact in binary and fractions of a cent.
+    """
+    assert [to_cents(amount) for amount in (19.99, 0.1 + 0.2, 1450, 1.005, Decimal("2.345"), "0.994")] == \
+        [1999, 30, 145000, 101, 235, 99]
+    assert format_cents(123456789) == "$1,234,567.89"
+    assert format_cents(-5) == "-$0.05"
+
+
+def test_promotion_rounding_rules():
+    """
+    The test checks each promotion's documented cents rounding rule against exact Decimal arithmetic.
+    """
+    assert SecondHalfPrice("Second Half price!").apply_promotion_cents(999, 2) == 1499     # 9.99 + 4.995 -> 14.99
+    assert SecondHalfPrice("Second Half price!").apply_promotion_cents(999, 1) == 999
+    assert PercentDiscount("30% off!", percent=30).apply_promotion_cents(999, 3) == 2098   # 20.979 -> 20.98
+    assert PercentDiscount("12.5% off", percent=12.5).apply_promotion_cents(100, 1) == 88   # 0.875 -> 0.88
+    assert ThirdOneFree("Third One Free!").apply_promotion_cents(999, 7) == 4995
+    for product, quantity in make_lines(2000, seed=3):
+        assert Decimal(product._line_price_cents(quantity)) / 100 == decimal_line_price(product, quantity)
+
+
+def test_order_cents_is_exact():
+    """
+    The test checks that order_cents and quote_cents return the exact total where float sums are off.
+    """
+    store = Store([Product("Cable", price=0.1, quantity=100), Product("Plug", price=0.2, quantity=100),
+                   NonStockedProduct("Windows License", price=125.99)])
+    cable, plug, windows = store.products
+    windows.set_promotion(PercentDiscount("30% off!", percent=30))     # non-stocked products ignore promotions
+    assert store.order([(cable, 1), (plug, 1)]) != 0.3
+    assert store.quote_cents([(cable, 1), (plug, 1), (windows, 2)]) == 30 + 25198
+    assert store.order_cents([(cable, 1), (plug, 1), (windows, 2)]) == 30 + 25198
+    assert cable.get_quantity() == 98
+    with pytest.raises(Exception, match="not enough quantity"):
+        store.order_cents([(cable, 1), (plug, 200)])
+    assert cable.get_quantity() == 98
+
+
+def test_promotion_engine_in_cents():
+    """
+    The test checks that the promotion engine picks the best deal and stacks discounts in cents.
+    """
+    engine = PromotionEngine()
+    engine.add_rule(PromotionRule(ThirdOneFree("Third One Free!"), products=["MacBook Air M2"]))
+    engine.add_rule(PromotionRule(PercentDiscount("5% extra", percent=5), stackable=True))
+    store = Store([Product("MacBook Air M2", price=1449.99, quantity=100)], promotion_engine=engine)
+    macbook = store.get_product("MacBook Air M2")
+    # 2 paid units = 2899.98, minus 5% = 2754.981 -> 2754.98
+    assert store.quote_cents([(macbook, 3)]) == 275498
+    assert store.order_cents([(macbook, 3)]) == 275498
+
+
+def test_vectorized_cents_match_scalar():
+    """
+    The test checks that batch cents pricing gives the same integers as the scalar path.
+    """
+    pytest.importorskip("numpy")
+    lines = make_lines(5000, seed=5)
+    totals = apply_promotions_cents_batch(lines)
+    assert totals.tolist() == [product._line_price_cents(quantity) for product, quantity in lines]
+
+
+def test_vectorized_cents_match_scalar_for_inexact_percents():
+    """
+    The test checks that a percent without a small exact fraction (100/3) gives the scalar cents, not int64 overflow.
+    """
+    pytest.importorskip("numpy")
+    prices_cents, quantities = [1999, 145000, 1, 0], [3, 7, 1000, 2]
+    for percent in (100 / 3, 12.5, 33.3333):
+        promotion = PercentDiscount("Third off!", percent=percent)
+        expected = [promotion.apply_promotion_cents(price, quantity) for price, quantity in zip(prices_cents, quantities)]
+        assert promotion.apply_promotion_cents_batch(prices_cents, quantities).tolist() == expected
+    assert expected[:2] == [3998, 676667]
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from benchmarks.async_checkout import service_throughput
+from order_service import OrderService
+from products import Product, LimitedProduct
+from store import Store
+
+
+def test_concurrent_clients_get_their_own_results_and_errors():
+    """
+    The test checks that each client gets the result (or exception) of its own order, and that orders are batched.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=50)
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    store = Store([macbook, shipping])
+
+    async def run():
+        async with OrderService(store, max_pending=8, max_batch=16) as service:
+            good = [service.order([(macbook, 1), (shipping, 1)]) for _ in range(40)]
+            bad = service.order([(shipping, 2)])
+            results = await asyncio.gather(*good, bad, return_exceptions=True)
+        return results, service.batches
+
+    results, batches = asyncio.run(run())
+    assert results[:40] == [1460.0] * 40
+    assert isinstance(results[40], ValueError)
+    assert batches < 41
+    assert macbook.get_quantity() == 10 and shipping.get_quantity() == 210
+
+
+def test_cancelled_and_malformed_orders_are_not_placed():
+    """
+    The test checks that an order cancelled while queued takes no stock, and that a malformed order
+    fails on its own without failing the orders batched with it.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=100)
+    store = Store([macbook])
+
+    async def run():
+        async with OrderService(store) as service:
+            cancelled = asyncio.create_task(service.order([(macbook, 5)]))
+            await asyncio.sleep(0)      # queued, not placed yet
+            cancelled.cancel()
+            return await asyncio.gather(service.order([(macbook, 1, "x")]), service.order([(macbook, 1)]),
+                                        return_exceptions=True)
+
+    malformed, placed = asyncio.run(run())
+    assert isinstance(malformed, TypeError) and placed == 1450
+    assert macbook.get_quantity() == 99
+
+
+def test_order_requires_running_service():
+    """
+    The test checks that ordering through a service that was not started raises an error.
+    """
+    service = OrderService(Store())
+    with pytest.raises(RuntimeError, match="not running"):
+        asyncio.run(service.order([]))
+
+
+def test_concurrent_clients_are_coalesced_into_batches():
+    """
+    The test checks with the load generator that one client gets one order per batch, while 100 concurrent
+    clients share batches (fewer batches than orders). Throughput is reported by benchmarks/async_checkout.py.
+    """
+    _, batch_size = asyncio.run(service_throughput(500, clients=1))
+    assert batch_size == 1
+    _, batch_size = asyncio.run(service_throughput(2000, clients=100))
+    assert batch_size > 1
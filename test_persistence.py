@@ -0,0 +1,128 @@
+import os
+import threading
+import pytest
+from persistence import checkpoint, open_store, save_snapshot, load_snapshot
+from products import Product, NonStockedProduct, LimitedProduct
+from promotion import SecondHalfPrice, ThirdOneFree
+from store import Store
+
+PROMOTIONS = {"Second Half price!": SecondHalfPrice("Second Half price!"),
+              "Third One Free!": ThirdOneFree("Third One Free!")}
+
+
+def make_store():
+    products = [Product("MacBook Air M2", price=1450, quantity=100),
+                Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+                NonStockedProduct("Windows License", price=125),
+                LimitedProduct("Shipping", price=10, quantity=250, maximum=1)]
+    products[0].set_promotion(PROMOTIONS["Second Half price!"])
+    products[1].set_promotion(PROMOTIONS["Third One Free!"])
+    return Store(products)
+
+
+def state(store):
+    return [(type(p).__name__, p.name, p.price, p.get_quantity(), p.is_active(),
+             p.promotion.name if p.promotion else None) for p in store.products]
+
+
+def test_snapshot_round_trip(tmp_path):
+    """
+    The test checks that a store loaded from a snapshot has the same products, stock and promotions.
+    """
+    store = make_store()
+    store.get_product("Bose QuietComfort Earbuds").deactivate()
+    path = str(tmp_path / "inventory.snap")
+    save_snapshot(store, path)
+    restored = load_snapshot(path, PROMOTIONS)
+    assert state(restored) == state(store)
+    assert restored.get_product("Shipping").max_quantity == 1
+
+
+def test_restart_replays_log_after_snapshot(tmp_path):
+    """
+    The test checks that changes made after the snapshot survive a restart through the log.
+    """
+    snapshot_path, log_path = str(tmp_path / "inventory.snap"), str(tmp_path / "inventory.log")
+    save_snapshot(make_store(), snapshot_path)
+
+    store, log = open_store(snapshot_path, log_path, PROMOTIONS, sync_every=2)
+    store.order([(store.get_product("MacBook Air M2"), 40), (store.get_product("Shipping"), 1)])
+    store.get_product("Bose QuietComfort Earbuds").set_quantity(7)
+    store.remove_product(store.get_product("Windows License"))
+    store.get_product("Shipping").price = 12.5
+    store.get_product("MacBook Air M2").remove_promotion()
+    store.get_product("Shipping").set_promotion(PROMOTIONS["Third One Free!"])
+    store.add_products(Product("Google Pixel 7", price=500, quantity=250))
+    log.sync()
+    logged = os.path.getsize(log_path)
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.order([(store.get_product("Google Pixel 7"), 5), (store.get_product("Shipping"), 2)])
+    log.sync()
+    assert os.path.getsize(log_path) == logged     # a rejected order changes nothing, so nothing is logged
+    store.remove_listener(log)
+    log.close()
+    with open(log_path, "ab") as file:
+        file.write(b"\x10\x00torn")     # a half-written record from a crash is ignored
+
+    restored, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    assert state(restored) == state(store)
+    restored.get_product("Google Pixel 7").buy(1)
+    store.get_product("Google Pixel 7").buy(1)
+    log.close()
+
+    restored, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    assert state(restored) == state(store)
+
+    checkpoint(restored, snapshot_path, log)
+    log.close()
+    restored_again, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    log.close()
+    assert state(restored_again) == state(store)
+
+
+def test_large_values_are_logged(tmp_path):
+    """
+    The test checks that purchase limits and names beyond 32/16 bits are logged, snapshotted and restored.
+    """
+    snapshot_path, log_path = str(tmp_path / "inventory.snap"), str(tmp_path / "inventory.log")
+    store, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    long_name = "Extended Warranty " * 4000
+    store.add_products(LimitedProduct(long_name, price=1, quantity=2 ** 40, maximum=2 ** 40))
+    assert store.order([(store.get_product(long_name), 2 ** 33)]) == 2 ** 33
+    log.close()
+
+    restored, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    assert state(restored) == state(store)
+    assert restored.get_product(long_name).max_quantity == 2 ** 40
+    checkpoint(restored, snapshot_path, log)
+    log.close()
+    restored, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    log.close()
+    assert state(restored) == state(store)
+
+
+def test_checkpoint_keeps_concurrent_changes(tmp_path):
+    """
+    The test checks that orders and additions made while checkpoints run are all in the snapshot or the log.
+    """
+    snapshot_path, log_path = str(tmp_path / "inventory.snap"), str(tmp_path / "inventory.log")
+    save_snapshot(make_store(), snapshot_path)
+    store, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    macbook = store.get_product("MacBook Air M2")
+
+    def write():
+        for number in range(200):
+            store.order([(macbook, 1)] if number % 2 else [(store.get_product("Shipping"), 1)])
+            store.add_products(Product(f"Cable {number}", price=5, quantity=number + 1))
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        checkpoint(store, snapshot_path, log)
+    writer.join()
+    log.close()
+
+    restored, log = open_store(snapshot_path, log_path, PROMOTIONS)
+    log.close()
+    assert state(restored) == state(store)
+    assert macbook.get_quantity() == 0 and len(restored) == 4 + 200
@@ -0,0 +1,35 @@
+import pytest
+from products import Product
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree, apply_promotions_batch
+
+np = pytest.importorskip("numpy")
+
+PROMOTIONS = [PercentDiscount("30% off!", percent=30), PercentDiscount("12.5% off!", percent=12.5),
+              SecondHalfPrice("Second Half price!"), ThirdOneFree("Third One Free!")]
+
+
+@pytest.mark.parametrize("promotion", PROMOTIONS, ids=lambda promotion: promotion.name)
+def test_batch_matches_scalar(promotion):
+    """
+    The test checks that apply_promotion_batch returns exactly what apply_promotion returns line by line.
+    """
+    prices = [0, 1, 9.99, 125, 1450, 0.1, 333.33]
+    quantities = list(range(1, 8))
+    product_prices = [p for p in prices for _ in quantities]
+    line_quantities = [q for _ in prices for q in quantities]
+    expected = [promotion.apply_promotion(Product("Item", price=p, quantity=10), q)
+                for p, q in zip(product_prices, line_quantities)]
+    assert promotion.apply_promotion_batch(product_prices, line_quantities).tolist() == expected
+
+
+def test_mixed_lines_are_grouped_by_promotion():
+    """
+    The test checks that apply_promotions_batch prices lines with different (or no) promotions in input order.
+    """
+    products = [Product(f"Item {i}", price=10 * (i + 1), quantity=10) for i in range(5)]
+    for product, promotion in zip(products, PROMOTIONS):
+        product.set_promotion(promotion)
+    lines = [(products[i % 5], i % 7 + 1) for i in range(20)]
+    expected = [product.promotion.apply_promotion(product, quantity) if product.promotion
+                else product.price * quantity for product, quantity in lines]
+    assert apply_promotions_batch(lines).tolist() == expected
@@ -0,0 +1,84 @@
+import pytest
+from products import Product, NonStockedProduct
+from promotion import PercentDiscount, SecondHalfPrice, ThirdOneFree
+from promotion_engine import PromotionEngine, PromotionRule
+from store import Store
+
+
+@pytest.fixture
+def engine():
+    engine = PromotionEngine(categories={"Bose QuietComfort Earbuds": "audio"})
+    engine.add_rule(PromotionRule(PercentDiscount("10% off!", percent=10)))
+    engine.add_rule(PromotionRule(ThirdOneFree("Third One Free!"), categories=["audio"]))
+    engine.add_rule(PromotionRule(SecondHalfPrice("Weekend half price!"), products=["MacBook Air M2"],
+                                  starts_at=1000, ends_at=2000))
+    engine.add_rule(PromotionRule(PercentDiscount("Members 5% off!", percent=5), stackable=True))
+    return engine
+
+
+def test_best_rule_wins_and_stackable_rules_apply_on_top(engine):
+    """
+    The test checks that the cheapest exclusive rule is chosen per product and that stackable discounts are added.
+    """
+    earbuds = Product("Bose QuietComfort Earbuds", price=100, quantity=500)
+    macbook = Product("MacBook Air M2", price=1000, quantity=100)
+
+    deal = engine.best_deal(earbuds, 3, moment=0)      # third free (200) beats 10% off (270)
+    assert [rule.promotion.name for rule in deal.rules] == ["Third One Free!", "Members 5% off!"]
+    assert deal.total == pytest.approx(190)
+
+    assert engine.price(macbook, 2, moment=0) == pytest.approx(1800 * 0.95)    # outside the weekend window
+    assert engine.price(macbook, 2, moment=1500) == pytest.approx(1500 * 0.95)
+
+
+def test_rules_only_reach_their_targets(engine):
+    """
+    The test checks that rules for other products, categories or times are not applicable.
+    """
+    pixel = Product("Google Pixel 7", price=500, quantity=250)
+    names = {rule.promotion.name for rule in engine.applicable_rules(pixel, moment=1500)}
+    assert names == {"10% off!", "Members 5% off!"}
+    with pytest.raises(ValueError, match="Only percentage discounts can be stacked."):
+        PromotionRule(ThirdOneFree("Third One Free!"), stackable=True)
+
+
+
+def test_removing_an_unknown_rule_changes_nothing(engine):
+    """
+    The test checks that removing a rule that was never added, or adding one twice, raises and changes nothing.
+    """
+    pixel = Product("Google Pixel 7", price=500, quantity=250)
+    stranger = PromotionRule(ThirdOneFree("Third One Free!"), products=["Google Pixel 7"], categories=["audio"])
+    with pytest.raises(ValueError, match="not found"):
+        engine.remove_rule(stranger)
+    assert len(engine) == 4
+    rule = engine.add_rule(PromotionRule(SecondHalfPrice("Half price!"), products=["Google Pixel 7"]))
+    with pytest.raises(ValueError, match="already"):
+        engine.add_rule(rule)
+    assert len(engine) == 5 and engine.price(pixel, 2, moment=0) == pytest.approx(750 * 0.95)
+    engine.remove_rule(rule)
+    assert len(engine) == 4 and engine.price(pixel, 2, moment=0) == pytest.approx(900 * 0.95)
+
+
+def test_store_prices_orders_with_the_engine(engine):
+    """
+    The test checks that a store with a promotion engine uses it for quote() and order().
+    """
+    earbuds = Product("Bose QuietComfort Earbuds", price=100, quantity=500)
+    store = Store([earbuds], promotion_engine=engine)
+    assert store.quote([(earbuds, 3)]) == pytest.approx(190)
+    assert store.order([(earbuds, 3)]) == pytest.approx(190)
+    assert earbuds.get_quantity() == 497
+
+
+def test_non_stocked_products_keep_their_regular_price(engine):
+    """
+    The test checks that the engine prices a non-stocked product like the product does, without any rule.
+    """
+    license = NonStockedProduct("Windows License", price=125)
+    license.set_promotion(ThirdOneFree("Third One Free!"))
+    deal = engine.best_deal(license, 3, moment=0)
+    assert (deal.total, deal.rules) == (375, ())
+    assert engine.price_cents(license, 3, moment=0) == 37500
+    store = Store([license], promotion_engine=engine)
+    assert store.order([(license, 3)]) == license.buy(3) == 375
@@ -0,0 +1,93 @@
+import pytest
+import main
+import replay
+from products import Product, LimitedProduct
+from store import Store
+
+
+def make_store():
+    return Store([Product("MacBook Air M2", price=1450, quantity=10),
+                  Product("Google Pixel 7", price=500, quantity=250),
+                  LimitedProduct("Shipping", price=10, quantity=250, maximum=1)])
+
+
+def test_synthetic_orders_are_repeatable(tmp_path):
+    """
+    The test checks that the same seed gives the same orders and that orders survive a round trip through a log.
+    """
+    store = make_store()
+    orders = list(replay.generate_orders(store, 50, seed=7))
+    assert orders == list(replay.generate_orders(store, 50, seed=7))
+    assert orders != list(replay.generate_orders(store, 50, seed=8))
+    path = tmp_path / "orders.jsonl"
+    assert replay.write_order_log(str(path), orders) == 50
+    assert list(replay.read_order_log(str(path))) == orders
+
+
+def test_replay_reports_successes_and_failures():
+    """
+    The test checks the order counts, the failure breakdown and the latencies of a replay.
+    """
+    store = make_store()
+    orders = [[("MacBook Air M2", 6)], [("MacBook Air M2", 6)], [("Shipping", 2)],
+              [("Google Pixel 7", 1), ("Shipping", 1)], [("iPhone", 1)]]
+    report = replay.replay(store, orders)
+    assert (report.orders, report.succeeded) == (5, 2)
+    assert report.failures == {"Exception: not enough quantity in stock.": 1,
+                               "ValueError: cannot buy more than 1 units of this product.": 1,
+                               "LookupError: unknown product 'iPhone'": 1}
+    assert len(report.latencies) == 5 and report.orders_per_second > 0
+    assert store.get_product("MacBook Air M2").get_quantity() == 4
+    assert "5 orders" in report.summary()
+
+
+def test_replay_at_target_rate():
+    """
+    The test checks that a target rate spaces the orders out.
+    """
+    report = replay.replay(make_store(), [[("Google Pixel 7", 1)]] * 21, rate=1000)
+    assert report.seconds >= 0.02
+    assert report.orders_per_second <= 1100
+
+
+def test_percentiles_and_invalid_log(tmp_path):
+    """
+    The test checks nearest-rank percentiles and that malformed log lines are skipped and reported by line number.
+    """
+    report = replay.ReplayReport()
+    report.latencies = [float(value) for value in range(100, 0, -1)]
+    assert (report.percentile(50), report.percentile(99), report.percentile(100)) == (50, 99, 100)
+    path = tmp_path / "orders.jsonl"
+    path.write_text('{"items": [["Shipping", 1]]}\n{"items": 3}\nnot json\n{"items": [["Shipping", 1]]}\n')
+    invalid = []
+    assert list(replay.read_order_log(str(path), invalid)) == [[("Shipping", 1)]] * 2
+    assert [message.split(": ")[0] for message in invalid] == [f"{path}:2", f"{path}:3"]
+    assert len(list(replay.read_order_log(str(path)))) == 2
+
+
+def test_main_headless_mode(capsys):
+    """
+    The test checks the command line of main.py in synthetic replay mode.
+    """
+    main.run_headless(make_store(), main.parse_args(["--synthetic", "100", "--seed", "1"]))
+    assert "100 orders" in capsys.readouterr().out
+    arguments = main.parse_args(["--synthetic", "0"])
+    assert arguments.synthetic == 0
+    main.run_headless(make_store(), arguments)
+    assert "0 orders" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main.parse_args(["--synthetic", "-1"])
+
+
+def test_main_replay_skips_invalid_lines(tmp_path, capsys):
+    """
+    The test checks that a replay from the command line places the valid orders and reports the invalid lines.
+    """
+    path = tmp_path / "orders.jsonl"
+    path.write_text('{"items": [["Google Pixel 7", 1]]}\n{"items": 3}\n{"items": [["Google Pixel 7", 2]]}\n')
+    store = make_store()
+    main.run_headless(store, main.parse_args(["--replay", str(path)]))
+    out = capsys.readouterr().out
+    assert "2 orders" in out and "2 succeeded" in out
+    assert "1 invalid log lines skipped" in out and "orders.jsonl:2" in out
+    assert store.get_product("Google Pixel 7").get_quantity() == 247
@@ -0,0 +1,104 @@
+import time
+import pytest
+from products import Product, LimitedProduct
+from promotion import PercentDiscount
+from store import Store
+
+
+def make_store():
+    return Store([Product("MacBook Air M2", price=1450, quantity=100),
+                  Product("Google Pixel 7", price=500, quantity=250),
+                  LimitedProduct("Shipping", price=10, quantity=250, maximum=1)])
+
+
+def test_hold_sets_units_aside_until_committed():
+    """
+    The test checks that held units stay on hand but can't be bought by others, and that committing buys them.
+    """
+    store = make_store()
+    macbook = store.get_product("MacBook Air M2")
+    hold = store.reserve(macbook, 90)
+    assert (macbook.get_quantity(), macbook.get_available_quantity()) == (100, 10)
+    with pytest.raises(Exception, match="not enough quantity"):
+        store.order([(macbook, 11)])
+    assert store.order([(macbook, 10)]) == 14500
+    macbook.set_promotion(PercentDiscount("10% off", percent=10))
+    assert store.commit(hold) == pytest.approx(90 * 1450 * 0.9)
+    assert (macbook.get_quantity(), macbook.get_available_quantity(), macbook.is_active()) == (0, 0, False)
+    with pytest.raises(ValueError, match="not found"):
+        store.commit(hold)
+
+
+def test_release_and_reserve_checks():
+    """
+    The test checks that releasing a hold frees its units and that a hold is checked like a purchase.
+    """
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    hold = store.reserve(pixel, 250)
+    with pytest.raises(Exception, match="not enough quantity"):
+        store.reserve(pixel, 1)
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.reserve(store.get_product("Shipping"), 2)
+    with pytest.raises(Exception, match="not found in store"):
+        store.reserve(Product("Elsewhere", price=1, quantity=1), 1)
+    store.release(hold)
+    assert pixel.get_available_quantity() == 250
+    with pytest.raises(ValueError, match="not found"):
+        store.release(hold)
+
+
+def test_failed_commit_releases_hold():
+    """
+    The test checks that a hold on a product that was deactivated since can't be committed and is dropped.
+    """
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    hold = store.reserve(pixel, 5)
+    pixel.deactivate()
+    with pytest.raises(Exception, match="not active"):
+        store.commit(hold)
+    assert (pixel.get_quantity(), pixel.get_available_quantity()) == (250, 250)
+
+
+def test_expired_holds_are_reclaimed():
+    """
+    The test checks that an expired hold no longer blocks stock and can't be committed.
+    """
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    hold = store.reserve(pixel, 200, ttl=0.01)
+    assert pixel.get_available_quantity() == 50
+    time.sleep(0.02)
+    assert pixel.get_available_quantity() == 250
+    with pytest.raises(ValueError, match="expired"):
+        store.commit(hold)
+
+
+def test_million_concurrent_holds():
+    """
+    The test checks one million holds at once: held stock is unavailable, and expiring a few of them
+    only takes those few off the expiry heap.
+    """
+    products = [Product(f"Product {index}", price=1, quantity=1000) for index in range(1000)]
+    store = Store(products)
+    holds = [store.reserve(products[index % 1000], 1, ttl=1800 if index % 1000 == 0 else 3600)
+             for index in range(1_000_000)]
+    assert all(product.get_available_quantity() == 0 for product in products)
+    with pytest.raises(Exception, match="not enough quantity"):
+        store.order([(products[1], 1)])
+
+    # Only the expired holds come off the expiry heap; the others are not looked at.
+    now = time.monotonic() + 2000
+    assert store.expire_holds(now) == 1000
+    assert len(store._holds._heap) == 1_000_000 - 1000 and store._holds._heap[0][0] > now
+    assert products[0].get_available_quantity() == 1000
+    assert products[1].get_available_quantity() == 0
+
+    for hold in holds[1:500_000:2]:
+        store.release(hold)
+    assert store.commit(holds[2]) == 1
+    assert sum(product.get_available_quantity() for product in products) == 1000 + 250_000
+    assert store.get_total_quantity() == 1_000_000 - 1
+    assert store.expire_holds(time.monotonic() + 7200) == 1_000_000 - 1000 - 250_000 - 1
+    assert sum(product.get_available_quantity() for product in products) == 1_000_000 - 1
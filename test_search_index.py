@@ -0,0 +1,72 @@
+from products import Product
+from search_index import NameIndex
+from store import Store
+
+
+def make_store():
+    store = Store([Product("MacBook Air M2", price=1450, quantity=100),
+                   Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+                   Product("Google Pixel 7", price=500, quantity=250),
+                   Product("Google Pixel 7 Pro", price=800, quantity=10)])
+    store.get_product("Google Pixel 7 Pro").deactivate()
+    return store
+
+
+def test_prefix_search_on_any_word():
+    """
+    The test checks that a product can be found by the start of any word of its name, ignoring case.
+    """
+    store = make_store()
+    assert [p.name for p in store.search("pix", fuzzy=False, active_only=False)] == \
+        ["Google Pixel 7", "Google Pixel 7 Pro"]
+    assert [p.name for p in store.search("GOOGLE PIXEL 7 P", fuzzy=False)] == []    # Pro is not active
+    assert [p.name for p in store.search("earb", fuzzy=False)] == ["Bose QuietComfort Earbuds"]
+
+
+def test_fuzzy_search_tolerates_typos():
+    """
+    The test checks that a misspelled query still finds the product.
+    """
+    store = make_store()
+    assert store.search("macbok air")[0].name == "MacBook Air M2"
+    assert store.search("quiet confort")[0].name == "Bose QuietComfort Earbuds"
+
+
+def test_index_follows_adds_and_removes():
+    """
+    The test checks that the index picks up products added or removed after it was built.
+    """
+    store = make_store()
+    assert store.search("windows") == []
+    license_key = Product("Windows License", price=125, quantity=10)
+    store.add_products(license_key)
+    assert store.search("win") == [license_key]
+    store.remove_product(license_key)
+    assert store.search("win") == []
+
+
+def test_bulk_index_stays_fast_and_correct():
+    """
+    The test checks prefix and fuzzy lookups on a larger index.
+    """
+    index = NameIndex()
+    for number in range(20000):
+        index.add(Product(f"Widget {number:05d} Deluxe", price=1, quantity=1))
+    assert [p.name for p in index.prefix("widget 0001", limit=3)] == \
+        ["Widget 00010 Deluxe", "Widget 00011 Deluxe", "Widget 00012 Deluxe"]
+    assert index.fuzzy("widgte 12345 deluxe", limit=1)[0].name == "Widget 12345 Deluxe"
+
+
+def test_adds_between_queries_are_inserted_in_order():
+    """
+    The test checks that a few names added between queries are inserted into the sorted prefix list.
+    """
+    index = NameIndex()
+    for number in range(1000):
+        index.add(Product(f"Widget {number:04d}", price=1, quantity=1))
+    assert len(index.prefix("widget", limit=1000)) == 1000
+    for number in (5000, 42, 7):
+        index.add(Product(f"Gadget {number}", price=1, quantity=1))
+        assert [p.name for p in index.prefix("gadget 4")] == (["Gadget 42"] if number != 5000 else [])
+    assert index._prefixes == sorted(index._prefixes) and not index._pending
+    assert [p.name for p in index.prefix("gadget")] == ["Gadget 42", "Gadget 5000", "Gadget 7"]
@@ -0,0 +1,111 @@
+import multiprocessing
+import threading
+import pytest
+from products import Product, NonStockedProduct, LimitedProduct
+from sharded_store import ShardedStore, shard_of, _worker
+
+
+@pytest.fixture
+def sharded():
+    products = [Product(f"Item {index}", price=10, quantity=20) for index in range(12)]
+    products += [NonStockedProduct("Windows License", price=125),
+                 LimitedProduct("Shipping", price=10, quantity=250, maximum=1)]
+    with ShardedStore(products, workers=3) as store:
+        yield store
+
+
+def spanning_pair():
+    # Two products that live on different shards.
+    names = [f"Item {index}" for index in range(12)]
+    first = names[0]
+    second = next(name for name in names if shard_of(name, 3) != shard_of(first, 3))
+    return first, second
+
+
+def test_orders_and_scatter_gather_queries(sharded):
+    """
+    The test checks single- and multi-shard orders and the totals and listings gathered from all shards.
+    """
+    first, second = spanning_pair()
+    assert sharded.get_total_quantity() == 12 * 20 + 250
+    assert sharded.order([(first, 5)]) == 50
+    assert sharded.order([(first, 5), (second, 2), ("Windows License", 1), ("Shipping", 1)]) == 70 + 125 + 10
+    assert sharded.get_total_quantity() == 12 * 20 + 250 - 13
+    names = [product.name for product in sharded.get_all_products()]
+    assert names == [f"Item {index}" for index in range(12)] + ["Windows License", "Shipping"]
+
+
+def test_failed_order_across_shards_is_rolled_back(sharded):
+    """
+    The test checks that when one shard rejects its lines, the other shards give their reserved stock back.
+    """
+    first, second = spanning_pair()
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        sharded.order([(first, 20), (second, 21)])
+    with pytest.raises(Exception, match="not found in store"):
+        sharded.order([(first, 1), ("No Such Item", 1)])
+    assert sharded.get_total_quantity() == 12 * 20 + 250
+    assert first in [product.name for product in sharded.get_all_products()]
+
+
+def test_order_batch_mixes_local_and_spanning_orders(sharded):
+    """
+    The test checks that order_batch returns a total or an exception for every order, in order.
+    """
+    first, second = spanning_pair()
+    results = sharded.order_batch([[(first, 1)], [(first, 1), (second, 1)], [("Shipping", 2)], "not a list",
+                                   [(first, 1, "x")], [(first,)], [(5, 1)], [(first, 1)]])
+    assert results[:2] == [10, 20] and results[-1] == 10
+    assert isinstance(results[2], ValueError)
+    assert [type(result) for result in results[3:6]] == [TypeError] * 3
+    assert "not found in store" in str(results[6])
+    assert sharded.get_total_quantity() == 12 * 20 + 250 - 4
+
+
+def test_removed_product_leaves_the_listing_order(sharded):
+    """
+    The test checks that a removed and re-added product is listed where it was added last.
+    """
+    sharded.remove_product("Item 0")
+    assert "Item 0" not in sharded._positions
+    sharded.add_products(Product("Item 0", price=10, quantity=20))
+    names = [product.name for product in sharded.get_all_products()]
+    assert names == [f"Item {index}" for index in range(1, 12)] + ["Windows License", "Shipping", "Item 0"]
+
+
+class RecordingProduct(Product):
+    __slots__ = ()
+    events = []
+
+    def _changed(self, event: str, previous_quantity: int, was_active: bool):
+        self.events.append((event, self.name))
+        super()._changed(event, previous_quantity, was_active)
+
+
+def test_reserved_lines_are_held_not_bought():
+    """
+    The test checks that a shard holds the stock of a reserved order, and that an abort emits no events.
+    """
+    RecordingProduct.events.clear()
+    coordinator, connection = multiprocessing.Pipe()
+    worker = threading.Thread(target=_worker, args=(connection, [RecordingProduct("Item 0", price=10, quantity=20),
+                                                                 RecordingProduct("Item 1", price=10, quantity=20)]))
+    worker.start()
+
+    def call(command, payload=None):
+        coordinator.send((command, payload))
+        return coordinator.recv()
+
+    try:
+        assert call("reserve", (1, [("Item 0", 5), ("Item 0", 5)])) == (True, 100)
+        ok, error = call("order", [("Item 0", 11)])     # the held units can't be bought meanwhile
+        assert not ok and "not enough quantity" in str(error)
+        assert call("abort", 1) == (True, None)
+        assert RecordingProduct.events == []
+        assert call("reserve", (2, [("Item 0", 20), ("Item 1", 1)])) == (True, 210)
+        assert call("commit", 2) == (True, None)
+        assert RecordingProduct.events == [("buy", "Item 0"), ("buy", "Item 1")]
+        assert call("total") == (True, 19)
+    finally:
+        coordinator.send(("stop", None))
+        worker.join()
@@ -0,0 +1,140 @@
+import gc
+import threading
+import pytest
+from columnar_store import ColumnarStore
+from products import Product, NonStockedProduct
+from promotion import PercentDiscount
+from store import Store
+
+
+def make_store():
+    return Store([Product("MacBook Air M2", price=1450, quantity=100),
+                  Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+                  Product("Google Pixel 7", price=500, quantity=250),
+                  NonStockedProduct("Windows License", price=125)])
+
+
+def test_snapshot_keeps_state_from_before_changes():
+    """
+    The test checks that a snapshot shows quantities, prices, promotions and active states from when it was taken.
+    """
+    store = make_store()
+    macbook, earbuds = store.get_product("MacBook Air M2"), store.get_product("Bose QuietComfort Earbuds")
+    with store.snapshot() as snapshot:
+        store.order([(macbook, 100), (earbuds, 10)])
+        earbuds.price = 199
+        earbuds.set_promotion(PercentDiscount("30% off!", percent=30))
+        assert not macbook.is_active()
+        assert [(s.name, s.quantity, s.active) for s in snapshot.products[:2]] == \
+            [("MacBook Air M2", 100, True), ("Bose QuietComfort Earbuds", 500, True)]
+        state = snapshot.get_product("Bose QuietComfort Earbuds")
+        assert (state.price, state.promotion, state.product) == (250, None, earbuds)
+        assert snapshot.get_total_quantity() == 850
+        assert store.get_total_quantity() == 740
+        assert len(snapshot.get_all_products()) == 4
+        with pytest.raises(AttributeError):
+            state.quantity = 1
+
+
+def test_snapshot_ignores_later_additions_and_keeps_removed_products():
+    """
+    The test checks that products added after a snapshot are not in it and removed ones still are, in catalog order.
+    """
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    snapshot = store.snapshot()
+    store.remove_product(pixel)
+    store.add_products(Product("Google Pixel 7", price=450, quantity=5))
+    store.add_products(Product("Pixel Case", price=20, quantity=3))
+    assert [state.name for state in snapshot.products] == \
+        ["MacBook Air M2", "Bose QuietComfort Earbuds", "Google Pixel 7", "Windows License"]
+    assert snapshot.get_product("Google Pixel 7").product is pixel
+    assert snapshot.get_product("Pixel Case") is None
+    assert store.get_product("Pixel Case") not in snapshot
+    assert len(snapshot) == 4
+    snapshot.close()
+
+
+def test_only_changed_products_are_copied():
+    """
+    The test checks that a snapshot copies nothing up front and each changed product once, and that closed
+    or forgotten snapshots are no longer updated.
+    """
+    products = [Product(f"Product {index}", price=1, quantity=100) for index in range(1000)]
+    store = Store(products)
+    snapshot = store.snapshot()
+    assert snapshot._saved == {}
+    for _ in range(5):
+        products[7].buy(1)
+        products[9].set_quantity(3)
+    assert set(snapshot._saved) == {products[7], products[9]}
+    assert snapshot.state(products[7]).quantity == 100
+    snapshot.close()
+    forgotten = store.snapshot()
+    del forgotten
+    gc.collect()
+    products[1].buy(1)
+    assert store._snapshots == ()
+
+
+def test_snapshot_is_consistent_during_orders():
+    """
+    The test checks that a snapshot taken while orders are being placed never sees half of an order.
+    """
+    products = [Product(f"Product {index}", price=1, quantity=1_000_000) for index in range(50)]
+    store = Store(products)
+    stop = threading.Event()
+
+    def place_orders():
+        index = 0
+        while not stop.is_set():
+            store.order([(products[index % 50], 1), (products[(index + 1) % 50], 1)])
+            index += 1
+
+    writer = threading.Thread(target=place_orders)
+    writer.start()
+    try:
+        for _ in range(200):
+            with store.snapshot() as snapshot:
+                quantities = [state.quantity for state in snapshot.products]
+                assert sum(quantities) == snapshot.get_total_quantity()
+                assert sum(quantities) % 2 == 0
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_direct_changes_wait_for_orders_and_closed_snapshots_are_skipped():
+    """
+    The test checks that set_quantity waits while an order holds the product, and that a snapshot closed
+    while a change is under way ignores it.
+    """
+    store = make_store()
+    macbook = store.get_product("MacBook Air M2")
+    with store.snapshot() as snapshot, store._locked([macbook]):
+        writer = threading.Thread(target=macbook.set_quantity, args=(7,))
+        writer.start()
+        writer.join(0.05)
+        assert writer.is_alive() and snapshot.state(macbook).quantity == 100
+    writer.join()
+    assert macbook.get_quantity() == 7 and store.get_total_quantity() == 757
+
+    snapshot = store.snapshot()
+    snapshot.close()
+    snapshot._preserve(macbook)     # a writer that saw the snapshot before it was closed
+
+
+def test_columnar_store_snapshot():
+    """
+    The test checks snapshots of a columnar store across purchases, restocks and removals.
+    """
+    store = ColumnarStore(make_store().products)
+    macbook = store.get_product("MacBook Air M2")
+    with store.snapshot() as snapshot:
+        macbook.buy(40)
+        store.restock({"Google Pixel 7": 50})
+        store.remove_product(store.get_product("Bose QuietComfort Earbuds"))
+        assert [(state.name, state.quantity) for state in snapshot.products] == \
+            [("MacBook Air M2", 100), ("Bose QuietComfort Earbuds", 500), ("Google Pixel 7", 250),
+             ("Windows License", 0)]
+        assert snapshot.get_total_quantity() == 850
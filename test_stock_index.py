@@ -0,0 +1,106 @@
+import random
+
+from columnar_store import ColumnarStore
+from products import Product, NonStockedProduct, LimitedProduct
+from stock_index import SortedKeyList
+from store import Store
+
+
+def make_store():
+    return Store([Product("MacBook Air M2", price=1450, quantity=100),
+                  Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+                  Product("Google Pixel 7", price=500, quantity=250),
+                  NonStockedProduct("Windows License", price=125),
+                  LimitedProduct("Shipping", price=10, quantity=8, maximum=1)])
+
+
+def names(products):
+    return [product.name for product in products]
+
+
+def test_sorted_key_list_matches_sorted():
+    """
+    The test checks the bucketed sorted list against a plain sorted list through many adds, removes, moves and ranges.
+    """
+    rng = random.Random(0)
+    keys, expected = SortedKeyList(), []
+    keys.LOAD = 4
+    for number in range(2000):
+        if expected and rng.random() < 0.4:
+            item = expected.pop(rng.randrange(len(expected)))
+            keys.remove(item)
+        elif expected and rng.random() < 0.3:
+            item = expected.pop(rng.randrange(len(expected)))
+            moved = (rng.randrange(100), number)
+            keys.replace(item, moved)
+            expected.append(moved)
+        else:
+            item = (rng.randrange(100), number)
+            keys.add(item)
+            expected.append(item)
+        expected.sort()
+        low, high = sorted((rng.randrange(110), rng.randrange(110)))
+        assert list(keys.irange((low,), (high,))) == [item for item in expected if low <= item[0] < high]
+    assert len(keys) == len(expected)
+    assert list(keys.irange(reverse=True)) == expected[::-1]
+
+
+def test_range_and_top_queries():
+    """
+    The test checks quantity and price ranges (bounds included) and top-N queries.
+    """
+    store = make_store()
+    assert names(store.find_by_quantity(high=250)) == ["Shipping", "MacBook Air M2", "Google Pixel 7"]
+    assert names(store.low_stock(10)) == ["Shipping"]
+    assert names(store.find_by_price(100, 500)) == ["Windows License", "Bose QuietComfort Earbuds", "Google Pixel 7"]
+    assert names(store.top_products(2)) == ["Bose QuietComfort Earbuds", "Google Pixel 7"]
+    assert names(store.top_products(1, by="price", largest=False)) == ["Shipping"]
+
+
+def test_index_follows_changes():
+    """
+    The test checks that purchases, orders, quantity and price changes, additions and removals move products in the index.
+    """
+    store = make_store()
+    macbook = store.get_product("MacBook Air M2")
+    assert names(store.low_stock(50)) == ["Shipping"]
+    macbook.buy(95)
+    store.order([(store.get_product("Shipping"), 1)])
+    assert [(p.name, p.get_quantity()) for p in store.low_stock(50)] == [("MacBook Air M2", 5), ("Shipping", 7)]
+    macbook.set_quantity(1000)
+    macbook.price = 99
+    assert names(store.top_products(1)) == ["MacBook Air M2"]
+    assert names(store.find_by_price(high=100)) == ["Shipping", "MacBook Air M2"]
+    store.remove_product(macbook)
+    store.add_products(Product("Pixel Case", price=20, quantity=3))
+    assert names(store.low_stock(50)) == ["Pixel Case", "Shipping"]
+    assert names(store.find_by_price(high=100)) == ["Shipping", "Pixel Case"]
+
+
+def test_low_stock_listener_fires_once_per_crossing():
+    """
+    The test checks that a low-stock listener is called when a quantity falls below its threshold, and only then.
+    """
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    alerts = []
+    store.add_low_stock_listener(10, lambda product, quantity: alerts.append((product.name, quantity)))
+    pixel.buy(200)
+    assert alerts == []
+    pixel.buy(45)
+    pixel.buy(1)
+    assert alerts == [("Google Pixel 7", 5)]
+    pixel.set_quantity(20)
+    pixel.buy(20)
+    assert alerts == [("Google Pixel 7", 5), ("Google Pixel 7", 0)]
+
+
+def test_columnar_store_restock_updates_index():
+    """
+    The test checks that a bulk restock in a columnar store moves the restocked products.
+    """
+    store = ColumnarStore(make_store().products)
+    assert names(store.low_stock(200)) == ["Shipping", "MacBook Air M2"]
+    store.restock({"MacBook Air M2": 500})
+    assert names(store.low_stock(200)) == ["Shipping"]
+    assert names(store.top_products(1)) == ["MacBook Air M2"]
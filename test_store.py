@@ -0,0 +1,332 @@
+import collections
+import random
+import threading
+import pytest
+from products import Product, LimitedProduct
+from promotion import SecondHalfPrice, ThirdOneFree
+from store import Store
+
+
+def test_store_keeps_insertion_order():
+    """
+    The test checks that the store lists products in the order they were added.
+    """
+    products = [Product(f"Item {i}", price=10, quantity=5) for i in range(5)]
+    store = Store(products)
+    assert store.products == products
+    assert store.get_all_products() == products
+
+
+def test_lookup_by_name_and_membership():
+    """
+    The test checks that products can be found by name and that membership follows add/remove.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=100)
+    store = Store([macbook])
+    assert store.get_product("MacBook Air M2") is macbook
+    assert macbook in store
+    store.remove_product(macbook)
+    assert macbook not in store
+    assert store.get_product("MacBook Air M2") is None
+    with pytest.raises(ValueError, match="Product not found in store inventory."):
+        store.remove_product(macbook)
+
+
+def test_remove_keeps_order_of_remaining_products():
+    """
+    The test checks that removing a product leaves the remaining products in their original order.
+    """
+    products = [Product(f"Item {i}", price=10, quantity=5) for i in range(4)]
+    store = Store(products)
+    store.remove_product(products[1])
+    assert store.products == [products[0], products[2], products[3]]
+
+
+def test_adding_duplicate_product_raises():
+    """
+    The test checks that the same product, or another one with the same name, cannot be added twice.
+    """
+    store = Store([Product("Google Pixel 7", price=500, quantity=250)])
+    with pytest.raises(ValueError):
+        store.add_products(store.get_product("Google Pixel 7"))
+    with pytest.raises(ValueError):
+        store.add_products(Product("Google Pixel 7", price=400, quantity=1))
+
+
+def test_order_rejects_product_not_in_store():
+    """
+    The test checks that ordering a product that is not in the store raises an exception.
+    """
+    store = Store([Product("MacBook Air M2", price=1450, quantity=100)])
+    stranger = Product("Bose QuietComfort Earbuds", price=250, quantity=500)
+    with pytest.raises(Exception, match="not found in store"):
+        store.order([(stranger, 1)])
+
+
+def test_totals_follow_product_changes():
+    """
+    The test checks that the tracked total quantity and active products follow
+    buy, set_quantity, activate and deactivate on the products themselves.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=10)
+    earbuds = Product("Bose QuietComfort Earbuds", price=250, quantity=1)
+    pixel = Product("Google Pixel 7", price=500, quantity=5)
+    store = Store([macbook, earbuds, pixel], check_consistency=True)
+    assert store.get_total_quantity() == 16
+
+    store.order([(macbook, 3), (earbuds, 1)])   # earbuds sells out and becomes inactive
+    assert store.get_total_quantity() == 12
+    assert store.get_all_products() == [macbook, pixel]
+
+    pixel.deactivate()
+    assert store.get_all_products() == [macbook]
+    earbuds.set_quantity(4)     # restocking re-activates the product
+    pixel.activate()
+    assert store.get_all_products() == [macbook, earbuds, pixel]
+    assert store.get_total_quantity() == 16
+
+    store.remove_product(macbook)
+    assert store.get_total_quantity() == 9
+    assert store.get_all_products() == [earbuds, pixel]
+    store.verify()
+
+
+def test_verify_detects_untracked_changes():
+    """
+    The test checks that verify() notices when a product changed behind the store's back.
+    """
+    product = Product("MacBook Air M2", price=1450, quantity=10)
+    store = Store([product], check_consistency=True)
+    product._quantity = 3   # bypasses the notification on purpose
+    with pytest.raises(RuntimeError, match="Total quantity out of sync"):
+        store.get_total_quantity()
+
+
+def test_failed_order_rolls_back_earlier_lines():
+    """
+    The test checks that an order is all-or-nothing: when a later line fails,
+    the stock taken by the earlier lines is put back.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=10)
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    earbuds = Product("Bose QuietComfort Earbuds", price=250, quantity=2)
+    store = Store([macbook, shipping, earbuds], check_consistency=True)
+
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.order([(macbook, 10), (shipping, 2)])
+    with pytest.raises(Exception, match="product is not active"):
+        store.order([(earbuds, 2), (macbook, 3), (earbuds, 1)])     # earbuds sold out by the first line
+
+    assert macbook.get_quantity() == 10 and macbook.is_active()
+    assert earbuds.get_quantity() == 2 and earbuds.is_active()
+    assert shipping.get_quantity() == 250
+    assert store.get_total_quantity() == 262
+
+
+def test_failed_order_emits_no_events():
+    """
+    The test checks that a rejected order is invisible to listeners, low-stock alerts and the change feed.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=10)
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    store = Store([macbook, shipping])
+    events, alerts = [], []
+    store.add_listener(lambda event, product: events.append((event, product.name)))
+    store.add_low_stock_listener(5, lambda product, quantity: alerts.append((product.name, quantity)))
+    cursor = store.change_feed().cursor()
+
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.order([(macbook, 8), (shipping, 2)])
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        store.order([(macbook, 8), (macbook, 3)])
+    assert events == [] and alerts == [] and cursor.read() == []
+
+    store.order([(macbook, 8), (shipping, 1)])
+    assert events == [("buy", "MacBook Air M2"), ("buy", "Shipping")]
+    assert alerts == [("MacBook Air M2", 2)]
+
+
+def test_purchase_limit_is_per_order():
+    """
+    The test checks that repeated lines of a LimitedProduct count together against its limit, in every order path.
+    """
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    store = Store([shipping])
+    repeated = [(shipping, 1), (shipping, 1)]
+    for place in (store.order, store.order_cents, store.quote, store.quote_cents):
+        with pytest.raises(ValueError, match="cannot buy more than 1"):
+            place(repeated)
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.prepare(repeated)
+    for policy in ("fifo", "max_filled"):
+        results = store.order_batch([repeated, [(shipping, 1)], [(shipping, 1)]], policy=policy)
+        assert isinstance(results[0], ValueError) and results[1:] == [10, 10]
+    assert shipping.get_quantity() == 246
+
+
+def test_concurrent_orders_never_oversell():
+    """
+    The test runs many threads placing orders against one shared store and checks that
+    the final stock is exactly the initial stock minus what the successful orders bought.
+    """
+    threads_count, orders_per_thread = 8, 300
+    products = [Product(f"Item {i}", price=5, quantity=400) for i in range(6)]
+    products.append(LimitedProduct("Shipping", price=10, quantity=1000, maximum=1))
+    store = Store(products)
+    bought = [collections.Counter() for _ in range(threads_count)]
+
+    def place_orders(thread_index):
+        rng = random.Random(thread_index)
+        for _ in range(orders_per_thread):
+            lines = [(rng.choice(products), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+            try:
+                store.order(lines)
+            except Exception:
+                continue
+            for product, quantity in lines:
+                bought[thread_index][product] += quantity
+
+    workers = [threading.Thread(target=place_orders, args=(i,)) for i in range(threads_count)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    total_bought = sum(bought, collections.Counter())
+    for product in products:
+        initial = 1000 if product.name == "Shipping" else 400
+        assert product.get_quantity() == initial - total_bought[product]
+    store.verify()
+
+
+def test_quote_matches_order_without_changing_stock():
+    """
+    The test checks that quote() returns what order() would charge, and raises what order() would raise,
+    without changing any stock.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=3)
+    macbook.set_promotion(SecondHalfPrice("Second Half price!"))
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    store = Store([macbook, shipping], check_consistency=True)
+
+    cart = [(macbook, 2), (shipping, 1)]
+    assert store.quote(cart) == store.quote(cart) == 1450 + 725 + 10
+    assert macbook.get_quantity() == 3 and store.get_total_quantity() == 253
+    with pytest.raises(ValueError, match="cannot buy more than 1"):
+        store.quote([(shipping, 2)])
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        store.quote([(macbook, 2), (macbook, 2)])
+    with pytest.raises(Exception, match="product is not active"):
+        store.quote([(macbook, 3), (macbook, 1)])
+    assert store.order(cart) == 1450 + 725 + 10
+
+
+def test_prepared_order_takes_stock_only_on_commit():
+    """
+    The test checks that prepare() checks and prices an order without taking stock, and that commit() takes it.
+    """
+    macbook = Product("MacBook Air M2", price=1450, quantity=3)
+    store = Store([macbook], check_consistency=True)
+    events = []
+    store.add_listener(lambda event, product: events.append(event))
+
+    with pytest.raises(Exception, match="not enough quantity in stock."):
+        store.prepare([(macbook, 4)])
+    with store.prepare([(macbook, 2)]) as prepared:
+        assert prepared.total == 2900 and macbook.get_quantity() == 3
+    assert events == []
+    with store.prepare([(macbook, 2)]) as prepared:
+        assert prepared.commit() == 2900
+        with pytest.raises(ValueError, match="already committed"):
+            prepared.commit()
+    assert macbook.get_quantity() == 1 and events == ["buy"]
+    assert store.order([(macbook, 1)]) == 1450
+
+
+def test_quote_cache_is_invalidated_by_price_and_promotion_changes():
+    """
+    The test checks that repeated quotes hit the cache and that changing a price or promotion drops stale prices.
+    """
+    earbuds = Product("Bose QuietComfort Earbuds", price=250, quantity=500)
+    store = Store([earbuds])
+    cache = store._quote_cache
+
+    assert store.quote([(earbuds, 3)]) == 750
+    assert store.quote([(earbuds, 3)]) == 750
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    earbuds.set_promotion(ThirdOneFree("Third One Free!"))
+    assert len(cache) == 0
+    assert store.quote([(earbuds, 3)]) == 500
+    earbuds.price = 100
+    assert len(cache) == 0
+    assert store.quote([(earbuds, 3)]) == 200
+    earbuds.remove_promotion()
+    assert store.quote([(earbuds, 3)]) == 300
+
+
+def test_order_batch_fifo_and_max_filled_policies():
+    """
+    The test checks that order_batch fills orders under each policy, reports failures,
+    and respects the LimitedProduct maximum per order.
+    """
+    def make_store():
+        macbook = Product("MacBook Air M2", price=1000, quantity=5)
+        shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+        orders = [[(macbook, 4), (shipping, 1)], [(macbook, 2)], [(macbook, 1)], [(shipping, 2)], "not a list"]
+        return Store([macbook, shipping], check_consistency=True), macbook, shipping, orders
+
+    store, macbook, shipping, orders = make_store()
+    results = store.order_batch(orders)
+    assert results[0] == 4010 and results[2] == 1000
+    assert str(results[1]) == "not enough quantity in stock."
+    assert isinstance(results[3], ValueError) and isinstance(results[4], TypeError)
+    assert macbook.get_quantity() == 0 and not macbook.is_active()
+    assert shipping.get_quantity() == 249
+    assert store.get_total_quantity() == 249
+
+    store, macbook, shipping, orders = make_store()
+    results = store.order_batch(orders, policy="max_filled")
+    assert results[1:3] == [2000, 1000]     # the two small orders are filled first
+    assert str(results[0]) == "not enough quantity in stock."
+    assert macbook.get_quantity() == 2
+
+
+def test_order_batch_fails_malformed_orders_alone():
+    """
+    The test checks that malformed lines and unknown or unhashable products only fail their own order.
+    """
+    macbook = Product("MacBook Air M2", price=1000, quantity=5)
+    store = Store([macbook], check_consistency=True)
+    for policy in ("fifo", "max_filled"):
+        results = store.order_batch([[(macbook, 1, "x")], [([], 1)], [(5, 1)], [(macbook, "two")], [(macbook, 1)]],
+                                    policy=policy)
+        assert [type(result) for result in results[:4]] == [TypeError, TypeError, Exception, TypeError]
+        assert "not found in store" in str(results[2])
+        assert results[4] == 1000
+    assert macbook.get_quantity() == 3
+
+
+def test_order_batch_matches_looping_over_order():
+    """
+    The test checks that order_batch with the FIFO policy gives the same results as calling order() in a loop.
+    """
+    def run(use_order_batch):
+        rng = random.Random(7)
+        products = [Product(f"Item {i}", price=i + 1, quantity=30) for i in range(5)]
+        products.append(LimitedProduct("Shipping", price=10, quantity=40, maximum=2))
+        store = Store(products)
+        orders = [[(rng.choice(products), rng.randint(1, 3)) for _ in range(rng.randint(1, 3))] for _ in range(80)]
+        if use_order_batch:
+            results = store.order_batch(orders)
+        else:
+            results = []
+            for shopping_list in orders:
+                try:
+                    results.append(store.order(shopping_list))
+                except Exception as error:
+                    results.append(error)
+        return ([str(result) if isinstance(result, Exception) else result for result in results],
+                [product.get_quantity() for product in products])
+
+    assert run(True) == run(False)